@@ -0,0 +1,218 @@
+# automation_testplan/chromedriver.py
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from django.conf import settings
+from selenium.webdriver.chrome.service import Service
+
+VERSION = re.compile(r'(\d+)\.(\d+)\.(\d+)\.(\d+)')
+
+# Chrome binaries tried, in order, when CHROMEDRIVER_CHROME_BINARY is not set
+CHROME_BINARIES = (
+    'google-chrome',
+    'google-chrome-stable',
+    'chromium',
+    'chromium-browser',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'automation_testplan', 'chromedriver.json')
+
+# Where webdriver_manager keeps the drivers it downloaded
+WDM_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.wdm', 'drivers', 'chromedriver')
+
+# Not found yet
+_UNCHECKED = object()
+
+_resolved = {}
+_version = _UNCHECKED
+_lock = threading.Lock()
+_stats = {'resolutions': 0, 'total_seconds': 0.0, 'last_seconds': None, 'last_source': None, 'chrome_version': None}
+
+def _setting(name, default=None):
+    """
+    A CHROMEDRIVER_* setting, or the environment variable of the same name
+
+    Only the environment is read when Django is not configured, e.g. when
+    Chrome is launched by the standalone interceptor.py CLI.
+    """
+    if settings.configured:
+        value = getattr(settings, name, None)
+        if value is not None:
+            return value
+    return os.environ.get(name, default)
+
+def _offline():
+    value = _setting('CHROMEDRIVER_OFFLINE', False)
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+def _binary_version(binary, timeout=5):
+    """The a.b.c.d version a Chrome or chromedriver binary reports, or None"""
+    try:
+        output = subprocess.run(
+            [binary, '--version'], capture_output=True, text=True, timeout=timeout
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = VERSION.search(output)
+    return match.group() if match else None
+
+def chrome_version():
+    """The installed Chrome's version, or None if no Chrome binary answers"""
+    binary = _setting('CHROMEDRIVER_CHROME_BINARY')
+    for candidate in ([binary] if binary else CHROME_BINARIES):
+        version = _binary_version(candidate)
+        if version:
+            return version
+    return None
+
+def _major(version):
+    return version.split('.', 1)[0] if version else None
+
+def _load_cache(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(path, cache):
+    """Write the cache atomically, so concurrent launches never read half a file"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError as e:
+        sys.stderr.write(f"Could not write the chromedriver cache {path}: {str(e)}\n")
+
+def _usable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+def _matches(driver, version):
+    """Whether a chromedriver binary serves Chrome `version` (same major version)"""
+    return version is None or _major(_binary_version(driver)) == _major(version)
+
+def _find_local(version):
+    """A chromedriver already on this machine for Chrome `version`: on PATH or in webdriver_manager's cache"""
+    candidates = [shutil.which('chromedriver')]
+    pattern = os.path.join(WDM_CACHE_DIR, '**', 'chromedriver*')
+    # Newest downloads first
+    candidates += sorted(glob.glob(pattern, recursive=True), key=os.path.getmtime, reverse=True)
+    for candidate in candidates:
+        if _usable(candidate) and _matches(candidate, version):
+            return candidate
+    return None
+
+def _download():
+    """Let webdriver_manager fetch the driver for the installed Chrome; needs the network"""
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+def _resolve(version):
+    """Returns (path, source)"""
+    path = _setting('CHROMEDRIVER_PATH')
+    if path:
+        return path, 'setting'
+
+    key = version or 'unknown'
+    if _usable(_resolved.get(key)):
+        return _resolved[key], 'memory'
+
+    cache_path = _setting('CHROMEDRIVER_CACHE_PATH', DEFAULT_CACHE_PATH)
+    cache = _load_cache(cache_path)
+    if _usable(cache.get(key)):
+        return cache[key], 'disk'
+
+    path, source = _find_local(version), 'local'
+    if path is None:
+        if _offline():
+            raise RuntimeError(
+                f"No chromedriver found for Chrome {key} and CHROMEDRIVER_OFFLINE is set; "
+                "put one on PATH or set CHROMEDRIVER_PATH"
+            )
+        try:
+            path, source = _download(), 'download'
+        except Exception as e:
+            raise RuntimeError(
+                f"No chromedriver found for Chrome {key} and it could not be downloaded ({str(e)}); "
+                "put one on PATH or set CHROMEDRIVER_PATH"
+            ) from e
+
+    cache[key] = path
+    _save_cache(cache_path, cache)
+    return path, source
+
+def resolve_chromedriver():
+    """
+    Path of the chromedriver for the installed Chrome
+
+    Resolved once per process and cached on disk keyed by Chrome's version,
+    so later launches (and other processes) skip webdriver_manager's network
+    lookups. In order: CHROMEDRIVER_PATH (setting or environment), this
+    process, the disk cache (CHROMEDRIVER_CACHE_PATH), a matching driver on
+    PATH or in webdriver_manager's cache, and only then a download, which
+    CHROMEDRIVER_OFFLINE forbids. Chrome's version, or that no Chrome
+    binary answered, is looked up once; forget_chrome_version() (called by
+    start_chrome when a launch fails) looks again, so a Chrome upgrade
+    changes the key and the stale driver is not reused. The time spent is
+    kept for resolution_stats().
+    """
+    global _version
+    start = time.perf_counter()
+    with _lock:
+        if _version is _UNCHECKED:
+            _version = chrome_version()
+        version = _version
+        path, source = _resolve(version)
+        _resolved[version or 'unknown'] = path
+
+        spent = time.perf_counter() - start
+        _stats['resolutions'] += 1
+        _stats['total_seconds'] += spent
+        _stats['last_seconds'] = round(spent, 4)
+        _stats['last_source'] = source
+        _stats['chrome_version'] = version
+    return path
+
+def forget_chrome_version():
+    """Look Chrome's version, and the driver for it, up again on the next resolution"""
+    global _version
+    with _lock:
+        _version = _UNCHECKED
+        _resolved.clear()
+
+def start_chrome(start):
+    """
+    Launch Chrome with `start(service)`, a Selenium Service for the resolved chromedriver
+
+    If the launch fails, Chrome may have been upgraded under a long-lived
+    process: its version is looked up again and, if that picks another
+    driver, the launch is retried once with it.
+    """
+    path = resolve_chromedriver()
+    try:
+        return start(Service(path))
+    except Exception:
+        forget_chrome_version()
+        retry_path = resolve_chromedriver()
+        if retry_path == path:
+            raise
+        return start(Service(retry_path))
+
+def resolution_stats():
+    """How often the driver was resolved, the time it took and where the last path came from"""
+    with _lock:
+        stats = dict(_stats)
+    stats['total_seconds'] = round(stats['total_seconds'], 4)
+    return stats
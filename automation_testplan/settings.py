@@ -139,3 +139,81 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Interceptor browser pool
+INTERCEPTOR_POOL_SIZE = 4
+INTERCEPTOR_POOL_MAX_USES = 50
+INTERCEPTOR_POOL_LEASE_TIMEOUT = 120
+# Browsers launched in the background when the pool is first used (0 launches on demand only)
+INTERCEPTOR_POOL_WARM = 4
+
+# 'idle' finishes a capture once the network is quiet, 'fixed' always waits wait_time
+INTERCEPTOR_WAIT_MODE = 'idle'
+INTERCEPTOR_QUIET_WINDOW = 0.5
+
+# Number of collection requests captured in parallel; keep <= INTERCEPTOR_POOL_SIZE
+INTERCEPTOR_COLLECTION_CONCURRENCY = 4
+# Collection requests read ahead of the earliest unfinished one during a run
+INTERCEPTOR_COLLECTION_LOOKAHEAD = 100
+
+# Response bodies larger than this, or of a MIME type not listed, are stored as a hash and size
+INTERCEPTOR_MAX_INLINE_BODY_SIZE = 256 * 1024
+INTERCEPTOR_INLINE_MIME_TYPES = [
+    'application/json',
+    'application/*+json',
+    'application/xml',
+    'application/x-www-form-urlencoded',
+    'text/html',
+    'text/plain',
+    'text/xml',
+]
+
+# Store inline response bodies once, by SHA-256, under INTERCEPTOR_BLOB_ROOT (default MEDIA_ROOT/blobs)
+INTERCEPTOR_STORE_BODIES = True
+INTERCEPTOR_BLOB_ROOT = os.path.join(MEDIA_ROOT, 'blobs')
+
+# Background requests are inserted with bulk_create in batches of this size
+INTERCEPTOR_BULK_BATCH_SIZE = 500
+
+# Keep-alive connection pool used by the browserless 'http' collection engine
+INTERCEPTOR_HTTP_POOL_SIZE = 10
+INTERCEPTOR_HTTP_TIMEOUT = 30
+
+# Parsed Postman collections, cached by file hash as JSON Lines under INTERCEPTOR_PARSE_CACHE_ROOT;
+# the request counts of this many are kept in memory, and the least recently used files are deleted
+# once the cache grows past INTERCEPTOR_PARSE_CACHE_MAX_BYTES (None keeps everything)
+INTERCEPTOR_PARSE_CACHE_SIZE = 32
+INTERCEPTOR_PARSE_CACHE_ROOT = os.path.join(MEDIA_ROOT, 'parse_cache')
+INTERCEPTOR_PARSE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Collection runners refresh a heartbeat this often (seconds); runs silent for longer than the timeout are reaped
+INTERCEPTOR_RUN_HEARTBEAT_INTERVAL = 15
+INTERCEPTOR_RUN_HEARTBEAT_TIMEOUT = 90
+
+# Default collection run limits (requests/sec and concurrent requests, overall and per host); None is unlimited
+INTERCEPTOR_RATE_LIMITS = {
+    'rate_limit': None,
+    'max_in_flight': None,
+    'host_rate_limit': None,
+    'host_max_in_flight': None,
+}
+
+# Test runs: seconds without fetch/XHR or DOM activity that count as settled (see testmanager/settle.py)
+TESTMANAGER_SETTLE_QUIET_WINDOW = 0.3
+
+# Local address the test executor (manage.py run_executor) listens on for queued runs
+TESTMANAGER_EXECUTOR_ADDRESS = ('127.0.0.1', 6010)
+
+# Test runs each executor executes in parallel (one browser each); set per host
+TESTMANAGER_EXECUTOR_WORKERS = 2
+
+# Test runs a pooled executor browser serves (reset in between) before it is replaced
+TESTMANAGER_BROWSER_MAX_USES = 25
+
+# Chromedriver resolution shared by every Chrome launch (see automation_testplan/chromedriver.py).
+# CHROMEDRIVER_PATH pins a driver; resolved paths are cached per Chrome version in CHROMEDRIVER_CACHE_PATH;
+# CHROMEDRIVER_OFFLINE never downloads (air-gapped hosts); left as None, the CHROMEDRIVER_OFFLINE
+# environment variable (1/true/yes) decides
+CHROMEDRIVER_PATH = os.environ.get('CHROMEDRIVER_PATH')
+CHROMEDRIVER_CACHE_PATH = os.path.join(BASE_DIR, '.chromedriver_cache.json')
+CHROMEDRIVER_OFFLINE = None
@@ -1,23 +1,9 @@
 #!/usr/bin/env python
-from seleniumwire import webdriver
-from seleniumwire.utils import decode
 import json
-import datetime
-import time
 import sys
 import os
 import argparse
-import traceback
-import urllib.parse
-
-def try_decode_body(body):
-    """Safely decode response/request body"""
-    if not body:
-        return ""
-    try:
-        return body.decode('utf-8', errors='replace')
-    except Exception as e:
-        return f"<Failed to decode: {e}>"
+from interceptor.capture import Interceptor, CapturePolicy, CaptureScope, CAPTURE_EVERYTHING
 
 def load_json_from_file(file_path):
     """Load JSON data from a file"""
@@ -31,42 +17,6 @@ def load_json_from_file(file_path):
         sys.stderr.write(f"Error loading JSON from {file_path}: {str(e)}\n")
         return {}
 
-def determine_resource_type(req):
-    """Determine the type of resource being requested"""
-    content_type = req.response.headers.get('Content-Type', '') if req.response else ''
-    
-    # Check if it's an XHR request
-    if req.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return 'xhr'
-    
-    # Check Accept header for API calls
-    accept = req.headers.get('Accept', '')
-    if 'application/json' in accept or 'application/xml' in accept:
-        return 'xhr'
-    
-    # Check Content-Type for JSON responses
-    if 'application/json' in content_type:
-        return 'xhr'
-    
-    # Check for common resource types
-    if 'text/css' in content_type:
-        return 'stylesheet'
-    elif 'image/' in content_type:
-        return 'image'
-    elif 'font/' in content_type or 'application/font' in content_type:
-        return 'font'
-    elif 'text/javascript' in content_type or 'application/javascript' in content_type:
-        return 'script'
-    elif 'text/html' in content_type:
-        return 'document'
-    
-    # Default to XHR for API-like endpoints
-    url_path = urllib.parse.urlparse(req.url).path.lower()
-    if '/api/' in url_path or '/graphql' in url_path:
-        return 'xhr'
-    
-    return 'other'
-
 def intercept_and_log(
     method: str,
     url: str,
@@ -74,7 +24,13 @@ def intercept_and_log(
     body_file: str = None,
     wait_time: int = 5,
     debug: bool = False,
-    capture_all: bool = True
+    capture_all: bool = True,
+    wait_mode: str = 'fixed',
+    quiet_window: float = 0.5,
+    output_format: str = 'json',
+    max_body_size: int = None,
+    mime_types: str = None,
+    capture_scope: CaptureScope = None
 ):
     """
     Intercept HTTP requests using Selenium Wire and log them in HAR format
@@ -87,214 +43,41 @@ def intercept_and_log(
         wait_time: Time to wait for requests to complete (seconds)
         debug: Enable debug output
         capture_all: Capture all requests, not just the main one
+        wait_mode: 'fixed' or 'idle' (stop once the network is quiet)
+        quiet_window: Seconds without traffic that count as idle
+        output_format: 'json' prints the whole HAR once, 'ndjson' prints one
+            compact entry per line as it is processed
+        max_body_size: Largest response body inlined (bytes); default no limit
+        mime_types: Comma separated MIME types whose bodies are inlined;
+            default all
+        capture_scope: Hosts, paths and resource types to capture; default all
     """
     # Load headers and body from files if provided
     headers = load_json_from_file(headers_file)
     body_dict = load_json_from_file(body_file)
     
-    if debug:
-        sys.stderr.write(f"Method: {method}\n")
-        sys.stderr.write(f"URL: {url}\n")
-        sys.stderr.write(f"Headers: {json.dumps(headers)}\n")
-        sys.stderr.write(f"Body: {json.dumps(body_dict)}\n")
-        sys.stderr.write(f"Wait time: {wait_time}\n")
-    
-    # Configure Chrome options
-    chrome_opts = webdriver.ChromeOptions()
-    chrome_opts.add_argument('--headless')
-    chrome_opts.add_argument('--disable-gpu')
-    chrome_opts.add_argument('--no-sandbox')
-    chrome_opts.add_argument('--disable-dev-shm-usage')
-    
-    # Configure Selenium Wire options
-    seleniumwire_options = {
-        'disable_encoding': True,  # Don't decode responses
-        'enable_har': True,        # Enable HAR format
-    }
-    
-    try:
-        driver = webdriver.Chrome(
-            options=chrome_opts,
-            seleniumwire_options=seleniumwire_options
-        )
-    except Exception as e:
-        sys.stderr.write(f"Error initializing Chrome driver: {str(e)}\n")
-        raise
-
-    try:
-        # Clear existing requests
-        del driver.requests
-        
-        # Navigate to a blank page first
-        driver.get("about:blank")
-
-        # Execute the request based on the method
-        if method.upper() == "GET":
-            driver.get(url)
-        else:
-            # Build JavaScript fetch command
-            js = [
-                "return fetch(", 
-                json.dumps(url), ", {",
-                f"method: {json.dumps(method.upper())},"
-            ]
-            
-            if headers:
-                js.append(f"headers: {json.dumps(headers)},")
-            
-            if body_dict:
-                js.append(f"body: JSON.stringify({json.dumps(body_dict)}),")
-            
-            js.append("});")
-            fetch_script = " ".join(js)
-            
-            if debug:
-                sys.stderr.write(f"Executing script: {fetch_script}\n")
-            
-            driver.execute_script(fetch_script)
-
-        # Wait for requests to complete
-        time.sleep(wait_time)
-
-        # Initialize HAR structure
-        har = {
-            "log": {
-                "version": "1.2",
-                "creator": {
-                    "name": "URL Interceptor",
-                    "version": "1.0"
-                },
-                "entries": []
-            }
-        }
-
-        # Track if we've found the main request
-        main_request_found = False
-        url_base = url.split('?')[0]
-        
-        # First, find and process the main request
-        for req in driver.requests:
-            if not req.response:
-                continue
-            
-            # Check if this is the main request
-            if req.url.startswith(url_base) and not main_request_found:
-                main_request_found = True
-                
-                # Process the main request
-                entry = process_request(req)
-                entry["_is_main_request"] = True
-                har["log"]["entries"].append(entry)
-        
-        # Then process background requests if capture_all is True
-        if capture_all:
-            background_entries = []
-            
-            for req in driver.requests:
-                if not req.response:
-                    continue
-                
-                # Skip the main request
-                if req.url.startswith(url_base) and main_request_found:
-                    continue
-                
-                # Process background request
-                entry = process_request(req)
-                entry["_is_background_request"] = True
-                entry["_resource_type"] = determine_resource_type(req)
-                background_entries.append(entry)
-            
-            # Add background entries to HAR
-            har["log"]["entries"].extend(background_entries)
-
-        # Output HAR data as JSON
-        print(json.dumps(har, indent=2))
-        return har
-
-    except Exception as e:
-        sys.stderr.write(f"Error during interception: {str(e)}\n")
-        if debug:
-            traceback.print_exc(file=sys.stderr)
-        raise
-    finally:
-        # Always close the driver
-        driver.quit()
-
-def process_request(req):
-    """Process a request and create a HAR entry"""
-    # Extract request headers
-    request_headers = [{"name": k, "value": v} for k, v in req.headers.items()]
-    
-    # Extract response headers
-    response_headers = [{"name": k, "value": v} for k, v in req.response.headers.items()]
-
-    # Extract cookies from request (Cookie header)
-    cookies = []
-    try:
-        if req.headers.get("Cookie"):
-            cookie_header = req.headers.get("Cookie")
-            for c in cookie_header.split(";"):
-                if "=" in c:
-                    name, value = c.strip().split("=", 1)
-                    cookies.append({"name": name, "value": value})
-    except Exception as e:
-        cookies.append({"error": f"Failed to parse cookies: {str(e)}"})
-
-    # Extract Set-Cookie headers from response
-    set_cookies = []
-    for k, v in req.response.headers.items():
-        if k.lower() == "set-cookie":
-            set_cookies.append({"name": "Set-Cookie", "value": v})
-
-    # Create HAR entry
-    entry = {
-        "startedDateTime": datetime.datetime.utcnow().isoformat() + "Z",
-        "request": {
-            "method": req.method,
-            "url": req.url,
-            "httpVersion": "HTTP/1.1",
-            "headers": request_headers,
-            "cookies": cookies,
-            "queryString": parse_query_string(req.url),
-            "headersSize": -1,
-            "bodySize": -1,
-            "body": try_decode_body(req.body)
-        },
-        "response": {
-            "status": req.response.status_code,
-            "statusText": "",
-            "httpVersion": "HTTP/1.1",
-            "headers": response_headers,
-            "cookies": set_cookies,
-            "content": {
-                "size": len(req.response.body) if req.response.body else 0,
-                "mimeType": req.response.headers.get('Content-Type', 'text/plain'),
-                "text": try_decode_body(
-                    decode(req.response.body, req.response.headers.get('Content-Encoding', 'identity'))
-                )
-            },
-            "redirectURL": "",
-            "headersSize": -1,
-            "bodySize": -1,
-        },
-        "cache": {},
-        "timings": {
-            "wait": -1
-        },
-        "connection": req.id,
-        "_resourceType": determine_resource_type(req)
-    }
-    
-    return entry
-
-def parse_query_string(url):
-    """Parse query string parameters from URL"""
-    try:
-        parsed_url = urllib.parse.urlparse(url)
-        query_params = urllib.parse.parse_qsl(parsed_url.query)
-        return [{"name": k, "value": v} for k, v in query_params]
-    except:
-        return []
+    interceptor = Interceptor(
+        wait_time=wait_time,
+        capture_all=capture_all,
+        wait_mode=wait_mode,
+        quiet_window=quiet_window,
+        debug=debug,
+        capture_policy=CapturePolicy.from_config(max_body_size, mime_types, defaults=CAPTURE_EVERYTHING),
+        capture_scope=capture_scope
+    )
+
+    if output_format == 'ndjson':
+        # Stream entries so the HAR is never held in memory
+        for entry in interceptor.iter_entries(method, url, headers=headers, body=body_dict):
+            sys.stdout.write(json.dumps(entry, separators=(',', ':')) + "\n")
+            sys.stdout.flush()
+        return None
+
+    har = interceptor.capture(method, url, headers=headers, body=body_dict)
+
+    # Output HAR data as JSON
+    print(json.dumps(har, indent=2))
+    return har
 
 def main():
     """Command line interface for the interceptor"""
@@ -306,6 +89,16 @@ def main():
     parser.add_argument('wait_time', nargs='?', type=int, default=5, help='Time to wait for requests to complete (seconds)')
     parser.add_argument('--debug', action='store_true', help='Enable debug output')
     parser.add_argument('--capture-all', action='store_true', help='Capture all requests, not just the main one')
+    parser.add_argument('--wait-mode', choices=['fixed', 'idle'], default='fixed', help='Always wait wait_time, or stop once the network is idle')
+    parser.add_argument('--quiet-window', type=float, default=0.5, help='Seconds without traffic that count as idle')
+    parser.add_argument('--max-body-size', type=int, default=None, help='Largest response body to inline (bytes); larger bodies are replaced by a hash')
+    parser.add_argument('--mime-types', default=None, help='Comma separated MIME types (globs allowed) whose bodies are inlined')
+    parser.add_argument('--include-host', action='append', default=[], help='Only capture hosts matching this glob (repeatable)')
+    parser.add_argument('--exclude-host', action='append', default=[], help='Never capture hosts matching this glob (repeatable)')
+    parser.add_argument('--include-path', action='append', default=[], help='Only capture paths matching this regex (repeatable)')
+    parser.add_argument('--exclude-path', action='append', default=[], help='Never capture paths matching this regex (repeatable)')
+    parser.add_argument('--resource-type', action='append', default=[], help='Only keep background requests of this resource type (repeatable)')
+    parser.add_argument('--format', dest='output_format', choices=['json', 'ndjson'], default='json', help='Print one HAR document, or one compact entry per line')
     
     args = parser.parse_args()
     
@@ -317,7 +110,19 @@ def main():
             body_file=args.body_file if args.body_file else None,
             wait_time=args.wait_time,
             debug=args.debug,
-            capture_all=args.capture_all
+            capture_all=args.capture_all,
+            wait_mode=args.wait_mode,
+            quiet_window=args.quiet_window,
+            output_format=args.output_format,
+            max_body_size=args.max_body_size,
+            mime_types=args.mime_types,
+            capture_scope=CaptureScope(
+                include_hosts=args.include_host,
+                exclude_hosts=args.exclude_host,
+                include_paths=args.include_path,
+                exclude_paths=args.exclude_path,
+                resource_types=args.resource_type
+            )
         )
     except Exception as e:
         sys.stderr.write(f"Error: {str(e)}\n")
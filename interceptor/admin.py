@@ -1,3 +1,5 @@
 from django.contrib import admin
+from .models import CaptureLimits
 
 # Register your models here.
+admin.site.register(CaptureLimits)
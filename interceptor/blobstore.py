@@ -0,0 +1,196 @@
+# interceptor/blobstore.py
+import copy
+import hashlib
+import os
+import tempfile
+import time
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+class BlobStore:
+    """
+    Content-addressed store for response bodies on local disk
+
+    Blobs are keyed by their SHA-256 and sharded by the first two pairs of
+    hex digits (`ab/cd/abcd...`), so identical bodies are written once.
+    """
+
+    def __init__(self, root):
+        self.root = str(root)
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def put(self, data):
+        """Store bytes and return their SHA-256"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.path(sha256)
+
+        if os.path.exists(path):
+            # Refresh the mtime so garbage collection leaves a blob that is being re-used alone
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so readers never see a partial blob
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+        return sha256
+
+    def get(self, sha256):
+        """Return the bytes stored under a SHA-256, or None if missing"""
+        try:
+            with open(self.path(sha256), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, sha256):
+        return os.path.exists(self.path(sha256))
+
+    def delete(self, sha256):
+        try:
+            os.unlink(self.path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def iter_hashes(self):
+        """Yield (sha256, modified time) for every blob on disk"""
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.startswith('.tmp-'):
+                    continue
+                yield filename, os.path.getmtime(os.path.join(dirpath, filename))
+
+def get_blob_store():
+    """Return the blob store configured in settings"""
+    root = getattr(settings, 'INTERCEPTOR_BLOB_ROOT', None) or os.path.join(settings.MEDIA_ROOT, 'blobs')
+    return BlobStore(root)
+
+# ---------------------------------------------------------------- HAR entries
+
+def iter_har_entries(har_data):
+    """Yield the entries of a HAR log, or the data itself if it is a single entry"""
+    if not isinstance(har_data, dict):
+        return
+    if 'log' in har_data:
+        yield from har_data['log'].get('entries', [])
+    elif 'response' in har_data:
+        yield har_data
+
+def externalize_entry(entry, store=None):
+    """Move an entry's inline response body into the blob store, leaving a hash reference"""
+    content = entry.get('response', {}).get('content')
+    if not content or content.get('_blob') or not content.get('text'):
+        return entry
+
+    store = store or get_blob_store()
+    content['_blob'] = store.put(content.pop('text').encode('utf-8'))
+    return entry
+
+def blob_hashes(har_data):
+    """Return a Counter of the blob references in a HAR log or entry"""
+    hashes = Counter()
+    for entry in iter_har_entries(har_data):
+        sha256 = entry.get('response', {}).get('content', {}).get('_blob')
+        if sha256:
+            hashes[sha256] += 1
+    return hashes
+
+def body_text(content, store=None):
+    """Return the text of a HAR content object, reading it from the blob store if needed"""
+    if not content:
+        return ""
+    if content.get('_blob'):
+        data = (store or get_blob_store()).get(content['_blob'])
+        return data.decode('utf-8', errors='replace') if data is not None else ""
+    return content.get('text', "")
+
+def resolve_har(har_data, store=None):
+    """Return a copy of a HAR log or entry with every blob reference replaced by its text"""
+    if not har_data:
+        return har_data
+
+    store = store or get_blob_store()
+    har_data = copy.deepcopy(har_data)
+    for entry in iter_har_entries(har_data):
+        content = entry.get('response', {}).get('content')
+        if content and content.get('_blob'):
+            content['text'] = body_text(content, store)
+            del content['_blob']
+    return har_data
+
+# ---------------------------------------------------------------- refcounts
+
+def _apply_refcounts(hashes, sign):
+    from .models import Blob
+
+    if not hashes:
+        return
+
+    with transaction.atomic():
+        if sign > 0:
+            Blob.objects.bulk_create([Blob(sha256=sha256) for sha256 in hashes], ignore_conflicts=True)
+
+        # One UPDATE per distinct delta instead of one per blob
+        by_count = {}
+        for sha256, count in hashes.items():
+            by_count.setdefault(count, []).append(sha256)
+        for count, group in by_count.items():
+            Blob.objects.filter(sha256__in=group).update(refcount=F('refcount') + sign * count)
+
+def acquire_blobs(har_data):
+    """Count a new reference to every blob a stored HAR points at"""
+    _apply_refcounts(blob_hashes(har_data), 1)
+
+def release_blobs(har_data):
+    """Drop the references a deleted HAR held"""
+    _apply_refcounts(blob_hashes(har_data), -1)
+
+def release_blob_counts(hashes):
+    """Drop references counted in bulk, as a {sha256: count} mapping"""
+    _apply_refcounts(Counter(hashes), -1)
+
+def collect_garbage(store=None, orphan_age=3600):
+    """
+    Delete unreferenced blobs
+
+    Removes blobs whose refcount dropped to zero, plus files that were never
+    referenced (e.g. a capture whose row was never saved). Blobs written or
+    re-used in the last `orphan_age` seconds are kept, since a capture may
+    still be about to reference them. Returns the number of blobs deleted.
+    """
+    from .models import Blob
+
+    store = store or get_blob_store()
+    cutoff = time.time() - orphan_age
+    deleted = 0
+
+    for sha256 in list(Blob.objects.filter(refcount__lte=0).values_list('sha256', flat=True)):
+        if store.exists(sha256) and os.path.getmtime(store.path(sha256)) > cutoff:
+            continue
+        # Re-check the refcount in the DELETE in case a capture referenced it meanwhile
+        if Blob.objects.filter(sha256=sha256, refcount__lte=0).delete()[0]:
+            store.delete(sha256)
+            deleted += 1
+
+    known = None
+    for sha256, mtime in store.iter_hashes():
+        if mtime > cutoff:
+            continue
+        if known is None:
+            known = set(Blob.objects.values_list('sha256', flat=True))
+        if sha256 not in known:
+            store.delete(sha256)
+            deleted += 1
+
+    return deleted
@@ -0,0 +1,229 @@
+# interceptor/browser_pool.py
+import atexit
+import sys
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from django.conf import settings
+from .capture import create_driver
+
+class PoolTimeout(Exception):
+    """Raised when no browser could be leased in time"""
+
+def page_origin(url):
+    """scheme://host[:port] of an http(s) URL, or None"""
+    parts = urllib.parse.urlsplit(url or '')
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+def clear_browser_state(driver, origins=()):
+    """
+    Leave a browser as if freshly launched: one new tab on about:blank
+
+    Cookies of every site and the HTTP cache are cleared, and all storage
+    (localStorage, IndexedDB, service workers, cache storage) of each of
+    `origins` and of the current page. sessionStorage belongs to the tab,
+    so the browser continues in a new one and every other is closed.
+    """
+    origins = set(origins)
+    origins.add(page_origin(driver.current_url))
+    origins.discard(None)
+
+    old_handles = driver.window_handles
+    driver.switch_to.new_window('tab')
+    fresh = driver.current_window_handle
+    for handle in old_handles:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(fresh)
+
+    driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+    for origin in origins:
+        driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+    driver.get("about:blank")
+
+class PooledDriver:
+    """A Selenium Wire driver owned by the pool plus its usage bookkeeping"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+class BrowserPool:
+    """
+    Long-lived pool of pre-launched Selenium Wire browsers
+
+    Captures lease a browser, use it and hand it back. Browsers are reset
+    between leases, health checked before they are handed out and recycled
+    after `max_uses` captures, so Chrome and the MITM proxy are only started
+    when the pool grows or replaces a browser.
+    """
+
+    def __init__(self, max_size=4, max_uses=50, lease_timeout=120, driver_factory=create_driver):
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.lease_timeout = lease_timeout
+        self.driver_factory = driver_factory
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Take a healthy browser from the pool, launching one if there is room"""
+        timeout = self.lease_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                while not self._closed and not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No browser available after {timeout} seconds")
+                    self._cond.wait(remaining)
+
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    # Reserve the slot before launching outside the lock
+                    pooled = None
+                    self._size += 1
+
+            if pooled is None:
+                try:
+                    pooled = PooledDriver(self.driver_factory())
+                except Exception:
+                    self._forget()
+                    raise
+                return pooled
+
+            if self.is_healthy(pooled.driver):
+                return pooled
+
+            # Dead browser, drop it and try again
+            self._discard(pooled)
+
+    def release(self, pooled, discard=False):
+        """Reset a leased browser and return it to the pool"""
+        with self._cond:
+            pooled.uses += 1
+            worn_out = pooled.uses >= self.max_uses
+
+        if discard or self._closed or worn_out or not self.reset(pooled.driver):
+            self._discard(pooled)
+            return
+
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Context manager yielding a browser that is returned to the pool on exit"""
+        pooled = self.acquire(timeout)
+        failed = True
+        try:
+            yield pooled.driver
+            failed = False
+        finally:
+            # Also runs on GeneratorExit, when a generator holding the lease is closed early;
+            # a failure may have left the browser unusable
+            self.release(pooled, discard=failed and not self.is_healthy(pooled.driver))
+
+    def warm(self, count=None):
+        """Pre-launch idle browsers until the pool holds `count` (default max_size), so captures skip startup"""
+        count = self.max_size if count is None else min(count, self.max_size)
+        while True:
+            with self._cond:
+                if self._closed or self._size >= count:
+                    return
+                # Reserve the slot before launching outside the lock
+                self._size += 1
+
+            try:
+                pooled = PooledDriver(self.driver_factory())
+            except Exception as e:
+                self._forget()
+                sys.stderr.write(f"Error pre-launching pooled browser: {str(e)}\n")
+                return
+
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def close(self):
+        """Quit every idle browser; leased browsers are quit when released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+
+        for pooled in idle:
+            self._discard(pooled)
+
+    @staticmethod
+    def reset(driver):
+        """
+        Clear captured traffic and browser state, leaving the driver on about:blank
+
+        Storage is cleared for every origin the capture requested, third
+        parties included; cookies are cleared for all sites.
+        """
+        try:
+            origins = {page_origin(request.url) for request in driver.requests}
+            driver.scopes = []
+            del driver.requests
+            clear_browser_state(driver, origins)
+            del driver.requests
+            return True
+        except Exception as e:
+            sys.stderr.write(f"Error resetting pooled browser: {str(e)}\n")
+            return False
+
+    @staticmethod
+    def is_healthy(driver):
+        """Check that the browser still answers commands"""
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+        self._forget()
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide browser pool, creating it from settings on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                max_size=getattr(settings, 'INTERCEPTOR_POOL_SIZE', 4),
+                max_uses=getattr(settings, 'INTERCEPTOR_POOL_MAX_USES', 50),
+                lease_timeout=getattr(settings, 'INTERCEPTOR_POOL_LEASE_TIMEOUT', 120),
+            )
+            atexit.register(_pool.close)
+            # Pre-launch in the background; a capture arriving meanwhile launches or waits as usual
+            warm = getattr(settings, 'INTERCEPTOR_POOL_WARM', _pool.max_size)
+            if warm:
+                threading.Thread(target=_pool.warm, args=(warm,), name='browser-pool-warm', daemon=True).start()
+        return _pool
@@ -0,0 +1,598 @@
+# interceptor/capture.py
+from seleniumwire import webdriver
+from seleniumwire.utils import decode
+import json
+import datetime
+import fnmatch
+import hashlib
+import re
+import time
+import sys
+import traceback
+import urllib.parse
+from contextlib import contextmanager
+from automation_testplan.chromedriver import start_chrome
+
+# How often to sample in-flight traffic when waiting for the network to go idle
+IDLE_POLL_INTERVAL = 0.1
+
+# Selenium Wire options shared by every interceptor browser
+SELENIUMWIRE_OPTIONS = {
+    'disable_encoding': True,  # Don't decode responses
+    'enable_har': True,        # Enable HAR format
+}
+
+# Response bodies kept inline by default; everything else becomes a placeholder
+DEFAULT_INLINE_MIME_TYPES = (
+    'application/json',
+    'application/*+json',
+    'application/xml',
+    'application/x-www-form-urlencoded',
+    'text/html',
+    'text/plain',
+    'text/xml',
+)
+DEFAULT_MAX_INLINE_BODY_SIZE = 256 * 1024
+
+class CapturePolicy:
+    """
+    Decide which response bodies are inlined into HAR entries
+
+    Bodies are kept when their MIME type matches one of `mime_types` (glob
+    patterns, parameters ignored) and they are at most `max_body_size` bytes.
+    Anything else is replaced by a SHA-256 and size placeholder. A limit or
+    allow-list of None disables that check.
+    """
+
+    def __init__(self, max_body_size=DEFAULT_MAX_INLINE_BODY_SIZE, mime_types=DEFAULT_INLINE_MIME_TYPES):
+        self.max_body_size = max_body_size
+        self.mime_types = tuple(m.strip().lower() for m in mime_types if m.strip()) if mime_types is not None else None
+
+    @classmethod
+    def from_config(cls, max_body_size=None, mime_types=None, defaults=None):
+        """
+        Build a policy from stored configuration
+
+        `mime_types` may be a comma separated string; unset values fall back
+        to `defaults` (another policy) or the module defaults.
+        """
+        defaults = defaults or cls()
+        if isinstance(mime_types, str):
+            mime_types = [m for m in mime_types.split(',') if m.strip()] or None
+        return cls(
+            max_body_size=defaults.max_body_size if max_body_size is None else max_body_size,
+            mime_types=defaults.mime_types if mime_types is None else mime_types,
+        )
+
+    def keeps(self, mime_type, size):
+        """Whether a body of this type and size is inlined"""
+        if self.max_body_size is not None and size > self.max_body_size:
+            return False
+        if self.mime_types is None:
+            return True
+        mime_type = (mime_type or '').split(';')[0].strip().lower()
+        return any(fnmatch.fnmatchcase(mime_type, pattern) for pattern in self.mime_types)
+
+    def content(self, body, mime_type, encoding='identity'):
+        """Build the HAR `content` object for a response body"""
+        body = body or b''
+        content = {
+            "size": len(body),
+            "mimeType": mime_type,
+        }
+
+        if self.keeps(mime_type, len(body)):
+            content["text"] = try_decode_body(decode(body, encoding))
+        else:
+            content["text"] = ""
+            content["comment"] = "Body omitted by capture policy"
+            content["_omitted"] = True
+            content["_sha256"] = hashlib.sha256(body).hexdigest()
+
+        return content
+
+# Inline every body, as the interceptor always did
+CAPTURE_EVERYTHING = CapturePolicy(max_body_size=None, mime_types=None)
+
+def _split_config(value, separators=','):
+    """Split a stored list setting (string or iterable) into clean items"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        for sep in separators:
+            value = value.replace(sep, '\n')
+        value = value.split('\n')
+    return [item.strip() for item in value if item and item.strip()]
+
+def _host_glob_regex(glob):
+    """Translate a host glob into a regex; '*' never crosses into the port or path"""
+    return re.escape(glob.lower()).replace(r'\*', r'[^/:?#]*').replace(r'\?', r'[^/:?#]')
+
+def _path_regex(pattern):
+    """Embed a path regex at the position right after the host"""
+    return pattern[1:] if pattern.startswith('^') else f'.*?(?:{pattern})'
+
+class CaptureScope:
+    """
+    Decide which traffic is captured at all
+
+    Host rules are globs ('api.example.com', '*.cdn.net'), path rules are
+    regexes searched against the path and query. Host and path rules are
+    compiled into Selenium Wire scopes so out-of-scope traffic is passed
+    through the proxy without ever being buffered. Resource types can only be
+    known once a response arrives, so they are applied while entries are
+    built. The main request is always captured.
+    """
+
+    URL_PREFIX = r'^[a-zA-Z][a-zA-Z0-9+.-]*://'
+    # Userinfo up to the last '@' of the authority, or none at all; never a shorter match that
+    # would leave 'user@' in front of the host
+    USERINFO = r'(?:[^/?#]*@(?![^/?#]*@)|(?![^/?#]*@))'
+    # An optional trailing dot ('tracker.com.') names the same host
+    PORT = r'\.?(?::\d+)?'
+    # End of the authority; path rules anchored with '^' are matched from here, never inside the host
+    AUTHORITY_END = r'(?=[/?#]|$)'
+
+    def __init__(self, include_hosts=None, exclude_hosts=None, include_paths=None, exclude_paths=None,
+                 resource_types=None):
+        self.include_hosts = _split_config(include_hosts)
+        self.exclude_hosts = _split_config(exclude_hosts)
+        self.include_paths = _split_config(include_paths, separators='')
+        self.exclude_paths = _split_config(exclude_paths, separators='')
+        self.resource_types = {t.lower() for t in _split_config(resource_types)} or None
+
+    @property
+    def filters_urls(self):
+        return bool(self.include_hosts or self.exclude_hosts or self.include_paths or self.exclude_paths)
+
+    def url_regex(self):
+        """A single regex matching every in-scope URL, or None when all URLs are in scope"""
+        if not self.filters_urls:
+            return None
+
+        regex = self.URL_PREFIX + self.USERINFO
+        if self.exclude_hosts:
+            hosts = '|'.join(_host_glob_regex(h) for h in self.exclude_hosts)
+            regex += f'(?!(?i:{hosts}){self.PORT}{self.AUTHORITY_END})'
+        if self.include_hosts:
+            hosts = '|'.join(_host_glob_regex(h) for h in self.include_hosts)
+            regex += f'(?i:{hosts}){self.PORT}{self.AUTHORITY_END}'
+        else:
+            regex += r'[^/?#]*' + self.AUTHORITY_END
+        if self.exclude_paths:
+            regex += '(?!' + '|'.join(f'(?:{_path_regex(p)})' for p in self.exclude_paths) + ')'
+        if self.include_paths:
+            regex += '(?=' + '|'.join(f'(?:{_path_regex(p)})' for p in self.include_paths) + ')'
+        return regex
+
+    def proxy_scopes(self, main_url):
+        """Selenium Wire scopes for a capture of `main_url` ([] captures everything)"""
+        regex = self.url_regex()
+        if regex is None:
+            return []
+        return [regex, '^' + re.escape(main_url.split('?')[0])]
+
+    def allows_url(self, url):
+        """Whether the host and path rules capture a request to `url`"""
+        regex = self.url_regex()
+        return regex is None or re.search(regex, url) is not None
+
+    def allows_resource_type(self, resource_type):
+        return self.resource_types is None or resource_type in self.resource_types
+
+# Capture every request, as the interceptor always did
+UNSCOPED = CaptureScope()
+
+def create_driver():
+    """Launch a headless Chrome behind the Selenium Wire proxy"""
+    chrome_opts = webdriver.ChromeOptions()
+    chrome_opts.add_argument('--headless')
+    chrome_opts.add_argument('--disable-gpu')
+    chrome_opts.add_argument('--no-sandbox')
+    chrome_opts.add_argument('--disable-dev-shm-usage')
+
+    try:
+        return start_chrome(lambda service: webdriver.Chrome(
+            service=service,
+            options=chrome_opts,
+            seleniumwire_options=dict(SELENIUMWIRE_OPTIONS)
+        ))
+    except Exception as e:
+        sys.stderr.write(f"Error initializing Chrome driver: {str(e)}\n")
+        raise
+
+def try_decode_body(body):
+    """Safely decode response/request body"""
+    if not body:
+        return ""
+    try:
+        return body.decode('utf-8', errors='replace')
+    except Exception as e:
+        return f"<Failed to decode: {e}>"
+
+def determine_resource_type(req):
+    """Determine the type of resource being requested"""
+    content_type = req.response.headers.get('Content-Type', '') if req.response else ''
+
+    # Check if it's an XHR request
+    if req.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return 'xhr'
+
+    # Check Accept header for API calls
+    accept = req.headers.get('Accept', '')
+    if 'application/json' in accept or 'application/xml' in accept:
+        return 'xhr'
+
+    # Check Content-Type for JSON responses
+    if 'application/json' in content_type:
+        return 'xhr'
+
+    # Check for common resource types
+    if 'text/css' in content_type:
+        return 'stylesheet'
+    elif 'image/' in content_type:
+        return 'image'
+    elif 'font/' in content_type or 'application/font' in content_type:
+        return 'font'
+    elif 'text/javascript' in content_type or 'application/javascript' in content_type:
+        return 'script'
+    elif 'text/html' in content_type:
+        return 'document'
+
+    # Default to XHR for API-like endpoints
+    url_path = urllib.parse.urlparse(req.url).path.lower()
+    if '/api/' in url_path or '/graphql' in url_path:
+        return 'xhr'
+
+    return 'other'
+
+def wait_for_network_idle(driver, url_base, timeout, quiet_window=0.5):
+    """
+    Wait until the main request has a response and the network has been quiet
+
+    Returns as soon as the main request is answered and no request has been
+    in flight (or started) for `quiet_window` seconds, or when `timeout`
+    seconds have passed. Returns the number of seconds actually waited.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    last_activity = start
+    last_state = None
+
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+
+        requests = driver.requests
+        pending = sum(1 for req in requests if not req.response)
+        main_done = any(req.response for req in requests if req.url.startswith(url_base))
+
+        # Any new request or newly finished response counts as activity
+        state = (len(requests), pending)
+        if state != last_state:
+            last_state = state
+            last_activity = now
+
+        if main_done and pending == 0 and now - last_activity >= quiet_window:
+            break
+
+        time.sleep(min(IDLE_POLL_INTERVAL, max(deadline - now, 0)))
+
+    return time.monotonic() - start
+
+class Interceptor:
+    """
+    In-process interceptor returning HAR entries for a request
+
+    Headers and body are passed as Python objects. An instance only holds
+    capture options; every capture gets its own browser, leased from `pool`
+    when one is given or launched and quit around the capture otherwise, so
+    a single instance can be shared by worker threads.
+
+    Usage:
+        interceptor = Interceptor(pool=get_pool(), wait_mode='idle')
+        har = interceptor.capture('GET', 'https://example.com')
+    """
+
+    def __init__(
+        self,
+        pool=None,
+        wait_time: int = 5,
+        capture_all: bool = True,
+        wait_mode: str = 'fixed',
+        quiet_window: float = 0.5,
+        debug: bool = False,
+        capture_policy: CapturePolicy = None,
+        capture_scope: CaptureScope = None
+    ):
+        self.pool = pool
+        self.options = {
+            'wait_time': wait_time,
+            'capture_all': capture_all,
+            'wait_mode': wait_mode,
+            'quiet_window': quiet_window,
+            'debug': debug,
+            'capture_policy': capture_policy,
+            'capture_scope': capture_scope,
+        }
+
+    @contextmanager
+    def browser(self):
+        """Yield a browser for one capture"""
+        if self.pool is not None:
+            with self.pool.lease() as driver:
+                yield driver
+            return
+
+        driver = create_driver()
+        try:
+            yield driver
+        finally:
+            driver.quit()
+
+    def iter_entries(self, method, url, headers=None, body=None, **options):
+        """Yield HAR entries one at a time; keyword options override the instance's"""
+        options = {**self.options, **options}
+        with self.browser() as driver:
+            yield from iter_har_entries(driver, method, url, headers=headers, body=body, **options)
+
+    def capture(self, method, url, headers=None, body=None, **options):
+        """Return the HAR data for a request"""
+        har = new_har()
+        har["log"]["entries"].extend(self.iter_entries(method, url, headers=headers, body=body, **options))
+        return har
+
+def new_har():
+    """Return an empty HAR log"""
+    return {
+        "log": {
+            "version": "1.2",
+            "creator": {
+                "name": "URL Interceptor",
+                "version": "1.0"
+            },
+            "entries": []
+        }
+    }
+
+def iter_har_entries(
+    driver,
+    method: str,
+    url: str,
+    headers: dict = None,
+    body=None,
+    wait_time: int = 5,
+    debug: bool = False,
+    capture_all: bool = True,
+    wait_mode: str = 'fixed',
+    quiet_window: float = 0.5,
+    capture_policy: CapturePolicy = None,
+    capture_scope: CaptureScope = None
+):
+    """
+    Drive an already running Selenium Wire browser and yield HAR entries
+
+    Entries are built one at a time as they are consumed, the main request
+    first, so callers can stream them without holding the whole HAR. The
+    driver is left open so callers can hand it back to a pool.
+
+    Args:
+        driver: Selenium Wire Chrome driver
+        method: HTTP method (GET, POST, etc.)
+        url: Target URL
+        headers: Request headers
+        body: Request body
+        wait_time: Time to wait for requests to complete (seconds); an upper
+            bound when wait_mode is 'idle'
+        debug: Enable debug output
+        capture_all: Capture all requests, not just the main one
+        wait_mode: 'fixed' always waits wait_time, 'idle' stops once the
+            network has been quiet for quiet_window seconds
+        quiet_window: Seconds without traffic that count as idle
+        capture_policy: Which response bodies to inline (default: all)
+        capture_scope: Which requests to capture (default: all)
+    """
+    headers = headers or {}
+    capture_policy = capture_policy or CAPTURE_EVERYTHING
+    capture_scope = capture_scope or UNSCOPED
+
+    if debug:
+        sys.stderr.write(f"Method: {method}\n")
+        sys.stderr.write(f"URL: {url}\n")
+        sys.stderr.write(f"Headers: {json.dumps(headers)}\n")
+        sys.stderr.write(f"Body: {json.dumps(body)}\n")
+        sys.stderr.write(f"Wait time: {wait_time} ({wait_mode})\n")
+
+    try:
+        # Only out-of-scope traffic is passed through the proxy unrecorded
+        driver.scopes = capture_scope.proxy_scopes(url)
+
+        # Clear existing requests
+        del driver.requests
+
+        # Navigate to a blank page first
+        driver.get("about:blank")
+
+        # Execute the request based on the method
+        if method.upper() == "GET":
+            driver.get(url)
+        else:
+            # Build JavaScript fetch command
+            js = [
+                "return fetch(",
+                json.dumps(url), ", {",
+                f"method: {json.dumps(method.upper())},"
+            ]
+
+            if headers:
+                js.append(f"headers: {json.dumps(headers)},")
+
+            if body:
+                js.append(f"body: JSON.stringify({json.dumps(body)}),")
+
+            js.append("});")
+            fetch_script = " ".join(js)
+
+            if debug:
+                sys.stderr.write(f"Executing script: {fetch_script}\n")
+
+            driver.execute_script(fetch_script)
+
+        url_base = url.split('?')[0]
+
+        # Wait for requests to complete
+        if wait_mode == 'idle':
+            waited = wait_for_network_idle(driver, url_base, wait_time, quiet_window)
+            if debug:
+                sys.stderr.write(f"Network idle after {waited:.2f}s\n")
+        else:
+            time.sleep(wait_time)
+
+        # Classify every request in a single pass. The main request is the
+        # first answered request for the target URL and is yielded first;
+        # background requests seen before it are held back until it is found.
+        main_request = None
+        deferred = []
+
+        for req in driver.requests:
+            if not req.response:
+                continue
+
+            if main_request is None and req.url.startswith(url_base):
+                main_request = req
+                entry = process_request(req, capture_policy)
+                entry["_is_main_request"] = True
+                yield entry
+
+                if not capture_all:
+                    break
+                deferred, pending = [], deferred
+                for background in pending:
+                    entry = _background_entry(background, url_base, True, capture_policy, capture_scope)
+                    if entry is not None:
+                        yield entry
+                continue
+
+            if not capture_all:
+                continue
+
+            if main_request is None:
+                deferred.append(req)
+                continue
+
+            entry = _background_entry(req, url_base, True, capture_policy, capture_scope)
+            if entry is not None:
+                yield entry
+
+        # No main request was answered: everything left is background traffic
+        for req in deferred:
+            entry = _background_entry(req, url_base, False, capture_policy, capture_scope)
+            if entry is not None:
+                yield entry
+
+    except Exception as e:
+        sys.stderr.write(f"Error during interception: {str(e)}\n")
+        if debug:
+            traceback.print_exc(file=sys.stderr)
+        raise
+
+def _background_entry(req, url_base, main_found, capture_policy, capture_scope):
+    """Build the HAR entry for a background request, or None if it is skipped"""
+    # Once the main request is found, other hits on the target URL are skipped
+    if main_found and req.url.startswith(url_base):
+        return None
+
+    resource_type = determine_resource_type(req)
+    if not capture_scope.allows_resource_type(resource_type):
+        return None
+
+    entry = process_request(req, capture_policy, resource_type)
+    entry["_is_background_request"] = True
+    entry["_resource_type"] = resource_type
+    return entry
+
+def process_request(req, capture_policy=CAPTURE_EVERYTHING, resource_type=None):
+    """Process a request and create a HAR entry"""
+    # Extract request headers
+    request_headers = [{"name": k, "value": v} for k, v in req.headers.items()]
+
+    # Extract response headers
+    response_headers = [{"name": k, "value": v} for k, v in req.response.headers.items()]
+
+    # Extract cookies from request (Cookie header)
+    cookies = []
+    try:
+        if req.headers.get("Cookie"):
+            cookie_header = req.headers.get("Cookie")
+            for c in cookie_header.split(";"):
+                if "=" in c:
+                    name, value = c.strip().split("=", 1)
+                    cookies.append({"name": name, "value": value})
+    except Exception as e:
+        cookies.append({"error": f"Failed to parse cookies: {str(e)}"})
+
+    # Extract Set-Cookie headers from response
+    set_cookies = []
+    for k, v in req.response.headers.items():
+        if k.lower() == "set-cookie":
+            set_cookies.append({"name": "Set-Cookie", "value": v})
+
+    # Create HAR entry
+    entry = {
+        "startedDateTime": datetime.datetime.utcnow().isoformat() + "Z",
+        "request": {
+            "method": req.method,
+            "url": req.url,
+            "httpVersion": "HTTP/1.1",
+            "headers": request_headers,
+            "cookies": cookies,
+            "queryString": parse_query_string(req.url),
+            "headersSize": -1,
+            "bodySize": -1,
+            "body": try_decode_body(req.body)
+        },
+        "response": {
+            "status": req.response.status_code,
+            "statusText": "",
+            "httpVersion": "HTTP/1.1",
+            "headers": response_headers,
+            "cookies": set_cookies,
+            "content": capture_policy.content(
+                req.response.body,
+                req.response.headers.get('Content-Type', 'text/plain'),
+                req.response.headers.get('Content-Encoding', 'identity')
+            ),
+            "redirectURL": "",
+            "headersSize": -1,
+            "bodySize": -1,
+        },
+        "cache": {},
+        "timings": proxy_timings(req),
+        "connection": req.id,
+        "_resourceType": resource_type or determine_resource_type(req)
+    }
+
+    return entry
+
+def proxy_timings(req):
+    """
+    HAR timings as seen by the Selenium Wire proxy
+
+    The proxy only knows when the request left the browser and when the
+    response came back, so the whole round-trip is reported as wait.
+    """
+    sent = getattr(req, 'date', None)
+    received = getattr(req.response, 'date', None)
+    if not sent or not received:
+        return {"wait": -1}
+    return {"wait": round(max(0, (received - sent).total_seconds()) * 1000, 3)}
+
+def parse_query_string(url):
+    """Parse query string parameters from URL"""
+    try:
+        parsed_url = urllib.parse.urlparse(url)
+        query_params = urllib.parse.parse_qsl(parsed_url.query)
+        return [{"name": k, "value": v} for k, v in query_params]
+    except:
+        return []
@@ -14,7 +14,8 @@ class ProjectForm(forms.ModelForm):
 class RequestForm(forms.ModelForm):
     class Meta:
         model = Request
-        fields = ['url', 'method', 'headers', 'body', 'wait_time']
+        fields = ['url', 'method', 'headers', 'body', 'wait_time', 'capture_max_body_size', 'capture_mime_types',
+                  'scope_include_hosts', 'scope_exclude_hosts', 'scope_include_paths', 'scope_exclude_paths', 'scope_resource_types']
         widgets = {
             'url': forms.URLInput(attrs={'class': 'form-control', 'placeholder': 'https://example.com/api/endpoint'}),
             'method': forms.Select(attrs={'class': 'form-control'}),
@@ -29,13 +30,33 @@ class RequestForm(forms.ModelForm):
                 'placeholder': '{\n  "key": "value"\n}'
             }),
             'wait_time': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'max': 30}),
+            'capture_max_body_size': forms.NumberInput(attrs={'class': 'form-control', 'min': 0, 'placeholder': '262144'}),
+            'capture_mime_types': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'application/json, text/html'}),
+            'scope_include_hosts': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': 'api.example.com, *.example.com'}),
+            'scope_exclude_hosts': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': '*.google-analytics.com, *.doubleclick.net'}),
+            'scope_include_paths': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': '^/api/'}),
+            'scope_exclude_paths': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': '\\.(png|jpg|woff2?)$'}),
+            'scope_resource_types': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'xhr, document'}),
         }
 
 class PostmanCollectionForm(forms.ModelForm):
     class Meta:
         model = PostmanCollection
-        fields = ['name', 'file']
+        fields = ['name', 'file', 'engine', 'rate_limit', 'max_in_flight', 'host_rate_limit', 'host_max_in_flight', 'capture_max_body_size', 'capture_mime_types',
+                  'scope_include_hosts', 'scope_exclude_hosts', 'scope_include_paths', 'scope_exclude_paths', 'scope_resource_types']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'file': forms.FileInput(attrs={'class': 'form-control'}),
+            'engine': forms.Select(attrs={'class': 'form-control'}),
+            'rate_limit': forms.NumberInput(attrs={'class': 'form-control', 'min': 0, 'step': 'any', 'placeholder': 'Unlimited'}),
+            'max_in_flight': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'placeholder': 'Unlimited'}),
+            'host_rate_limit': forms.NumberInput(attrs={'class': 'form-control', 'min': 0, 'step': 'any', 'placeholder': 'Unlimited'}),
+            'host_max_in_flight': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'placeholder': 'Unlimited'}),
+            'capture_max_body_size': forms.NumberInput(attrs={'class': 'form-control', 'min': 0, 'placeholder': '262144'}),
+            'capture_mime_types': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'application/json, text/html'}),
+            'scope_include_hosts': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': 'api.example.com, *.example.com'}),
+            'scope_exclude_hosts': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': '*.google-analytics.com, *.doubleclick.net'}),
+            'scope_include_paths': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': '^/api/'}),
+            'scope_exclude_paths': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': '\\.(png|jpg|woff2?)$'}),
+            'scope_resource_types': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'xhr, document'}),
         }
\ No newline at end of file
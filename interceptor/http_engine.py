@@ -0,0 +1,298 @@
+# interceptor/http_engine.py
+import datetime
+import json
+import socket
+import sys
+import time
+import urllib.parse
+import urllib3
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from .capture import CapturePolicy, CaptureScope, CAPTURE_EVERYTHING, UNSCOPED, new_har, process_request
+
+DEFAULT_HTTP_TIMEOUT = 30
+DEFAULT_MAX_REDIRECTS = 10
+
+# Credentials a redirect must not carry to another origin
+CREDENTIAL_HEADERS = ('authorization', 'cookie')
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+class _TimedConnectionMixin:
+    """
+    Record DNS, TCP connect and TLS handshake times of a new connection
+
+    The timings are left on `har_timings` for the first request sent on the
+    connection; requests reusing a kept-alive connection find it empty.
+    """
+    har_timings = None
+
+    def _new_conn(self):
+        # Resolve once and connect to the resolved addresses, so "connect" holds no second lookup.
+        # Only the TCP socket uses _dns_host; TLS SNI and certificate checks still use self.host.
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            addresses = list(dict.fromkeys(
+                info[4][0] for info in socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)
+            ))
+        except OSError:
+            addresses = [host]  # Let the real connect report the error
+        resolved = time.perf_counter()
+
+        try:
+            for attempt, address in enumerate(addresses, 1):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except Exception:
+                    # Try the next address, as socket.create_connection would
+                    if attempt == len(addresses):
+                        raise
+        finally:
+            self._dns_host = host
+
+        self.har_timings = {"dns": _ms(resolved - start), "connect": _ms(time.perf_counter() - resolved), "ssl": -1}
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        timings = self.har_timings
+        if timings is not None and isinstance(self, HTTPSConnection):
+            # Whatever connect() spent after the TCP connection is the handshake;
+            # as in HAR, "connect" includes it
+            timings["ssl"] = max(0, round(_ms(time.perf_counter() - start) - timings["dns"] - timings["connect"], 3))
+            timings["connect"] = round(timings["connect"] + timings["ssl"], 3)
+
+    def pop_timings(self):
+        timings, self.har_timings = self.har_timings, None
+        return timings
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+def create_pool_manager(maxsize=4, timeout=DEFAULT_HTTP_TIMEOUT):
+    """Return a keep-alive connection pool shared by HTTP captures"""
+    pool_manager = urllib3.PoolManager(
+        num_pools=50,
+        maxsize=maxsize,
+        timeout=urllib3.Timeout(total=timeout),
+        retries=False,
+    )
+    pool_manager.pool_classes_by_scheme = {
+        'http': TimedHTTPConnectionPool,
+        'https': TimedHTTPSConnectionPool,
+    }
+    return pool_manager
+
+def origin(url):
+    """(scheme, host, port) of a URL, with the scheme's default port filled in"""
+    parts = urllib.parse.urlsplit(url)
+    return parts.scheme.lower(), parts.hostname, parts.port or {'http': 80, 'https': 443}.get(parts.scheme.lower())
+
+def connection_timings(response):
+    """Pop the connection setup timings a response's connection recorded, if it was new"""
+    connection = getattr(response, 'connection', None) or getattr(response, '_connection', None)
+    pop = getattr(connection, 'pop_timings', None)
+    return (pop() if pop else None) or {"dns": -1, "connect": -1, "ssl": -1}
+
+class _Exchange:
+    """
+    One request/response pair shaped like a Selenium Wire request
+
+    Lets the HTTP engine build entries with the same process_request() the
+    browser path uses, so both produce identical HAR entries.
+    """
+
+    class Response:
+        def __init__(self, status_code, headers, body):
+            self.status_code = status_code
+            self.headers = headers
+            self.body = body
+
+    def __init__(self, method, url, headers, body, response, id):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.response = response
+        self.id = id
+
+def encode_body(body, headers):
+    """
+    Encode a request body the way the browser path sends it
+
+    Dicts and lists are sent as JSON, with a JSON Content-Type unless one is
+    given. Returns (bytes or None, headers).
+    """
+    if body is None or body == '' or body == {}:
+        return None, headers
+    if isinstance(body, bytes):
+        return body, headers
+    if isinstance(body, str):
+        return body.encode('utf-8'), headers
+
+    if not any(k.lower() == 'content-type' for k in headers):
+        headers = {**headers, 'Content-Type': 'application/json'}
+    return json.dumps(body).encode('utf-8'), headers
+
+class HttpEngine:
+    """
+    Browserless capture of a request over a pooled keep-alive HTTP client
+
+    Produces the same HAR entries as Interceptor for API requests that do not
+    need a page context: the main entry first, followed by one background
+    entry per redirect hop. Instances only hold options and are safe to share
+    between worker threads.
+
+    Usage:
+        engine = HttpEngine(pool_manager=get_http_pool())
+        har = engine.capture('POST', 'https://example.com/api', body={'a': 1})
+    """
+
+    def __init__(
+        self,
+        pool_manager=None,
+        timeout: float = DEFAULT_HTTP_TIMEOUT,
+        max_redirects: int = DEFAULT_MAX_REDIRECTS,
+        capture_all: bool = True,
+        debug: bool = False,
+        capture_policy: CapturePolicy = None,
+        capture_scope: CaptureScope = None
+    ):
+        self.pool_manager = pool_manager or create_pool_manager(timeout=timeout)
+        self.options = {
+            'timeout': timeout,
+            'max_redirects': max_redirects,
+            'capture_all': capture_all,
+            'debug': debug,
+            'capture_policy': capture_policy,
+            'capture_scope': capture_scope,
+        }
+
+    def iter_entries(self, method, url, headers=None, body=None, **options):
+        """Yield HAR entries one at a time; keyword options override the instance's"""
+        options = {**self.options, **options}
+        yield from iter_http_entries(self.pool_manager, method, url, headers=headers, body=body, **options)
+
+    def capture(self, method, url, headers=None, body=None, **options):
+        """Return the HAR data for a request"""
+        har = new_har()
+        har["log"]["entries"].extend(self.iter_entries(method, url, headers=headers, body=body, **options))
+        return har
+
+def iter_http_entries(
+    pool_manager,
+    method: str,
+    url: str,
+    headers: dict = None,
+    body=None,
+    timeout: float = DEFAULT_HTTP_TIMEOUT,
+    max_redirects: int = DEFAULT_MAX_REDIRECTS,
+    capture_all: bool = True,
+    debug: bool = False,
+    capture_policy: CapturePolicy = None,
+    capture_scope: CaptureScope = None,
+    **ignored
+):
+    """
+    Send a request without a browser and yield HAR entries
+
+    Redirects are always followed by hand, like a browser would: 303
+    responses (and 301/302 for POST) switch to a bodiless GET, and the
+    Authorization and Cookie headers are dropped once the redirect leaves
+    the original origin. The first request is always recorded; redirect
+    hops are recorded with capture_all, when the scope captures their URL
+    and resource type. Browser-only options such as wait_time are accepted
+    and ignored.
+    """
+    headers = dict(headers or {})
+    capture_policy = capture_policy or CAPTURE_EVERYTHING
+    capture_scope = capture_scope or UNSCOPED
+    method = method.upper()
+    data, headers = encode_body(body, headers)
+
+    if debug:
+        sys.stderr.write(f"HTTP {method} {url}\n")
+
+    for hop in range(max_redirects + 1):
+        started = datetime.datetime.utcnow()
+        start = time.perf_counter()
+        response = pool_manager.request(
+            method,
+            url,
+            headers=headers,
+            body=data,
+            redirect=False,
+            preload_content=False,
+            decode_content=False,
+            timeout=timeout,
+        )
+        try:
+            # Time to the response headers; the body is read separately
+            waited = time.perf_counter() - start
+            setup = connection_timings(response)
+            response_body = response.read()
+            received = time.perf_counter() - start - waited
+        finally:
+            response.release_conn()
+
+        exchange = _Exchange(
+            method, url, headers, data,
+            _Exchange.Response(response.status, response.headers, response_body),
+            id=f"http-{hop}",
+        )
+
+        if hop == 0:
+            entry = process_request(exchange, capture_policy)
+            entry["_is_main_request"] = True
+        elif capture_all and capture_scope.allows_url(url):
+            entry = process_request(exchange, capture_policy)
+            resource_type = entry["_resourceType"]
+            entry = entry if capture_scope.allows_resource_type(resource_type) else None
+            if entry is not None:
+                entry["_is_background_request"] = True
+                entry["_resource_type"] = resource_type
+        else:
+            entry = None
+
+        if entry is not None:
+            entry["startedDateTime"] = started.isoformat() + "Z"
+            # Connection setup is part of the time to the headers, so take it out of the wait
+            spent = max(0, setup["dns"]) + max(0, setup["connect"])
+            entry["timings"] = {
+                "blocked": -1,
+                **setup,
+                "send": 0,
+                "wait": max(0, round(_ms(waited) - spent, 3)),
+                "receive": _ms(received),
+            }
+            entry["time"] = _ms(waited + received)
+            location = response.headers.get('Location', '')
+            entry["response"]["redirectURL"] = urllib.parse.urljoin(url, location) if location else ""
+            yield entry
+
+        location = response.headers.get('Location')
+        if response.status not in (301, 302, 303, 307, 308) or not location:
+            return
+
+        next_url = urllib.parse.urljoin(url, location)
+        if origin(next_url) != origin(url):
+            headers = {k: v for k, v in headers.items() if k.lower() not in CREDENTIAL_HEADERS}
+        url = next_url
+        if response.status == 303 or (response.status in (301, 302) and method == 'POST'):
+            method = 'GET'
+            data = None
+            headers = {k: v for k, v in headers.items() if k.lower() not in ('content-type', 'content-length')}
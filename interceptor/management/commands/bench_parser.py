@@ -0,0 +1,64 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from interceptor.parser_benchmark import (
+    DEFAULT_BASELINE_PATH, SCENARIOS, compare, load_baseline, run_benchmarks, save_baseline,
+)
+
+class Command(BaseCommand):
+    help = 'Benchmark the Postman parser on synthetic collections and compare against a stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help=f"Scenarios to run (default all): {', '.join(SCENARIOS)}")
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark; the median is kept')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='Baseline JSON file')
+        parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed growth of peak memory or allocated blocks before failing (fraction, default 0.2)')
+        parser.add_argument('--check-timing', action='store_true',
+                            help='Also fail on slower wall times; they are noisy, so off by default')
+        parser.add_argument('--timing-tolerance', type=float, default=0.5,
+                            help='Allowed growth of the median time with --check-timing (fraction, default 0.5)')
+        parser.add_argument('--json', action='store_true', help='Print the raw report as JSON')
+        parser.add_argument('--require-baseline', action='store_true',
+                            help='Fail when there is no baseline to compare against (for CI)')
+
+    def handle(self, *args, **options):
+        unknown = set(options['scenarios']) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        report = run_benchmarks(options['scenarios'] or None, repeat=options['repeat'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            for scenario, benchmarks in report['scenarios'].items():
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{scenario} ({benchmarks['file_size_kb']} KB)"))
+                for benchmark, metrics in benchmarks.items():
+                    if isinstance(metrics, dict):
+                        self.stdout.write(
+                            f"  {benchmark:<32} {metrics['seconds']:>9.4f}s "
+                            f"{metrics['peak_kb']:>12.1f} KB peak {metrics['allocated_blocks']:>10} blocks"
+                        )
+
+        if options['save_baseline']:
+            save_baseline(report, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}"))
+            return
+
+        baseline = load_baseline(options['baseline'])
+        if baseline is None:
+            if options['require_baseline']:
+                raise CommandError(f"No baseline at {options['baseline']}; run with --save-baseline to create one")
+            self.stdout.write(f"No baseline at {options['baseline']}; run with --save-baseline to create one")
+            return
+
+        regressions = compare(
+            report, baseline, tolerance=options['tolerance'],
+            timing_tolerance=options['timing_tolerance'] if options['check_timing'] else None,
+        )
+        for scenario, benchmark, metric, old, new in regressions:
+            self.stderr.write(f"{scenario}/{benchmark}: {metric} {old} -> {new}")
+        if regressions:
+            raise CommandError(f"{len(regressions)} parser regressions against {options['baseline']}")
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from interceptor.blobstore import collect_garbage
+
+class Command(BaseCommand):
+    help = 'Delete response body blobs that are no longer referenced by any captured request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orphan-age', type=int, default=3600,
+                            help='Keep blobs written or re-used within this many seconds')
+
+    def handle(self, *args, **options):
+        deleted = collect_garbage(orphan_age=options['orphan_age'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unreferenced blobs'))
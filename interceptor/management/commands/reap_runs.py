@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from interceptor.utils_postman import reap_dead_runs, resume_collection_run
+
+class Command(BaseCommand):
+    help = 'Mark collection runs whose runner stopped sending heartbeats as interrupted, optionally resuming them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=int, default=None,
+                            help='Seconds without a heartbeat before a run is dead (default INTERCEPTOR_RUN_HEARTBEAT_TIMEOUT)')
+        parser.add_argument('--resume', action='store_true',
+                            help='Resume every reaped run in this process')
+
+    def handle(self, *args, **options):
+        reaped = reap_dead_runs(timeout=options['timeout'])
+        self.stdout.write(self.style.SUCCESS(f'Reaped {len(reaped)} dead runs'))
+
+        if not options['resume']:
+            return
+
+        for run in reaped:
+            if run.position >= run.total:
+                continue
+            self.stdout.write(f'Resuming run {run.id} at request {run.position + 1} of {run.total}')
+            try:
+                resume_collection_run(run.id)
+            except Exception as e:
+                self.stderr.write(f'Run {run.id}: {e}')
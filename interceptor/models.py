@@ -1,14 +1,42 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import json
+import urllib.parse
 from testmanager.models import Project
+from .blobstore import acquire_blobs, release_blobs
 
 class PostmanCollection(models.Model):
+    ENGINE_CHOICES = [
+        ('http', 'HTTP (no browser)'),
+        ('browser', 'Browser'),
+    ]
+
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='collections')
     name = models.CharField(max_length=255)
     file = models.FileField(upload_to='postman_collections/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_running = models.BooleanField(default=False)
     last_run = models.DateTimeField(null=True, blank=True)
+    capture_max_body_size = models.PositiveIntegerField(null=True, blank=True, help_text='Largest response body stored inline (bytes)')
+    capture_mime_types = models.CharField(max_length=500, blank=True, null=True, help_text='Comma separated MIME types whose bodies are stored')
+    scope_include_hosts = models.TextField(blank=True, null=True, help_text='Host globs to capture, comma or newline separated')
+    scope_exclude_hosts = models.TextField(blank=True, null=True, help_text='Host globs never captured, comma or newline separated')
+    scope_include_paths = models.TextField(blank=True, null=True, help_text='Path regexes to capture, one per line')
+    scope_exclude_paths = models.TextField(blank=True, null=True, help_text='Path regexes never captured, one per line')
+    scope_resource_types = models.CharField(max_length=200, blank=True, null=True, help_text='Resource types to keep, e.g. xhr, document')
+    engine = models.CharField(max_length=10, choices=ENGINE_CHOICES, default='http', help_text='Use the browser only for requests that need a page context')
+    file_sha256 = models.CharField(max_length=64, blank=True, null=True)
+    parsed_request_count = models.PositiveIntegerField(null=True, blank=True)
+    current_run = models.ForeignKey('CollectionRun', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Rate limits; empty values fall back to the project's CaptureLimits, then INTERCEPTOR_RATE_LIMITS
+    rate_limit = models.FloatField(null=True, blank=True, help_text='Requests per second across all hosts')
+    max_in_flight = models.PositiveIntegerField(null=True, blank=True, help_text='Concurrent requests across all hosts')
+    host_rate_limit = models.FloatField(null=True, blank=True, help_text='Requests per second to any one host')
+    host_max_in_flight = models.PositiveIntegerField(null=True, blank=True, help_text='Concurrent requests to any one host')
 
     def __str__(self):
         return self.name
@@ -22,8 +50,121 @@ class PostmanCollection(models.Model):
     def failed_requests(self):
         return self.collection_requests.filter(status_code__gte=400).count()
 
+class CaptureLimits(models.Model):
+    """Default rate limits for the collection runs of a project"""
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='capture_limits')
+    rate_limit = models.FloatField(null=True, blank=True, help_text='Requests per second across all hosts')
+    max_in_flight = models.PositiveIntegerField(null=True, blank=True, help_text='Concurrent requests across all hosts')
+    host_rate_limit = models.FloatField(null=True, blank=True, help_text='Requests per second to any one host')
+    host_max_in_flight = models.PositiveIntegerField(null=True, blank=True, help_text='Concurrent requests to any one host')
+
+    def __str__(self):
+        return f"Capture limits for {self.project}"
+
+class CollectionRun(models.Model):
+    """
+    One run of a collection
+
+    Owns the requests it captured and keeps denormalized counters, updated
+    with F() expressions as each request is saved, so status polls are a
+    single row read and deleting a run removes its requests. Each saved
+    request also checkpoints `position` (the next request to run) and the
+    variable state, and the runner refreshes `heartbeat_at` while it is
+    alive, so runs whose process died can be detected and resumed.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('interrupted', 'Interrupted'),
+    ]
+
+    collection = models.ForeignKey(PostmanCollection, on_delete=models.CASCADE, related_name='runs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    ok = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    bytes = models.BigIntegerField(default=0)  # response bytes captured
+    elapsed = models.FloatField(default=0)  # seconds
+    queue_wait = models.FloatField(default=0)  # seconds spent waiting for rate limiter slots
+    error = models.TextField(blank=True, null=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Checkpoint: everything needed to continue the run from where it stopped
+    position = models.PositiveIntegerField(default=0)
+    variables = models.JSONField(blank=True, null=True)  # provided when the run started
+    state = models.JSONField(blank=True, null=True)  # set by scripts of the requests before position
+    engine = models.CharField(max_length=10, blank=True, null=True)
+    file_sha256 = models.CharField(max_length=64, blank=True, null=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.collection} run {self.id} ({self.status})"
+
+    @property
+    def is_running(self):
+        return self.status == 'running'
+
+    def _elapsed(self):
+        return (timezone.now() - self.started_at).total_seconds() if self.started_at else 0
+
+    @property
+    def is_resumable(self):
+        return self.status == 'interrupted' and self.position < self.total
+
+    def record(self, ok, size=0, state=None, queue_wait=0):
+        """Count one finished request and checkpoint past it"""
+        now = timezone.now()
+        changes = {
+            'done': F('done') + 1,
+            'ok': F('ok') + (1 if ok else 0),
+            'failed': F('failed') + (0 if ok else 1),
+            'bytes': F('bytes') + size,
+            'queue_wait': F('queue_wait') + queue_wait,
+            'position': F('position') + 1,
+            'elapsed': self._elapsed(),
+            'heartbeat_at': now,
+        }
+        if state is not None:
+            changes['state'] = dict(state)
+        CollectionRun.objects.filter(pk=self.pk).update(**changes)
+
+    def heartbeat(self):
+        CollectionRun.objects.filter(pk=self.pk, status='running').update(heartbeat_at=timezone.now())
+
+    def finish(self, status='completed', error=None):
+        self.status = status
+        self.error = error
+        self.finished_at = timezone.now()
+        self.elapsed = self._elapsed()
+        self.save(update_fields=['status', 'error', 'finished_at', 'elapsed'])
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'is_running': self.is_running,
+            'total': self.total,
+            'done': self.done,
+            'ok': self.ok,
+            'failed': self.failed,
+            'bytes': self.bytes,
+            'elapsed': self.elapsed,
+            'queue_wait': self.queue_wait,
+            'error': self.error,
+            'position': self.position,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
 class CollectionRequest(models.Model):
     collection = models.ForeignKey(PostmanCollection, on_delete=models.CASCADE, related_name='collection_requests')
+    run = models.ForeignKey(CollectionRun, on_delete=models.CASCADE, null=True, blank=True, related_name='requests')
     name = models.CharField(max_length=255)
     url = models.URLField(max_length=500)
     method = models.CharField(max_length=10)
@@ -36,6 +177,9 @@ class CollectionRequest(models.Model):
     def __str__(self):
         return f"{self.method} {self.url}"
     
+    def main_entry(self):
+        return main_har_entry(self)
+    
     def get_headers_dict(self):
         if not self.headers:
             return {}
@@ -67,6 +211,14 @@ class Request(models.Model):
     headers = models.TextField(blank=True, null=True)
     body = models.TextField(blank=True, null=True)
     wait_time = models.IntegerField(default=5)
+    capture_max_body_size = models.PositiveIntegerField(null=True, blank=True, help_text='Largest response body stored inline (bytes)')
+    capture_mime_types = models.CharField(max_length=500, blank=True, null=True, help_text='Comma separated MIME types whose bodies are stored')
+    scope_include_hosts = models.TextField(blank=True, null=True, help_text='Host globs to capture, comma or newline separated')
+    scope_exclude_hosts = models.TextField(blank=True, null=True, help_text='Host globs never captured, comma or newline separated')
+    scope_include_paths = models.TextField(blank=True, null=True, help_text='Path regexes to capture, one per line')
+    scope_exclude_paths = models.TextField(blank=True, null=True, help_text='Path regexes never captured, one per line')
+    scope_resource_types = models.CharField(max_length=200, blank=True, null=True, help_text='Resource types to keep, e.g. xhr, document')
+    status_code = models.IntegerField(null=True, blank=True)
     har_data = models.JSONField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -90,13 +242,19 @@ class Request(models.Model):
             return {}
 
     def get_status_code(self):
+        if self.status_code is not None:
+            return self.status_code
+        # Requests captured before status_code was stored
         if not self.har_data:
             return None
         try:
             return self.har_data['log']['entries'][0]['response']['status']
-        except (KeyError, IndexError):
+        except (KeyError, IndexError, TypeError):
             return None
 
+    def main_entry(self):
+        return main_har_entry(self)
+
 
 class BackgroundRequest(models.Model):
     """Background requests captured during a regular request"""
@@ -107,12 +265,18 @@ class BackgroundRequest(models.Model):
     body = models.TextField(blank=True, null=True)
     status_code = models.IntegerField(null=True, blank=True)
     resource_type = models.CharField(max_length=20, default='xhr')  # xhr, fetch, script, etc.
+    har_entry = models.OneToOneField('HarEntry', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     har_data = models.JSONField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.method} {self.url} ({self.status_code})"
 
+    @property
+    def entry(self):
+        """The HAR entry of this request; older rows keep it in har_data"""
+        return self.har_entry.data if self.har_entry_id else self.har_data
+
     def get_headers_dict(self):
         if not self.headers:
             return {}
@@ -138,12 +302,18 @@ class CollectionBackgroundRequest(models.Model):
     body = models.TextField(blank=True, null=True)
     status_code = models.IntegerField(null=True, blank=True)
     resource_type = models.CharField(max_length=20, default='xhr')  # xhr, fetch, script, etc.
+    har_entry = models.OneToOneField('HarEntry', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     har_data = models.JSONField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.method} {self.url} ({self.status_code})"
 
+    @property
+    def entry(self):
+        """The HAR entry of this request; older rows keep it in har_data"""
+        return self.har_entry.data if self.har_entry_id else self.har_data
+
     def get_headers_dict(self):
         if not self.headers:
             return {}
@@ -158,4 +328,131 @@ class CollectionBackgroundRequest(models.Model):
         try:
             return json.loads(self.body)
         except:
-            return {}
\ No newline at end of file
+            return {}
+
+class HarEntry(models.Model):
+    """
+    One captured HAR entry
+
+    Scalar columns are indexed so lists and reports never have to load the
+    entry JSON; the full entry (with its body as a blob reference) is only
+    read for detail pages and when a HAR is reassembled for export.
+    """
+    request = models.ForeignKey(Request, on_delete=models.CASCADE, null=True, blank=True, related_name='har_entries')
+    collection_request = models.ForeignKey(CollectionRequest, on_delete=models.CASCADE, null=True, blank=True, related_name='har_entries')
+    position = models.IntegerField()
+    is_main = models.BooleanField(default=False)
+    started_at = models.DateTimeField(null=True, blank=True)
+    method = models.CharField(max_length=10)
+    url = models.TextField()
+    host = models.CharField(max_length=255, db_index=True)
+    status = models.IntegerField(null=True, blank=True, db_index=True)
+    mime_type = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField(default=0)
+    resource_type = models.CharField(max_length=20, db_index=True)
+    time = models.FloatField(null=True, blank=True)  # milliseconds
+    # Timing phases in milliseconds (connect includes tls, as in HAR); null when not
+    # measured, e.g. on a reused connection
+    dns = models.FloatField(null=True, blank=True)
+    connect = models.FloatField(null=True, blank=True)
+    tls = models.FloatField(null=True, blank=True)
+    ttfb = models.FloatField(null=True, blank=True)
+    download = models.FloatField(null=True, blank=True)
+    queue_wait = models.FloatField(null=True, blank=True)  # waiting for a rate limiter slot
+    body_ref = models.CharField(max_length=64, null=True, blank=True)
+    data = models.JSONField()
+
+    class Meta:
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['request', 'position']),
+            models.Index(fields=['collection_request', 'position']),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.url} ({self.status})"
+
+    @classmethod
+    def from_entry(cls, entry, position, **parent):
+        """Build an unsaved row from a HAR entry; `parent` is request= or collection_request="""
+        request = entry.get('request', {})
+        response = entry.get('response', {})
+        content = response.get('content', {})
+
+        timings = entry.get('timings', {})
+
+        def phase(name):
+            value = timings.get(name)
+            return value if isinstance(value, (int, float)) and value >= 0 else None
+
+        # HAR 'time' is the total; otherwise add up the known timing phases, except the
+        # rate limiter queue time in 'blocked', which latency reports must not include
+        total = entry.get('time')
+        if total is None:
+            phases = [phase(name) for name in timings if name != 'blocked' and phase(name) is not None]
+            total = sum(phases) if phases else None
+
+        return cls(
+            position=position,
+            is_main=entry.get('_is_main_request', False),
+            started_at=parse_datetime(entry.get('startedDateTime', '') or ''),
+            method=request.get('method', '')[:10],
+            url=request.get('url', ''),
+            host=(urllib.parse.urlparse(request.get('url', '')).hostname or '')[:255],
+            status=response.get('status'),
+            mime_type=(content.get('mimeType') or '')[:255],
+            size=content.get('size') or 0,
+            resource_type=(entry.get('_resource_type') or entry.get('_resourceType') or 'other')[:20],
+            time=total,
+            dns=phase('dns'),
+            connect=phase('connect'),
+            tls=phase('ssl'),
+            ttfb=phase('wait'),
+            download=phase('receive'),
+            queue_wait=phase('blocked'),
+            body_ref=content.get('_blob'),
+            data=entry,
+            **parent
+        )
+
+def main_har_entry(parent):
+    """Main HAR entry of a Request or CollectionRequest, from HarEntry rows or legacy har_data"""
+    # The same entry split_har_entries picks; it need not be the first captured, or captured at all
+    main = parent.har_entries.filter(is_main=True).first()
+    if main is not None:
+        return main.data
+    # Legacy rows keep their entries in har_data (split rows keep none there)
+    try:
+        entries = parent.har_data['log']['entries']
+    except (KeyError, TypeError):
+        return None
+    return next((entry for entry in entries if entry.get('_is_main_request')), entries[0] if entries else None)
+
+class Blob(models.Model):
+    """Reference count for a response body in the content-addressed blob store"""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256} ({self.refcount} refs)"
+
+
+# Receivers are connected per model so deletes of other models stay fast deletes
+HAR_MODELS = (Request, CollectionRequest, BackgroundRequest, CollectionBackgroundRequest)
+
+def acquire_har_blobs(sender, instance, created, **kwargs):
+    if created:
+        acquire_blobs(instance.har_data)
+
+def release_har_blobs(sender, instance, **kwargs):
+    release_blobs(instance.har_data)
+
+for model in HAR_MODELS:
+    post_save.connect(acquire_har_blobs, sender=model)
+    post_delete.connect(release_har_blobs, sender=model)
+
+@receiver(post_delete, sender=HarEntry)
+def release_har_entry_blobs(sender, instance, **kwargs):
+    if instance.body_ref:
+        release_blobs(instance.data)
@@ -0,0 +1,186 @@
+# interceptor/parse_cache.py
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+# Bump when the parser output changes so stale cache files are ignored
+PARSER_VERSION = 3
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def variables_digest(variables):
+    """Short stable digest of caller-provided variables, or '' when there are none"""
+    if not variables:
+        return ''
+    data = json.dumps(dict(variables), sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()[:16]
+
+class CachedRequests:
+    """
+    Parsed requests stored as JSON Lines
+
+    Iterating reads the requests back one at a time, so a run never holds
+    the whole collection; len() is known without reading them.
+    """
+
+    def __init__(self, path, count):
+        self.path = path
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        with open(self.path, 'r') as f:
+            for line in f:
+                yield json.loads(line)
+
+class ParseCache:
+    """
+    Parsed Postman collections keyed by file content hash
+
+    Results are stored as JSON Lines files under `root`, so a changed file
+    simply gets a new key; the request counts of the `max_entries` most
+    recently used entries are kept in memory. Once the files add up to more
+    than `max_bytes`, the least recently used ones are deleted, which also
+    clears out results for old versions of a file.
+    """
+
+    def __init__(self, root, max_entries=32, max_bytes=None):
+        self.root = str(root)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, sha256, variables=None):
+        digest = variables_digest(variables)
+        return f"{sha256}-v{PARSER_VERSION}" + (f"-{digest}" if digest else '')
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.jsonl")
+
+    def get(self, key):
+        path = self.path(key)
+        if not os.path.exists(path):
+            with self._lock:
+                self._counts.pop(key, None)
+            return None
+
+        with self._lock:
+            count = self._counts.get(key)
+        try:
+            # Refresh the mtime, which eviction goes by
+            os.utime(path)
+            if count is None:
+                with open(path, 'rb') as f:
+                    count = sum(1 for _ in f)
+        except FileNotFoundError:
+            # Evicted meanwhile
+            return None
+
+        self._remember(key, count)
+        return CachedRequests(path, count)
+
+    def put(self, key, requests):
+        """Store an iterable of requests, consuming it as it is written"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so readers never see a partial result
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        count = 0
+        try:
+            with os.fdopen(fd, 'w') as f:
+                for request_data in requests:
+                    f.write(json.dumps(request_data))
+                    f.write('\n')
+                    count += 1
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        self._remember(key, count)
+        self._evict(keep=path)
+        return CachedRequests(path, count)
+
+    def _evict(self, keep=None):
+        """Delete the least recently used results until the cache fits in max_bytes"""
+        if self.max_bytes is None:
+            return
+
+        files = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith('.jsonl'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                total += stat.st_size
+                files.append((stat.st_mtime, stat.st_size, path, filename[:-len('.jsonl')]))
+
+        for _, size, path, key in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self._counts.pop(key, None)
+
+    def _remember(self, key, count):
+        with self._lock:
+            self._counts[key] = count
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+    def get_or_parse(self, path, parse, variables=None, sha256=None):
+        """
+        Return (sha256, CachedRequests) for a collection file
+
+        On a miss, `parse(path, variables)` may return a generator; its
+        requests are written to the cache as they are produced.
+        """
+        sha256 = sha256 or file_sha256(path)
+        key = self.key(sha256, variables)
+
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, parse(path, variables))
+        return sha256, value
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_parse_cache():
+    """Return the process-wide parse cache configured in settings"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            root = getattr(settings, 'INTERCEPTOR_PARSE_CACHE_ROOT', None) or os.path.join(settings.MEDIA_ROOT, 'parse_cache')
+            _cache = ParseCache(
+                root,
+                max_entries=getattr(settings, 'INTERCEPTOR_PARSE_CACHE_SIZE', 32),
+                max_bytes=getattr(settings, 'INTERCEPTOR_PARSE_CACHE_MAX_BYTES', None),
+            )
+        return _cache
@@ -0,0 +1,299 @@
+# interceptor/parser_benchmark.py
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import string
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from . import utils_postman
+from .parse_cache import ParseCache
+from .postman_scripts import collect_produced_names
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'parser_baseline.json')
+
+# Metrics compare() always checks; they do not depend on machine load
+MEMORY_METRICS = ('peak_kb', 'allocated_blocks')
+
+# ---------------------------------------------------------------- generators
+
+def _word(rng, length=8):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+def _request(rng, index, variables=(), body_size=256, producers=(), responses=0):
+    """One v2.x request item using `variables` as {{placeholders}}"""
+    used = list(variables)
+    placeholders = {name: f"{{{{{name}}}}}" for name in used}
+    body = {
+        'id': index,
+        'values': [placeholders.get(name, name) for name in used],
+        'padding': _word(rng, max(0, body_size - 64)),
+    }
+    item = {
+        'name': f"request {index}",
+        'request': {
+            'method': rng.choice(['GET', 'POST', 'PUT', 'PATCH', 'DELETE']),
+            'url': {
+                'raw': f"https://{{{{host}}}}/api/v1/{_word(rng)}/{index}",
+                'protocol': 'https',
+                'host': ['{{host}}'],
+                'path': ['api', 'v1', _word(rng), str(index)],
+                'query': [{'key': name, 'value': placeholders[name]} for name in used[:3]],
+            },
+            'header': [
+                {'key': 'Content-Type', 'value': 'application/json'},
+                {'key': 'Authorization', 'value': 'Bearer {{token}}'},
+            ] + [{'key': f"X-{name}", 'value': placeholders[name]} for name in used[3:6]],
+            'body': {'mode': 'raw', 'raw': json.dumps(body)},
+        },
+    }
+    if responses:
+        # Saved example responses, as exported collections embed them
+        item['response'] = [
+            {'name': f"example {n}", 'code': 200, 'header': [], 'body': json.dumps({'padding': _word(rng, body_size)})}
+            for n in range(responses)
+        ]
+    if producers:
+        item['event'] = [{
+            'listen': 'test',
+            'script': {'exec': ['var jsonData = pm.response.json();'] + [
+                f'pm.collectionVariables.set("{name}", jsonData.data.{name});' for name in producers
+            ]},
+        }]
+    return item
+
+def generate_v2(items=10000, depth=1, variables=20, placeholders=5, body_size=256, chain_every=0, responses=0, seed=1):
+    """
+    Synthetic Postman v2.1 collection
+
+    `items` requests are spread over folders nested `depth` deep; each uses
+    `placeholders` of the `variables` collection variables and carries a
+    raw JSON body of about `body_size` bytes. With `chain_every`, every
+    n-th request sets a variable that the following requests read;
+    `responses` example responses of `body_size` are saved with each item.
+    """
+    rng = random.Random(seed)
+    names = [f"var{i}" for i in range(variables)]
+    collection = {
+        'info': {'name': 'benchmark', 'schema': 'https://schema.getpostman.com/json/collection/v2.1.0/collection.json'},
+        'variable': [{'key': 'host', 'value': 'api.example.com'}, {'key': 'token', 'value': 'secret'}]
+                    + [{'key': name, 'value': _word(rng)} for name in names],
+        'item': [],
+    }
+
+    per_folder = max(1, items // max(1, depth))
+    folder = collection
+    produced = None
+    for index in range(items):
+        if depth > 1 and index % per_folder == 0:
+            child = {'name': f"folder {index // per_folder}", 'item': [],
+                     'variable': [{'key': rng.choice(names), 'value': _word(rng)}]}
+            folder['item'].append(child)
+            folder = child
+
+        used = rng.sample(names, min(placeholders, len(names)))
+        producers = ()
+        if chain_every and index % chain_every == 0:
+            produced = f"chained{index}"
+            producers = (produced,)
+        elif produced:
+            used.append(produced)
+        folder['item'].append(_request(rng, index, used, body_size, producers, responses))
+
+    return collection
+
+def generate_v1(requests=10000, variables=20, body_size=256, seed=1):
+    """Synthetic Postman v1 collection"""
+    rng = random.Random(seed)
+    names = [f"var{i}" for i in range(variables)]
+    return {
+        'name': 'benchmark',
+        'requests': [
+            {
+                'name': f"request {index}",
+                'method': 'POST',
+                'url': f"https://{{{{host}}}}/api/{_word(rng)}/{{{{{rng.choice(names)}}}}}",
+                'headers': 'Content-Type: application/json\nAuthorization: Bearer {{token}}',
+                'dataMode': 'raw',
+                'rawModeData': json.dumps({'value': f"{{{{{rng.choice(names)}}}}}", 'padding': _word(rng, body_size)}),
+            }
+            for index in range(requests)
+        ],
+    }
+
+# Name -> (generator, kwargs)
+SCENARIOS = {
+    'v2_flat_10k': (generate_v2, {'items': 10000}),
+    'v2_deep_nesting': (generate_v2, {'items': 5000, 'depth': 200}),
+    'v2_many_variables': (generate_v2, {'items': 5000, 'variables': 2000, 'placeholders': 20}),
+    'v2_large_bodies': (generate_v2, {'items': 500, 'body_size': 200 * 1024}),
+    'v2_chained': (generate_v2, {'items': 5000, 'chain_every': 10}),
+    'v2_example_responses': (generate_v2, {'items': 1000, 'responses': 5, 'body_size': 20 * 1024}),
+    'v1_10k': (generate_v1, {'requests': 10000}),
+}
+
+# ---------------------------------------------------------------- measurement
+
+def measure(func, repeat=5):
+    """
+    Time `func()` and profile its memory
+
+    Returns the median wall time of `repeat` runs, plus the peak traced
+    memory and the number of memory blocks still allocated by its result,
+    from a separate traced run (tracing slows the code down).
+    """
+    times = []
+    for _ in range(repeat):
+        utils_postman.compile_template.cache_clear()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    utils_postman.compile_template.cache_clear()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    del result
+
+    return {
+        'seconds': round(statistics.median(times), 4),
+        'peak_kb': round(peak / 1024, 1),
+        'allocated_blocks': blocks,
+    }
+
+def _body_of(collection):
+    """The largest raw body of a collection, as parsed JSON"""
+    bodies = []
+    stack = list(collection.get('item', []))
+    while stack:
+        item = stack.pop()
+        stack.extend(item.get('item', []))
+        raw = item.get('request', {}).get('body', {}).get('raw')
+        if raw:
+            bodies.append(raw)
+    return json.loads(max(bodies, key=len)) if bodies else {}
+
+def _items_of(collection):
+    items = []
+    stack = list(reversed(collection.get('item', [])))
+    while stack:
+        item = stack.pop()
+        if 'item' in item:
+            stack.extend(reversed(item['item']))
+        else:
+            items.append(item)
+    return items
+
+def _parse_cached(path, cache_root, cold):
+    """parse_postman_collection() on `path` as a run does, reading every request back"""
+    if cold:
+        shutil.rmtree(cache_root, ignore_errors=True)
+    # Stands in for an unsaved PostmanCollection, so nothing is written to the database
+    collection = SimpleNamespace(file=SimpleNamespace(path=path), file_sha256=None, parsed_request_count=None, pk=None)
+    requests = utils_postman.parse_postman_collection(collection, cache=ParseCache(cache_root))
+    return sum(1 for _ in requests)
+
+def run_scenario(name, repeat=5):
+    """Benchmark the parser entry points on one scenario; returns {benchmark: metrics}"""
+    generator, kwargs = SCENARIOS[name]
+    collection = generator(**kwargs)
+    variables = utils_postman.variable_scope({}, utils_postman.extract_variables_from_collection(collection))
+    results = {}
+
+    fd, path = tempfile.mkstemp(suffix='.json', prefix='postman-benchmark-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(collection, f)
+        results['file_size_kb'] = round(os.path.getsize(path) / 1024, 1)
+        results['parse_collection_file'] = measure(lambda: utils_postman.parse_collection_file(path), repeat)
+        # What a run holds: one request at a time
+        results['iter_collection_file'] = measure(
+            lambda: sum(1 for _ in utils_postman.iter_collection_file(path)), repeat)
+        # The entry point runs use: hash the file, then parse into the cache or read it back
+        cache_root = tempfile.mkdtemp(prefix='postman-benchmark-cache-')
+        try:
+            results['parse_postman_collection'] = measure(lambda: _parse_cached(path, cache_root, cold=True), repeat)
+            results['parse_postman_collection_cached'] = measure(
+                lambda: _parse_cached(path, cache_root, cold=False), repeat)
+        finally:
+            shutil.rmtree(cache_root, ignore_errors=True)
+    finally:
+        os.unlink(path)
+
+    if 'item' in collection:
+        results['extract_requests_v2'] = measure(
+            lambda: utils_postman.extract_requests_v2(collection, variables=variables), repeat)
+        items = _items_of(collection)
+        results['extract_single_request'] = measure(
+            lambda: [utils_postman.extract_single_request(item, variables=variables) for item in items], repeat)
+        body = _body_of(collection)
+        results['replace_variables_in_dict'] = measure(
+            lambda: [utils_postman.replace_variables_in_dict(body, variables) for _ in range(100)], repeat)
+        results['collect_produced_names'] = measure(lambda: collect_produced_names(collection), repeat)
+        requests = utils_postman.extract_requests_v2(
+            collection, variables=variables, runtime_names=collect_produced_names(collection))
+        results['build_dependency_graph'] = measure(lambda: utils_postman.build_dependency_graph(requests), repeat)
+    else:
+        results['extract_requests_v1'] = measure(
+            lambda: utils_postman.extract_requests_v1(collection, variables=variables), repeat)
+
+    return results
+
+def run_benchmarks(scenarios=None, repeat=5):
+    """Run scenarios (default all) and return a report"""
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'scenarios': {name: run_scenario(name, repeat) for name in (scenarios or SCENARIOS)},
+    }
+
+# ---------------------------------------------------------------- baselines
+
+def load_baseline(path=DEFAULT_BASELINE_PATH):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_baseline(report, path=DEFAULT_BASELINE_PATH):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+def compare(report, baseline, tolerance=0.2, timing_tolerance=None):
+    """
+    Return regressions of `report` against `baseline`
+
+    A benchmark regresses when its peak memory or allocated blocks grew by
+    more than `tolerance` (a fraction). Wall times vary with machine load,
+    so they are only checked when a `timing_tolerance` is given. Returns
+    [(scenario, benchmark, metric, old, new)].
+    """
+    limits = {metric: tolerance for metric in MEMORY_METRICS}
+    if timing_tolerance is not None:
+        limits['seconds'] = timing_tolerance
+    regressions = []
+    for scenario, benchmarks in report['scenarios'].items():
+        old_benchmarks = baseline.get('scenarios', {}).get(scenario, {})
+        for benchmark, metrics in benchmarks.items():
+            old = old_benchmarks.get(benchmark)
+            if not isinstance(metrics, dict) or not isinstance(old, dict):
+                continue
+            for metric, limit in limits.items():
+                if (old.get(metric) or 0) > 0 and metrics[metric] > old[metric] * (1 + limit):
+                    regressions.append((scenario, benchmark, metric, old[metric], metrics[metric]))
+    return regressions
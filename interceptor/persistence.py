@@ -0,0 +1,137 @@
+# interceptor/persistence.py
+import json
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from .blobstore import acquire_blobs, blob_hashes, release_blob_counts, resolve_har
+
+def entry_headers_json(entry):
+    """Request headers of a HAR entry in the stored `[{name: value}, ...]` format"""
+    return json.dumps([{h['name']: h['value']} for h in entry['request']['headers']])
+
+def split_har_entries(har_data):
+    """Return (main entry or None, background entries) of a HAR"""
+    main_entry = None
+    background_entries = []
+
+    if har_data and 'log' in har_data:
+        for entry in har_data['log'].get('entries', []):
+            if entry.get('_is_main_request', False):
+                if main_entry is None:
+                    main_entry = entry
+            elif entry.get('_is_background_request', False):
+                background_entries.append(entry)
+
+    return main_entry, background_entries
+
+def har_envelope(har_data):
+    """The HAR log without its entries, as stored on the parent row"""
+    log = {k: v for k, v in har_data.get('log', {}).items() if k != 'entries'}
+    log['entries'] = []
+    return {'log': log}
+
+def parent_field(parent):
+    """Name of the HarEntry foreign key pointing at `parent`"""
+    from .models import Request
+    return 'request' if isinstance(parent, Request) else 'collection_request'
+
+def background_rows(parent, entries, model):
+    """Build unsaved background request rows for `parent` from (HarEntry, entry) pairs"""
+    return [
+        model(
+            parent_request=parent,
+            url=entry['request']['url'],
+            method=entry['request']['method'],
+            headers=entry_headers_json(entry),
+            body=entry['request']['body'],
+            status_code=entry['response']['status'],
+            resource_type=entry.get('_resource_type', 'xhr'),
+            har_entry=har_entry
+        )
+        for har_entry, entry in entries
+    ]
+
+def save_capture(parent, har_data, background_model, batch_size=None):
+    """
+    Save a captured request, its HAR entries and its background requests in one transaction
+
+    `parent` is an unsaved or saved Request / CollectionRequest. Each HAR
+    entry is stored once, as a HarEntry row; the parent keeps only the HAR
+    envelope and its main status code, and background rows link to their
+    entry. Rows are written with bulk_create in batches of `batch_size`
+    (INTERCEPTOR_BULK_BATCH_SIZE). Returns the saved background rows.
+    """
+    from .models import HarEntry
+
+    batch_size = batch_size or getattr(settings, 'INTERCEPTOR_BULK_BATCH_SIZE', 500)
+    entries = har_data['log'].get('entries', []) if har_data and 'log' in har_data else []
+    main_entry, _ = split_har_entries(har_data)
+
+    with transaction.atomic():
+        parent.har_data = har_envelope(har_data) if har_data and 'log' in har_data else har_data
+        if main_entry is not None:
+            parent.status_code = main_entry['response']['status']
+        parent.save()
+
+        har_entries = [
+            HarEntry.from_entry(entry, position, **{parent_field(parent): parent})
+            for position, entry in enumerate(entries)
+        ]
+        HarEntry.objects.bulk_create(har_entries, batch_size=batch_size)
+
+        background = [
+            (har_entry, entry) for har_entry, entry in zip(har_entries, entries)
+            if entry.get('_is_background_request', False)
+        ]
+        rows = background_rows(parent, background, background_model)
+        background_model.objects.bulk_create(rows, batch_size=batch_size)
+
+        # bulk_create skips post_save, so count the blob references here
+        acquire_blobs({'log': {'entries': entries}})
+
+    return rows
+
+def assemble_har(parent):
+    """Reassemble the full HAR of a Request or CollectionRequest, with bodies resolved"""
+    har_data = parent.har_data or {}
+    entries = [e.data for e in parent.har_entries.all()]
+
+    if entries or 'log' not in har_data:
+        har_data = har_envelope(har_data) if 'log' in har_data else {'log': {'entries': []}}
+        har_data['log']['entries'] = entries
+
+    return resolve_har(har_data)
+
+def delete_runs(runs):
+    """
+    Delete collection runs with their requests, HAR entries and background requests
+
+    The post_delete receivers would load and release every row one at a
+    time; instead the blob references of all rows are counted with one
+    aggregate query, released together, and the rows are deleted table by
+    table without signals. Only legacy rows, which keep whole HARs in
+    har_data, are read to count their references.
+    """
+    from .models import CollectionBackgroundRequest, CollectionRequest, HarEntry
+
+    with transaction.atomic():
+        requests = CollectionRequest.objects.filter(run__in=runs)
+        entries = HarEntry.objects.filter(collection_request__in=requests)
+        background = CollectionBackgroundRequest.objects.filter(parent_request__in=requests)
+
+        hashes = Counter(dict(
+            entries.exclude(body_ref=None).values_list('body_ref').annotate(count=Count('id')).order_by()
+        ))
+        legacy = [
+            *requests.filter(har_entries__isnull=True).exclude(har_data=None).values_list('har_data', flat=True),
+            *background.filter(har_entry=None).exclude(har_data=None).values_list('har_data', flat=True),
+        ]
+        for har_data in legacy:
+            hashes.update(blob_hashes(har_data))
+        release_blob_counts(hashes)
+
+        # Children first; _raw_delete skips the per-row signals already accounted for above
+        for queryset in (background, entries, requests):
+            queryset._raw_delete(queryset.db)
+        runs.delete()
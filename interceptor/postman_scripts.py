@@ -0,0 +1,177 @@
+# interceptor/postman_scripts.py
+import json
+import re
+
+# A JavaScript string literal, escapes included
+STRING = r'"(?:[^"\\\n]|\\.)*"' + r"|'(?:[^'\\\n]|\\.)*'"
+# The start of pm.variables.set("name", <expr>) and friends, plus the legacy postman.set*Variable API;
+# the value expression runs to the call's closing parenthesis (see _call_argument)
+SET_PATTERN = re.compile(
+    r'''(?:pm\.(?:variables|collectionVariables|environment|globals)\.set'''
+    r'''|postman\.set(?:Environment|Global)Variable)'''
+    r'''\(\s*(?P<name>''' + STRING + r''')\s*,\s*'''
+)
+# var jsonData = pm.response.json();
+ALIAS_PATTERN = re.compile(r'(?:var|let|const)\s+(?P<alias>\w+)\s*=\s*(?:pm\.response\.json\(\)|JSON\.parse\(\s*responseBody\s*\))\s*;?')
+RESPONSE_JSON_PATTERN = re.compile(r'^(?:pm\.response\.json\(\)|JSON\.parse\(\s*responseBody\s*\))(?P<path>.*)$')
+HEADER_PATTERN = re.compile(r'''^pm\.response\.headers\.get\(\s*(["'])(?P<header>[^"']+)\1\s*\)$''')
+PATH_TOKEN_PATTERN = re.compile(r'''\.(\w+)|\[\s*(\d+)\s*\]|\[\s*(["'])(.+?)\3\s*\]''')
+LITERAL_PATTERN = re.compile(STRING)
+# String literals and brackets, to find where a call's arguments end
+ARGUMENT_TOKEN_PATTERN = re.compile(STRING + r'''|[()\[\]{}]''')
+SINGLE_QUOTED_ESCAPE = re.compile(r'''\\.|"''')
+
+def _double_quoted(match):
+    token = match.group()
+    return "'" if token == "\\'" else '\\"' if token == '"' else token
+
+def _string_value(literal):
+    """The value of a single- or double-quoted string literal; ValueError for escapes JSON lacks"""
+    if literal[0] == "'":
+        literal = '"' + SINGLE_QUOTED_ESCAPE.sub(_double_quoted, literal[1:-1]) + '"'
+    return json.loads(literal)
+
+def _call_argument(script, start):
+    """
+    The text of a call's last argument, from `start` to the call's closing parenthesis
+
+    Returns (argument, end), or (None, end) when the parenthesis is never closed.
+    """
+    depth = 0
+    for match in ARGUMENT_TOKEN_PATTERN.finditer(script, start):
+        token = match.group()
+        if token in '([{':
+            depth += 1
+        elif token in ')]}':
+            if depth == 0:
+                return script[start:match.start()], match.end()
+            depth -= 1
+    return None, len(script)
+
+def _parse_path(path):
+    """Split `.a[0]["b"]` into ['a', 0, 'b'], or None if it is not a plain path"""
+    tokens = []
+    position = 0
+    for match in PATH_TOKEN_PATTERN.finditer(path):
+        if match.start() != position:
+            return None
+        name, index, _, key = match.groups()
+        tokens.append(name if name is not None else int(index) if index is not None else key)
+        position = match.end()
+    return tokens if position == len(path.strip()) else None
+
+def parse_expression(expr, aliases=()):
+    """
+    Turn the value expression of a set() call into a JSON-able spec
+
+    Understood forms are string/number literals, response JSON paths
+    (`pm.response.json().a.b`, or via an alias of it), response headers and
+    the raw response text. Anything else is {'unsupported': expr}.
+    """
+    expr = expr.strip()
+
+    # Exactly one string literal; `"a" + "b"` and the like are unsupported
+    if LITERAL_PATTERN.fullmatch(expr):
+        try:
+            return {'literal': _string_value(expr)}
+        except ValueError:
+            return {'unsupported': expr}
+    try:
+        return {'literal': json.loads(expr)}
+    except ValueError:
+        pass
+
+    if expr in ('pm.response.text()', 'responseBody'):
+        return {'text': True}
+
+    header = HEADER_PATTERN.match(expr)
+    if header:
+        return {'header': header.group('header')}
+
+    json_match = RESPONSE_JSON_PATTERN.match(expr)
+    path = json_match.group('path') if json_match else None
+    if path is None:
+        alias = re.match(r'^(\w+)(.*)$', expr)
+        if alias and alias.group(1) in aliases:
+            path = alias.group(2)
+    if path is not None:
+        tokens = _parse_path(path)
+        if tokens is not None:
+            return {'json': tokens}
+
+    return {'unsupported': expr}
+
+def parse_script(lines, phase):
+    """
+    Return the variables a script sets, as [{'name', 'phase', 'expr'}, ...]
+
+    Every set() call counts, wherever it is: several on a line, inside
+    blocks and conditionals, or spread over lines.
+    """
+    script = lines if isinstance(lines, str) else '\n'.join(lines or [])
+
+    aliases = {match.group('alias') for match in ALIAS_PATTERN.finditer(script)}
+    producers = []
+    position = 0
+    while True:
+        match = SET_PATTERN.search(script, position)
+        if match is None:
+            break
+        expr, position = _call_argument(script, match.end())
+        try:
+            name = _string_value(match.group('name'))
+        except ValueError:
+            continue
+        producers.append({
+            'name': name,
+            'phase': phase,
+            'expr': parse_expression(expr, aliases) if expr is not None else {'unsupported': script[match.end():].split('\n', 1)[0]},
+        })
+    return producers
+
+def item_producers(item):
+    """Variables set by an item's pre-request and test scripts"""
+    producers = []
+    for event in item.get('event', []) or []:
+        phase = event.get('listen')
+        script = event.get('script', {}) or {}
+        if phase in ('prerequest', 'test') and 'exec' in script:
+            producers.extend(parse_script(script.get('exec'), phase))
+    return producers
+
+def collect_produced_names(collection_data):
+    """Names of every variable set by a script anywhere in a v2.x collection"""
+    names = set()
+    stack = list(collection_data.get('item', []))
+    while stack:
+        item = stack.pop()
+        names.update(p['name'] for p in item_producers(item))
+        stack.extend(item.get('item', []) or [])
+    return names
+
+def evaluate(expr, status=None, headers=None, text=None):
+    """
+    Evaluate a parsed expression against a response
+
+    Returns (True, value) or (False, None) when the value cannot be known,
+    e.g. an unsupported expression or a missing JSON path.
+    """
+    if 'literal' in expr:
+        return True, expr['literal']
+    if expr.get('text'):
+        return (text is not None), text
+    if 'header' in expr:
+        wanted = expr['header'].lower()
+        for header in headers or []:
+            if header.get('name', '').lower() == wanted:
+                return True, header.get('value')
+        return False, None
+    if 'json' in expr:
+        try:
+            value = json.loads(text)
+            for token in expr['json']:
+                value = value[token]
+        except (TypeError, ValueError, KeyError, IndexError):
+            return False, None
+        return True, value
+    return False, None
@@ -0,0 +1,277 @@
+# interceptor/postman_stream.py
+import json
+import re
+from .postman_scripts import item_producers
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+STRUCTURE = re.compile(r'["\[\]{}]')
+NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+_decoder = json.JSONDecoder()
+
+class JsonStream:
+    """
+    Pull reader over a JSON document in a text file
+
+    Values are read one at a time: iter_object() / iter_array() walk a
+    container without loading it, read_value() loads a single value and
+    skip_value() steps over one without building it. Only the unread part of
+    the current value is kept in memory.
+    """
+
+    def __init__(self, f, chunk_size=64 * 1024):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        """Drop the consumed part of the buffer and read more; returns False at the end of the file"""
+        chunk = self.f.read(size or self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def _error(self, message):
+        return ValueError(f"{message} at offset {self.pos} of the buffered input")
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at the end of the file)"""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise self._error(f"Expected {char!r}")
+        self.pos += 1
+
+    def read_value(self):
+        """Load the next value"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                # Grow geometrically so a large value is not re-decoded once per chunk
+                self._fill(max(self.chunk_size, len(self.buffer)))
+                continue
+            # A number running into the end of the buffer may continue in the next chunk,
+            # including one cut inside its fraction or exponent ("12." or "1e")
+            if (not self.eof and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and all(char in NUMBER_CHARS for char in self.buffer[end:])):
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+    def skip_value(self):
+        """Step over the next value without loading it"""
+        char = self.peek()
+        if char == '"':
+            self.pos += 1
+            self._skip_string()
+        elif char in ('{', '['):
+            self._skip_container()
+        else:
+            self.read_value()
+
+    def _skip_string(self):
+        """Step past the closing quote of a string whose opening quote was consumed"""
+        while True:
+            quote = self.buffer.find('"', self.pos)
+            if quote == -1:
+                # Keep trailing backslashes, they may escape the first quote of the next chunk
+                end = len(self.buffer)
+                while end > self.pos and self.buffer[end - 1] == '\\':
+                    end -= 1
+                self.pos = end
+                if not self._fill():
+                    raise self._error("Unterminated string")
+                continue
+            escapes = 0
+            while quote - escapes > self.pos and self.buffer[quote - escapes - 1] == '\\':
+                escapes += 1
+            self.pos = quote + 1
+            if escapes % 2 == 0:
+                return
+
+    def _skip_container(self):
+        depth = 0
+        while True:
+            match = STRUCTURE.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                if not self._fill():
+                    raise self._error("Unterminated container")
+                continue
+            char = match.group()
+            self.pos = match.end()
+            if char == '"':
+                self._skip_string()
+            elif char in '[{':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def iter_object(self):
+        """
+        Yield the keys of the next object
+
+        The caller must consume each key's value (read, skip or iterate it)
+        before asking for the next key.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise self._error("Expected an object key")
+            key = self.read_value()
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise self._error("Expected ',' or '}'")
+
+    def iter_array(self):
+        """Yield the indices of the next array; the caller consumes each element"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise self._error("Expected ',' or ']'")
+
+def scan_collection(f):
+    """
+    First pass over a Postman collection file: everything but the requests
+
+    Returns an outline dict with the collection `format` ('v2', 'v1',
+    'single' or None), its `variable` / `environment` entries if any, the
+    `folders` of a v2.x collection keyed by item path (a tuple of indices)
+    with their name and variables, and the `produced` names every script
+    sets. Exports often put the variables after the items, which is why the
+    requests are read in a second pass (see iter_items_v2).
+    """
+    stream = JsonStream(f)
+    outline = {'format': None, 'folders': {}, 'produced': set()}
+    formats = set()
+
+    for key in stream.iter_object():
+        if key == 'item':
+            formats.add('v2')
+            _scan_items(stream, (), outline)
+        elif key == 'requests':
+            formats.add('v1')
+            stream.skip_value()
+        elif key == 'request':
+            formats.add('single')
+            stream.skip_value()
+        elif key in ('variable', 'environment'):
+            outline[key] = stream.read_value()
+        else:
+            stream.skip_value()
+
+    # Same precedence as a loaded collection: items, then v1 requests, then a lone request
+    outline['format'] = next((name for name in ('v2', 'v1', 'single') if name in formats), None)
+    return outline
+
+def _scan_items(stream, path, outline):
+    for index in stream.iter_array():
+        item_path = path + (index,)
+        folder = {}
+        is_folder = False
+        for key in stream.iter_object():
+            if key == 'item':
+                is_folder = True
+                _scan_items(stream, item_path, outline)
+            elif key in ('name', 'variable'):
+                folder[key] = stream.read_value()
+            elif key == 'event':
+                outline['produced'].update(p['name'] for p in item_producers({'event': stream.read_value()}))
+            else:
+                stream.skip_value()
+        if is_folder:
+            outline['folders'][item_path] = folder
+
+def iter_items_v2(f, folders):
+    """
+    Yield (folders, item) for every request item of a v2.x collection file
+
+    `folders` is the outline's folder map from scan_collection; each item
+    comes with the tuple of its enclosing folders, outermost first, and
+    siblings share the same tuple. Items are loaded without their
+    `response` examples.
+    """
+    stream = JsonStream(f)
+    for key in stream.iter_object():
+        if key == 'item':
+            yield from _iter_items(stream, (), (), folders)
+        else:
+            stream.skip_value()
+
+def _iter_items(stream, path, chain, folders):
+    for index in stream.iter_array():
+        item_path = path + (index,)
+        item = {}
+        is_folder = False
+        for key in stream.iter_object():
+            if key == 'item':
+                is_folder = True
+                yield from _iter_items(stream, item_path, chain + (folders.get(item_path, {}),), folders)
+            elif key == 'response' or is_folder:
+                stream.skip_value()
+            else:
+                item[key] = stream.read_value()
+        if not is_folder and 'request' in item:
+            yield chain, item
+
+def iter_requests_v1(f):
+    """Yield the requests of a v1 collection file, without their `responses` examples"""
+    stream = JsonStream(f)
+    for key in stream.iter_object():
+        if key != 'requests':
+            stream.skip_value()
+            continue
+        for _ in stream.iter_array():
+            request = {}
+            for request_key in stream.iter_object():
+                if request_key == 'responses':
+                    stream.skip_value()
+                else:
+                    request[request_key] = stream.read_value()
+            yield request
+
+def read_single_request(f):
+    """Load a collection file that is a single request item, without its `response` examples"""
+    stream = JsonStream(f)
+    item = {}
+    for key in stream.iter_object():
+        if key in ('response', 'item', 'requests'):
+            stream.skip_value()
+        else:
+            item[key] = stream.read_value()
+    return item
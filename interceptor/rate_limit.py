@@ -0,0 +1,105 @@
+# interceptor/rate_limit.py
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+
+# Limit names, as used in settings and on PostmanCollection / CaptureLimits
+LIMIT_NAMES = ('rate_limit', 'max_in_flight', 'host_rate_limit', 'host_max_in_flight')
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` requests per second, with bursts of `burst`
+
+    Tokens are reserved rather than polled for: a caller takes one
+    immediately and is told how long to wait for it, so waiters are served
+    in arrival order.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return the seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class RateLimiter:
+    """
+    Global and per-host limits on request rate and requests in flight
+
+    `rate_limit` / `host_rate_limit` are requests per second and
+    `max_in_flight` / `host_max_in_flight` cap concurrent requests; None
+    disables a limit. Per-host state is created on first use.
+
+    Usage:
+        with limiter.slot(url) as waited:
+            ...  # send the request; waited is the queue time in seconds
+    """
+
+    def __init__(self, rate_limit=None, max_in_flight=None, host_rate_limit=None, host_max_in_flight=None):
+        self.host_rate_limit = host_rate_limit
+        self.host_max_in_flight = host_max_in_flight
+        self._bucket = TokenBucket(rate_limit) if rate_limit else None
+        self._in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self._host_buckets = {}
+        self._host_in_flight = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self._bucket or self._in_flight or self.host_rate_limit or self.host_max_in_flight)
+
+    def _host_limits(self, host):
+        with self._lock:
+            if host not in self._host_buckets:
+                self._host_buckets[host] = TokenBucket(self.host_rate_limit) if self.host_rate_limit else None
+                self._host_in_flight[host] = (
+                    threading.BoundedSemaphore(self.host_max_in_flight) if self.host_max_in_flight else None
+                )
+            return self._host_buckets[host], self._host_in_flight[host]
+
+    @contextmanager
+    def slot(self, url):
+        """Wait until a request to `url` may be sent; yields the seconds spent waiting"""
+        start = time.monotonic()
+        host_bucket, host_in_flight = self._host_limits(urllib.parse.urlparse(url).hostname or '')
+
+        # Always host before global, so no two callers can deadlock
+        held = []
+        for semaphore in (host_in_flight, self._in_flight):
+            if semaphore is not None:
+                semaphore.acquire()
+                held.append(semaphore)
+
+        try:
+            delay = max((bucket.reserve() for bucket in (host_bucket, self._bucket) if bucket is not None), default=0)
+            if delay:
+                time.sleep(delay)
+            yield time.monotonic() - start
+        finally:
+            for semaphore in reversed(held):
+                semaphore.release()
+
+# Limiters are shared by every run with the same limits, so concurrent runs
+# against one host count against the same buckets
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(limits):
+    """Return the shared RateLimiter for a dict of limits, or None if nothing is limited"""
+    key = tuple(limits.get(name) for name in LIMIT_NAMES)
+    if not any(key):
+        return None
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(**dict(zip(LIMIT_NAMES, key)))
+        return _limiters[key]
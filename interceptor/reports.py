@@ -0,0 +1,65 @@
+# interceptor/reports.py
+import datetime
+from django.db.models import Aggregate, Count, F, FloatField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import HarEntry
+
+# Percentiles reported for every timing
+PERCENTILES = (0.5, 0.95, 0.99)
+
+class Percentile(Aggregate):
+    """PostgreSQL percentile_cont(fraction) WITHIN GROUP (ORDER BY expression)"""
+    function = 'percentile_cont'
+    name = 'Percentile'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        fraction = float(fraction)
+        if not 0 <= fraction <= 1:
+            raise ValueError('Percentile fraction must be between 0 and 1')
+        super().__init__(expression, fraction=fraction, **extra)
+
+def _percentiles(field):
+    return {
+        f"{field}_p{round(fraction * 100)}": Percentile(field, fraction)
+        for fraction in PERCENTILES
+    }
+
+def latency_report(collection, days=30):
+    """
+    Latency percentiles per named request of a collection
+
+    Aggregates the main HAR entry of every captured run in the last `days`
+    days in the database. Returns {'requests': [...], 'trend': [...]}: one
+    row per request name with p50/p95/p99 of total time, TTFB and rate
+    limiter queue wait, and one
+    row per request name and day with the total time percentiles.
+    """
+    entries = HarEntry.objects.filter(
+        collection_request__collection=collection,
+        is_main=True,
+        time__isnull=False,
+    )
+    if days:
+        entries = entries.filter(collection_request__created_at__gte=timezone.now() - datetime.timedelta(days=days))
+
+    requests = (
+        entries
+        .values(name=F('collection_request__name'))
+        .annotate(count=Count('id'), **_percentiles('time'), **_percentiles('ttfb'), **_percentiles('queue_wait'))
+        .order_by('name')
+    )
+    trend = (
+        entries
+        .annotate(day=TruncDate('collection_request__created_at'))
+        .values('day', name=F('collection_request__name'))
+        .annotate(count=Count('id'), **_percentiles('time'))
+        .order_by('name', 'day')
+    )
+
+    return {
+        'requests': list(requests),
+        'trend': [{**row, 'day': row['day'].isoformat()} for row in trend],
+    }
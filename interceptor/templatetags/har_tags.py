@@ -0,0 +1,9 @@
+from django import template
+from interceptor.blobstore import body_text as resolve_body_text
+
+register = template.Library()
+
+@register.filter
+def body_text(content):
+    """Response body of a HAR content object, loaded from the blob store when needed"""
+    return resolve_body_text(content)
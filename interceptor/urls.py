@@ -21,6 +21,10 @@ urlpatterns = [
     path('postman_interceptor/projects/<int:project_id>/collections/<int:collection_id>/', views.collection_detail, name='collection_detail'),
     path('postman_interceptor/projects/<int:project_id>/collections/<int:collection_id>/run/', views.collection_run, name='collection_run'),
     path('postman_interceptor/projects/<int:project_id>/collections/<int:collection_id>/status/', views.collection_status, name='collection_status'),
+    path('postman_interceptor/projects/<int:project_id>/collections/<int:collection_id>/runs/<int:run_id>/status/', views.run_status, name='run_status'),
+    path('postman_interceptor/projects/<int:project_id>/collections/<int:collection_id>/runs/<int:run_id>/resume/', views.run_resume, name='run_resume'),
+    path('postman_interceptor/projects/<int:project_id>/collections/<int:collection_id>/runs/<int:run_id>/delete/', views.run_delete, name='run_delete'),
+    path('postman_interceptor/projects/<int:project_id>/collections/<int:collection_id>/latency/', views.collection_latency, name='collection_latency'),
     path('postman_interceptor/projects/<int:project_id>/collections/<int:collection_id>/delete/', views.collection_delete, name='collection_delete'),
     path('postman_interceptor/projects/<int:project_id>/collections/<int:collection_id>/requests/<int:request_id>/', views.collection_request_detail, name='collection_request_detail'),
 # Add to urls.py
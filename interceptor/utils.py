@@ -1,65 +1,123 @@
 # interceptor/utils.py
-import subprocess
-import json
-import tempfile
-import os
+import threading
+from django.conf import settings
+from .browser_pool import get_pool
+from .blobstore import get_blob_store, externalize_entry
+from .capture import Interceptor, CapturePolicy, CaptureScope, new_har, DEFAULT_INLINE_MIME_TYPES, DEFAULT_MAX_INLINE_BODY_SIZE
+from .http_engine import HttpEngine, create_pool_manager, DEFAULT_HTTP_TIMEOUT
+from .rate_limit import LIMIT_NAMES
 
-# Update in utils.py
-def run_interceptor(method, url, headers=None, body=None, wait_time=5, capture_background=True):
+# Capture engines: 'browser' drives a pooled Chrome, 'http' sends the request directly
+ENGINE_BROWSER = 'browser'
+ENGINE_HTTP = 'http'
+
+_http_pool = None
+_http_pool_lock = threading.Lock()
+
+def default_capture_policy():
+    """Return the capture policy configured in settings"""
+    return CapturePolicy(
+        max_body_size=getattr(settings, 'INTERCEPTOR_MAX_INLINE_BODY_SIZE', DEFAULT_MAX_INLINE_BODY_SIZE),
+        mime_types=getattr(settings, 'INTERCEPTOR_INLINE_MIME_TYPES', DEFAULT_INLINE_MIME_TYPES),
+    )
+
+def capture_policy_for(obj):
+    """Return the capture policy of a Request or PostmanCollection, falling back to settings"""
+    return CapturePolicy.from_config(
+        max_body_size=getattr(obj, 'capture_max_body_size', None),
+        mime_types=getattr(obj, 'capture_mime_types', None),
+        defaults=default_capture_policy(),
+    )
+
+def capture_scope_for(obj):
+    """Return the capture scope of a Request or PostmanCollection"""
+    return CaptureScope(
+        include_hosts=getattr(obj, 'scope_include_hosts', None),
+        exclude_hosts=getattr(obj, 'scope_exclude_hosts', None),
+        include_paths=getattr(obj, 'scope_include_paths', None),
+        exclude_paths=getattr(obj, 'scope_exclude_paths', None),
+        resource_types=getattr(obj, 'scope_resource_types', None),
+    )
+
+def rate_limits_for(collection):
+    """
+    Return the rate limits of a PostmanCollection
+
+    Each limit comes from the collection, then its project's CaptureLimits,
+    then INTERCEPTOR_RATE_LIMITS; None means unlimited.
+    """
+    defaults = getattr(settings, 'INTERCEPTOR_RATE_LIMITS', {})
+    project_limits = getattr(collection.project, 'capture_limits', None) if collection.project_id else None
+
+    limits = {}
+    for name in LIMIT_NAMES:
+        value = getattr(collection, name, None)
+        if value is None and project_limits is not None:
+            value = getattr(project_limits, name)
+        limits[name] = value if value is not None else defaults.get(name)
+    return limits
+
+def get_interceptor(**options):
+    """Return an Interceptor backed by the shared browser pool and configured from settings"""
+    options.setdefault('wait_mode', getattr(settings, 'INTERCEPTOR_WAIT_MODE', 'idle'))
+    options.setdefault('quiet_window', getattr(settings, 'INTERCEPTOR_QUIET_WINDOW', 0.5))
+    if options.get('capture_policy') is None:
+        options['capture_policy'] = default_capture_policy()
+    return Interceptor(pool=get_pool(), **options)
+
+def get_http_pool():
+    """Return the process-wide keep-alive HTTP connection pool"""
+    global _http_pool
+    with _http_pool_lock:
+        if _http_pool is None:
+            _http_pool = create_pool_manager(
+                maxsize=getattr(settings, 'INTERCEPTOR_HTTP_POOL_SIZE', 10),
+                timeout=getattr(settings, 'INTERCEPTOR_HTTP_TIMEOUT', DEFAULT_HTTP_TIMEOUT),
+            )
+        return _http_pool
+
+def get_http_engine(**options):
+    """Return an HttpEngine backed by the shared connection pool and configured from settings"""
+    options.setdefault('timeout', getattr(settings, 'INTERCEPTOR_HTTP_TIMEOUT', DEFAULT_HTTP_TIMEOUT))
+    if options.get('capture_policy') is None:
+        options['capture_policy'] = default_capture_policy()
+    return HttpEngine(pool_manager=get_http_pool(), **options)
+
+def iter_interceptor(method, url, headers=None, body=None, wait_time=5, capture_background=True, engine=ENGINE_BROWSER, **options):
+    """
+    Capture the request and yield HAR entries one at a time
+
+    With the default 'browser' engine the request runs on a pooled browser,
+    which stays leased until the generator is exhausted or closed. wait_time
+    is the upper bound; with the default 'idle' wait mode the capture
+    finishes as soon as the network has gone quiet. The 'http' engine sends
+    the request directly and ignores wait_time. Inline response bodies are
+    moved to the blob store unless INTERCEPTOR_STORE_BODIES is off.
+    """
+    if engine == ENGINE_HTTP:
+        capturer = get_http_engine(capture_all=capture_background, **options)
+    else:
+        capturer = get_interceptor(wait_time=wait_time, capture_all=capture_background, **options)
+    entries = capturer.iter_entries(method, url, headers=headers, body=body)
+
+    if getattr(settings, 'INTERCEPTOR_STORE_BODIES', True):
+        store = get_blob_store()
+        entries = (externalize_entry(entry, store) for entry in entries)
+
+    return entries
+
+def run_interceptor(method, url, headers=None, body=None, wait_time=5, capture_background=True, **options):
     """
-    Run the Selenium interceptor script and return the HAR data
+    Capture the request and return the HAR data; see iter_interceptor()
     """
-    # Create temporary files for headers and body
-    headers_file = None
-    body_file = None
-    
-    try:
-        # Write headers to temp file if provided
-        if headers:
-            headers_file = tempfile.NamedTemporaryFile(mode='w+', delete=False)
-            json.dump(headers, headers_file)
-            headers_file.close()
-        
-        # Write body to temp file if provided
-        if body:
-            body_file = tempfile.NamedTemporaryFile(mode='w+', delete=False)
-            json.dump(body, body_file)
-            body_file.close()
-        
-        # Build command
-        command = [
-            'python', 'interceptor.py',
-            method,
-            url,
-            headers_file.name if headers_file else '',
-            body_file.name if body_file else '',
-            str(wait_time)
-        ]
-        
-        # Add capture-all flag if needed
-        if capture_background:
-            command.append('--capture-all')
-        
-        # Run the command
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        
-        stdout, stderr = process.communicate()
-        
-        if process.returncode != 0:
-            raise Exception(f"Error running interceptor: {stderr.decode('utf-8')}")
-        
-        # Parse the HAR data
-        har_data = json.loads(stdout.decode('utf-8'))
-        return har_data
-    
-    finally:
-        # Clean up temp files
-        if headers_file and os.path.exists(headers_file.name):
-            os.unlink(headers_file.name)
-        
-        if body_file and os.path.exists(body_file.name):
-            os.unlink(body_file.name)
\ No newline at end of file
+    har = new_har()
+    har['log']['entries'].extend(iter_interceptor(
+        method,
+        url,
+        headers=headers,
+        body=body,
+        wait_time=wait_time,
+        capture_background=capture_background,
+        **options
+    ))
+    return har
@@ -1,10 +1,90 @@
+import datetime
+import heapq
+import itertools
 import json
-import tempfile
-import os
-import subprocess
 import re
+import threading
+from collections import ChainMap
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, partial
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
 from django.utils import timezone
-from .models import PostmanCollection, CollectionRequest, CollectionBackgroundRequest
+from .models import PostmanCollection, CollectionRun, CollectionRequest, CollectionBackgroundRequest
+from .blobstore import body_text
+from .parse_cache import get_parse_cache
+from .persistence import save_capture, split_har_entries
+from .postman_scripts import evaluate, item_producers
+from .postman_stream import iter_items_v2, iter_requests_v1, read_single_request, scan_collection
+from .rate_limit import get_rate_limiter
+from .utils import run_interceptor, capture_policy_for, capture_scope_for, rate_limits_for, ENGINE_HTTP
+
+# {{name}} placeholders; the name may be padded with spaces
+VARIABLE_PATTERN = re.compile(r'\{\{([^}]+)\}\}')
+
+class Template:
+    """
+    A string split once into literal and {{variable}} segments
+
+    `segments` alternates literal text and raw variable names, so rendering
+    is a single join. Unknown variables are left as written.
+    """
+    __slots__ = ('text', 'segments')
+
+    def __init__(self, text):
+        self.text = text
+        self.segments = VARIABLE_PATTERN.split(text)
+
+    @property
+    def variables(self):
+        """Names of the variables used, in order"""
+        return [name.strip() for name in self.segments[1::2]]
+
+    def render(self, variables):
+        if len(self.segments) == 1:
+            return self.text
+
+        parts = []
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                parts.append(segment)
+                continue
+            name = segment.strip()
+            parts.append(str(variables[name]) if name in variables else f"{{{{{segment}}}}}")
+        return ''.join(parts)
+
+@lru_cache(maxsize=4096)
+def compile_template(text):
+    """Return the (cached) Template for a string"""
+    return Template(text)
+
+# Longer strings are mostly one-off request bodies, which would only crowd the cache
+CACHED_TEMPLATE_MAX_LENGTH = 1024
+
+def get_template(text):
+    """Return the Template for a string, cached if it is short"""
+    return compile_template(text) if len(text) <= CACHED_TEMPLATE_MAX_LENGTH else Template(text)
+
+def variable_scope(variables=None, *parents):
+    """
+    Return a chained variable lookup
+
+    Later scopes are layered with `scope.new_child(...)` (collection ->
+    folder -> item) instead of copying the variables at every level.
+    """
+    if isinstance(variables, ChainMap) and not parents:
+        return variables
+    return ChainMap(variables if variables is not None else {}, *parents)
+
+def _variable_dict(entries):
+    """Turn a Postman `variable` list into a dict"""
+    return {
+        var['key']: var['value']
+        for var in entries or []
+        if isinstance(var, dict) and 'key' in var and 'value' in var
+    }
 
 def extract_variables_from_collection(collection_data):
     """Extract variables from a Postman collection"""
@@ -27,20 +107,10 @@ def extract_variables_from_collection(collection_data):
 
 def replace_variables(text, variables):
     """Replace {{var}} placeholders with actual values"""
-    if not isinstance(text, str):
+    if not isinstance(text, str) or '{{' not in text:
         return text
     
-    # Find all variables in the text
-    pattern = r'\{\{([^}]+)\}\}'
-    matches = re.findall(pattern, text)
-    
-    # Replace each variable
-    for match in matches:
-        var_name = match.strip()
-        if var_name in variables:
-            text = text.replace(f"{{{{{var_name}}}}}", str(variables[var_name]))
-    
-    return text
+    return get_template(text).render(variables)
 
 def replace_variables_in_dict(data, variables):
     """Recursively replace variables in a dict or list"""
@@ -53,115 +123,287 @@ def replace_variables_in_dict(data, variables):
     else:
         return data
 
-def parse_postman_collection(collection, variables=None):
-    """Parse a Postman collection file and extract requests"""
+def parse_postman_collection(collection, variables=None, cache=None):
+    """
+    Parse a Postman collection file and extract requests
+
+    The result is cached by the file's content hash in `cache` (default the
+    process-wide parse cache, see parse_cache), so re-runs skip parsing
+    until the file changes. The collection's stored hash and request count
+    are refreshed when a default parse finds a new file. The result has a
+    len() and streams the requests from the cache when iterated.
+    """
+    return _parse_collection(collection, variables, cache)[1]
+
+def _parse_collection(collection, variables=None, cache=None):
+    """Return (file hash, parsed requests) of a collection"""
     try:
-        with open(collection.file.path, 'r') as f:
-            collection_data = json.load(f)
-        
-        # Extract variables from collection
-        collection_variables = extract_variables_from_collection(collection_data)
-        
-        # Merge with provided variables, with provided variables taking precedence
-        if variables:
-            collection_variables.update(variables)
-        else:
-            variables = collection_variables
-        
-        requests = []
-        
-        if 'item' in collection_data:
-            requests = extract_requests_v2(collection_data, variables=variables)
-        elif 'requests' in collection_data:
-            requests = extract_requests_v1(collection_data, variables=variables)
-        elif 'request' in collection_data:
-            requests = [extract_single_request(collection_data, variables=variables)]
-        
-        return requests
-    
+        sha256, requests = (cache or get_parse_cache()).get_or_parse(collection.file.path, iter_collection_file, variables)
     except Exception as e:
         raise Exception(f"Error parsing Postman collection: {str(e)}")
+    
+    if not variables and collection.file_sha256 != sha256:
+        collection.file_sha256 = sha256
+        collection.parsed_request_count = len(requests)
+        if collection.pk:
+            collection.save(update_fields=['file_sha256', 'parsed_request_count'])
+    
+    return sha256, requests
 
-def extract_requests_v2(collection_data, parent_name="", variables=None):
-    """Extract requests from a Postman v2.x collection"""
-    variables = variables or {}
-    requests = []
+def parse_collection_file(path, variables=None):
+    """Parse a Postman collection file without caching"""
+    return list(iter_collection_file(path, variables))
+
+def iter_collection_file(path, variables=None):
+    """
+    Yield the requests (those with a URL) of a Postman collection file one at a time
+
+    The file is streamed twice (see postman_stream): once for the variables,
+    folders and scripts, which exports often put after the items, and once
+    for the requests. Example responses are skipped without being loaded,
+    so memory is proportional to one item rather than the whole file.
+    """
+    with open(path, 'r') as f:
+        outline = scan_collection(f)
     
-    # Process collection variables if present
-    if 'variable' in collection_data:
-        for var in collection_data.get('variable', []):
-            if isinstance(var, dict) and 'key' in var and 'value' in var:
-                variables[var['key']] = var['value']
+    # Provided variables take precedence over the collection's own
+    variables = variable_scope(variables or {}, extract_variables_from_collection(outline))
     
-    for item in collection_data.get('item', []):
-        # Process folder/item variables if present
-        item_variables = variables.copy()
-        if 'variable' in item:
-            for var in item.get('variable', []):
-                if isinstance(var, dict) and 'key' in var and 'value' in var:
-                    item_variables[var['key']] = var['value']
+    with open(path, 'r') as f:
+        if outline['format'] == 'v2':
+            requests = _iter_requests_v2(iter_items_v2(f, outline['folders']), "", variables, frozenset(outline['produced']))
+        elif outline['format'] == 'v1':
+            requests = (extract_request_v1(request, variables) for request in iter_requests_v1(f))
+        elif outline['format'] == 'single':
+            requests = [extract_single_request(read_single_request(f), variables=variables)]
+        else:
+            requests = []
         
+        for request_data in requests:
+            if request_data and request_data.get('url'):
+                yield request_data
+
+def extract_requests_v2(collection_data, parent_name="", variables=None, runtime_names=None):
+    """
+    Extract requests from a Postman v2.x collection
+
+    Placeholders for `runtime_names` (variables set by scripts while the
+    collection runs) are left in place. Requests using them get `consumes`
+    and the `defaults` those names had at that point of the collection;
+    requests whose scripts set variables get `produces`.
+    """
+    # Collection variables only fill in names the caller did not provide
+    scope = variable_scope(variables)
+    if 'variable' in collection_data:
+        scope = ChainMap(*scope.maps, _variable_dict(collection_data.get('variable')))
+    
+    entries = _walk_items_v2(collection_data.get('item', []))
+    return list(_iter_requests_v2(entries, parent_name, scope, frozenset(runtime_names or ())))
+
+def _walk_items_v2(items, folders=()):
+    """Yield (folders, item) for the request items of a loaded v2.x item tree"""
+    for item in items:
         if 'item' in item:
-            # This is a folder
-            folder_name = item.get('name', '')
-            folder_path = f"{parent_name}/{folder_name}" if parent_name else folder_name
-            requests.extend(extract_requests_v2(item, folder_path, variables=item_variables))
+            yield from _walk_items_v2(item.get('item', []), folders + (item,))
         elif 'request' in item:
-            # This is a request
-            request_name = item.get('name', '')
-            request_path = f"{parent_name}/{request_name}" if parent_name else request_name
-            
-            # Process pre-request script for variables
-            if 'event' in item:
-                for event in item.get('event', []):
-                    if event.get('listen') == 'prerequest' and 'script' in event:
-                        script = event.get('script', {})
-                        if 'exec' in script:
-                            # Extract variables from script
-                            for line in script.get('exec', []):
-                                if 'pm.variables.set' in line or 'pm.collectionVariables.set' in line:
-                                    var_match = re.search(r'set$$"([^"]+)",\s*([^)]+)$$', line)
-                                    if var_match:
-                                        var_name = var_match.group(1)
-                                        var_value = var_match.group(2).strip('"\'')
-                                        item_variables[var_name] = var_value
-            
-            request_data = extract_single_request(item, name=request_path, variables=item_variables)
-            if request_data:
-                requests.append(request_data)
+            yield folders, item
+
+def _iter_requests_v2(entries, parent_name, variables, runtime_names=frozenset()):
+    """
+    Yield the requests of (folders, item) pairs
+
+    `folders` are the item's enclosing folders, outermost first; their
+    variables shadow the enclosing scope. Consecutive items of one folder
+    share its tuple, so the folder scope is built once per folder.
+    """
+    last_folders = None
+    for folders, item in entries:
+        if folders is not last_folders:
+            last_folders = folders
+            folder_variables, folder_path = variables, parent_name
+            for folder in folders:
+                if 'variable' in folder:
+                    folder_variables = folder_variables.new_child(_variable_dict(folder.get('variable')))
+                folder_name = folder.get('name', '')
+                folder_path = f"{folder_path}/{folder_name}" if folder_path else folder_name
+        
+        request_data = _extract_item_v2(item, folder_path, folder_variables, runtime_names)
+        if request_data:
+            yield request_data
+
+def _extract_item_v2(item, parent_name, variables, runtime_names=frozenset()):
+    """Extract one v2.x request item, with its runtime variable metadata"""
+    # Item variables shadow the enclosing scope
+    item_variables = variables
+    if 'variable' in item:
+        item_variables = variables.new_child(_variable_dict(item.get('variable')))
+    
+    request_name = item.get('name', '')
+    request_path = f"{parent_name}/{request_name}" if parent_name else request_name
+    
+    # Literal values set by the pre-request script apply to the request itself
+    producers = item_producers(item)
+    local = {
+        p['name']: p['expr']['literal']
+        for p in producers
+        if p['phase'] == 'prerequest' and 'literal' in p['expr']
+    }
+    if local:
+        item_variables = item_variables.new_child(local)
+    
+    # Keep placeholders for values only known once earlier requests ran
+    render_variables = item_variables
+    if runtime_names:
+        render_variables = item_variables.new_child(
+            {name: f"{{{{{name}}}}}" for name in runtime_names if name not in local}
+        )
+    
+    request_data = extract_single_request(item, name=request_path, variables=render_variables)
+    if not request_data:
+        return None
+    
+    consumes = sorted(request_placeholders(request_data) & runtime_names)
+    if consumes:
+        request_data['consumes'] = consumes
+        request_data['defaults'] = {name: item_variables[name] for name in consumes if name in item_variables}
+    if producers:
+        request_data['produces'] = producers
+    return request_data
+
+def request_placeholders(request_data):
+    """Names of the {{variables}} still present in a request's URL, headers and body"""
+    names = set()
+    
+    def collect(value):
+        if isinstance(value, str):
+            if '{{' in value:
+                names.update(get_template(value).variables)
+        elif isinstance(value, dict):
+            for k, v in value.items():
+                collect(k)
+                collect(v)
+        elif isinstance(value, list):
+            for v in value:
+                collect(v)
+    
+    collect(request_data.get('url'))
+    collect(request_data.get('headers'))
+    collect(request_data.get('body'))
+    return names
+
+def render_runtime_variables(request_data, state):
+    """Fill the runtime placeholders of a parsed request from the run's variable state"""
+    if not request_data.get('consumes'):
+        return request_data
+    
+    variables = ChainMap(state, request_data.get('defaults') or {})
+    body = replace_variables_in_dict(request_data.get('body'), variables)
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            pass
     
-    return requests
+    return {
+        **request_data,
+        'url': replace_variables(request_data.get('url', ''), variables),
+        'headers': replace_variables_in_dict(request_data.get('headers', {}), variables),
+        'body': body,
+    }
+
+def produced_variables(request_data, har_data):
+    """Evaluate the variables a request's scripts set, against its captured response"""
+    producers = request_data.get('produces')
+    if not producers:
+        return {}
+    
+    main_entry, _ = split_har_entries(har_data)
+    response = main_entry['response'] if main_entry else {}
+    text = body_text(response.get('content')) if main_entry else None
+    
+    values = {}
+    for producer in producers:
+        known, value = evaluate(
+            producer['expr'],
+            status=response.get('status'),
+            headers=response.get('headers'),
+            text=text
+        )
+        if known:
+            values[producer['name']] = value
+    return values
+
+class DependencyTracker:
+    """
+    Dependencies of requests added one at a time, in collection order
+
+    A request that reads a runtime variable depends on the closest earlier
+    request that sets it. A request that sets a variable waits for the
+    previous setter and for every request reading the previous value, so
+    each request sees the value it would see in a sequential run. Indices
+    start at `start`.
+    """
+    
+    def __init__(self, start=0):
+        self.index = start
+        self.last_producer = {}
+        self.readers = {}
+    
+    def add(self, request_data):
+        """Return the indices of earlier requests that must finish before this one"""
+        index = self.index
+        self.index += 1
+        dependencies = set()
+        
+        for name in request_data.get('consumes', ()):
+            if name in self.last_producer:
+                dependencies.add(self.last_producer[name])
+            self.readers.setdefault(name, []).append(index)
+        
+        for name in {p['name'] for p in request_data.get('produces', ())}:
+            if name in self.last_producer:
+                dependencies.add(self.last_producer[name])
+            dependencies.update(self.readers.pop(name, ()))
+            self.last_producer[name] = index
+        
+        dependencies.discard(index)
+        return dependencies
+
+def build_dependency_graph(requests):
+    """Return, for each request, the indices of requests that must finish first (see DependencyTracker)"""
+    tracker = DependencyTracker()
+    return [tracker.add(request_data) for request_data in requests]
 
 def extract_requests_v1(collection_data, variables=None):
     """Extract requests from a Postman v1.x collection"""
     variables = variables or {}
-    requests = []
+    return [extract_request_v1(request, variables) for request in collection_data.get('requests', [])]
+
+def extract_request_v1(request, variables=None):
+    """Extract a single request from a Postman v1.x collection"""
+    variables = variables or {}
+    url = replace_variables(request.get('url', ''), variables)
+    headers = {}
+    for header in request.get('headers', '').split('\n'):
+        if ':' in header:
+            key, value = header.split(':', 1)
+            headers[key.strip()] = replace_variables(value.strip(), variables)
     
-    for request in collection_data.get('requests', []):
-        url = replace_variables(request.get('url', ''), variables)
-        headers = {}
-        for header in request.get('headers', '').split('\n'):
-            if ':' in header:
-                key, value = header.split(':', 1)
-                headers[key.strip()] = replace_variables(value.strip(), variables)
-        
-        body = None
-        if 'rawModeData' in request and request.get('dataMode') == 'raw':
-            try:
-                body_str = replace_variables(request.get('rawModeData', '{}'), variables)
-                body = json.loads(body_str)
-            except:
-                body = body_str
-        
-        requests.append({
-            'name': replace_variables(request.get('name', ''), variables),
-            'method': request.get('method', 'GET'),
-            'url': url,
-            'headers': headers,
-            'body': body
-        })
+    body = None
+    if 'rawModeData' in request and request.get('dataMode') == 'raw':
+        try:
+            body_str = replace_variables(request.get('rawModeData', '{}'), variables)
+            body = json.loads(body_str)
+        except:
+            body = body_str
     
-    return requests
+    return {
+        'name': replace_variables(request.get('name', ''), variables),
+        'method': request.get('method', 'GET'),
+        'url': url,
+        'headers': headers,
+        'body': body
+    }
 
 def extract_single_request(item, name=None, variables=None):
     """Extract a single request from a Postman item"""
@@ -256,160 +498,345 @@ def extract_single_request(item, name=None, variables=None):
         'body': body
     }
 
-def run_interceptor(method, url, headers=None, body=None, wait_time=5, capture_background=True):
+def execute_collection_request(request_data, capture_policy=None, capture_scope=None, engine=ENGINE_HTTP, rate_limiter=None):
     """
-    Run the Selenium interceptor script and return the HAR data
+    Capture a single parsed collection request
+
+    `engine` is 'http' (no browser) or 'browser'. With a `rate_limiter` the
+    request first waits for a slot for its host; that queue time is recorded
+    as the main entry's `blocked` timing. Returns (har_data, error). Touches
+    no models, so it is safe to run on worker threads.
     """
-    # Create temporary files for headers and body
-    headers_file = None
-    body_file = None
-    
+    url = request_data.get('url', '')
     try:
-        # Write headers to temp file if provided
-        if headers:
-            headers_file = tempfile.NamedTemporaryFile(mode='w+', delete=False)
-            json.dump(headers, headers_file)
-            headers_file.close()
-        
-        # Write body to temp file if provided
-        if body:
-            body_file = tempfile.NamedTemporaryFile(mode='w+', delete=False)
-            json.dump(body, body_file)
-            body_file.close()
-        
-        # Build command
-        command = [
-            'python', 'interceptor.py',
-            method,
-            url,
-            headers_file.name if headers_file else '',
-            body_file.name if body_file else '',
-            str(wait_time)
-        ]
-        
-        # Add capture-all flag if needed
-        if capture_background:
-            command.append('--capture-all')
-        
-        # Run the command
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        
-        stdout, stderr = process.communicate()
-        
-        if process.returncode != 0:
-            raise Exception(f"Error running interceptor: {stderr.decode('utf-8')}")
-        
-        # Parse the HAR data
-        har_data = json.loads(stdout.decode('utf-8'))
-        return har_data
-    
-    finally:
-        # Clean up temp files
-        if headers_file and os.path.exists(headers_file.name):
-            os.unlink(headers_file.name)
+        with (rate_limiter.slot(url) if rate_limiter else nullcontext(0.0)) as waited:
+            har_data = run_interceptor(
+                method=request_data.get('method', 'GET'),
+                url=url,
+                headers=request_data.get('headers', {}),
+                body=request_data.get('body', {}),
+                wait_time=5,
+                capture_background=True,
+                capture_policy=capture_policy,
+                capture_scope=capture_scope,
+                engine=engine
+            )
         
-        if body_file and os.path.exists(body_file.name):
-            os.unlink(body_file.name)
+        main_entry, _ = split_har_entries(har_data)
+        if main_entry is not None and rate_limiter:
+            # Queue time is kept out of 'time' so latency reports measure the server
+            main_entry['timings']['blocked'] = round(waited * 1000, 3)
+        return har_data, None
+    except Exception as e:
+        return None, e
 
-def run_collection(collection_id, variables=None):
-    """Run a Postman collection and save the results"""
-    variables = variables or {}
+def queue_wait(har_data):
+    """Seconds the main request of a HAR waited for a rate limiter slot"""
+    main_entry, _ = split_har_entries(har_data)
+    blocked = main_entry.get('timings', {}).get('blocked', -1) if main_entry else -1
+    return blocked / 1000 if blocked and blocked > 0 else 0.0
+
+def response_bytes(har_data):
+    """Total response body size of the entries in a HAR"""
+    entries = har_data['log'].get('entries', []) if har_data and 'log' in har_data else []
+    return sum(entry.get('response', {}).get('content', {}).get('size') or 0 for entry in entries)
+
+def save_collection_result(collection, request_data, har_data, error=None, run=None, state=None):
+    """
+    Save a captured collection request and its background requests
+
+    The request is counted on `run`, checkpointing `state` (the run's
+    script-set variables) when given.
+    """
+    collection_request = CollectionRequest(
+        collection=collection,
+        run=run,
+        name=request_data.get('name', ''),
+        url=request_data.get('url', ''),
+        method=request_data.get('method', 'GET'),
+        headers=json.dumps(request_data.get('headers', {})),
+        body=json.dumps(request_data.get('body', {})) if request_data.get('body') else None
+    )
+    
+    if error is not None:
+        collection_request.status_code = 0
+        collection_request.har_data = {
+            'error': str(error)
+        }
+        collection_request.save()
+    else:
+        # Save HAR entries, status code and background requests in one transaction
+        save_capture(collection_request, har_data, CollectionBackgroundRequest)
+    
+    if run is not None:
+        status = collection_request.status_code
+        run.record(ok=bool(status) and status < 400, size=response_bytes(har_data), state=state, queue_wait=queue_wait(har_data))
     
+    return collection_request
+
+def run_collection(collection_id, variables=None, concurrency=None, capture_policy=None, capture_scope=None, engine=None):
+    """
+    Run a Postman collection and save the results
+
+    Requests are captured on up to `concurrency` worker threads (default
+    INTERCEPTOR_COLLECTION_CONCURRENCY) with the collection's engine: over
+    the shared HTTP connection pool, or on pooled browsers when the engine
+    is 'browser'. Results are saved from the calling thread in collection
+    order. Requests that read a variable set by an earlier request's script
+    wait for it; independent ones run concurrently. `capture_policy`,
+    `capture_scope` and `engine` override the collection's settings.
+    Progress is counted and checkpointed on a new
+    CollectionRun, which becomes the collection's current run; returns that
+    run.
+    """
+    run = None
     try:
         collection = PostmanCollection.objects.get(id=collection_id)
         collection.is_running = True
         collection.save()
         
-        # Parse collection file to extract variables
-        with open(collection.file.path, 'r') as f:
-            collection_data = json.load(f)
+        # Parse collection to get requests; provided variables take precedence
+        sha256, requests = load_collection_requests(collection, variables)
         
-        # Extract collection variables
-        collection_variables = extract_variables_from_collection(collection_data)
+        run = CollectionRun.objects.create(
+            collection=collection,
+            total=len(requests),
+            variables=dict(variables or {}),
+            engine=engine or collection.engine,
+            file_sha256=sha256,
+            heartbeat_at=timezone.now()
+        )
+    except Exception as e:
+        try:
+            collection.is_running = False
+            collection.save()
+        except:
+            pass
         
-        # Merge with provided variables, with provided variables taking precedence
-        if variables:
-            collection_variables.update(variables)
-        else:
-            variables = collection_variables
+        raise Exception(f"Error running collection: {str(e)}")
+    
+    return _execute_run(collection, run, requests, 0, concurrency, capture_policy, capture_scope)
+
+def resume_collection_run(run_id, concurrency=None, capture_policy=None, capture_scope=None):
+    """
+    Continue an interrupted run from its last checkpoint
+
+    Requests before the run's `position` are not executed again, and the
+    variables their scripts set are restored from the run's state. The run
+    is refused if the collection file changed since it started, since the
+    positions would no longer line up.
+    """
+    run = CollectionRun.objects.select_related('collection').get(id=run_id)
+    collection = run.collection
+    
+    if not run.is_resumable:
+        raise Exception(f"Run {run.id} is {run.status} and cannot be resumed")
+    
+    sha256, requests = load_collection_requests(collection, run.variables)
+    if run.file_sha256 and sha256 != run.file_sha256:
+        raise Exception("The collection file changed since the run started")
+    
+    # Claim the run; only one resume may continue it
+    claimed = CollectionRun.objects.filter(pk=run.pk, status='interrupted').update(
+        status='running', error=None, finished_at=None, heartbeat_at=timezone.now()
+    )
+    if not claimed:
+        raise Exception(f"Run {run.id} is already being resumed")
+    run.refresh_from_db()
+    
+    collection.is_running = True
+    collection.save(update_fields=['is_running'])
+    
+    return _execute_run(collection, run, requests, run.position, concurrency, capture_policy, capture_scope)
+
+def load_collection_requests(collection, variables=None):
+    """Return (file hash, streamed requests) of a collection, from the parse cache"""
+    return _parse_collection(collection, variables)
+
+def _execute_run(collection, run, requests, start=0, concurrency=None, capture_policy=None, capture_scope=None):
+    """
+    Capture and save the requests from index `start` on as part of `run`, then mark the run finished
+
+    Requests run in dependency order (see schedule_requests) but are saved
+    in collection order, so the run's checkpoint is always a prefix of the
+    collection.
+    """
+    if concurrency is None:
+        concurrency = getattr(settings, 'INTERCEPTOR_COLLECTION_CONCURRENCY', 1)
+    concurrency = max(1, concurrency)
+    
+    try:
+        collection.current_run = run
+        collection.save(update_fields=['current_run'])
         
-        # Parse collection to get requests
-        requests = parse_postman_collection(collection, variables=variables)
+        capture_policy = capture_policy or capture_policy_for(collection)
+        capture_scope = capture_scope or capture_scope_for(collection)
+        capture = partial(
+            execute_collection_request,
+            capture_policy=capture_policy,
+            capture_scope=capture_scope,
+            engine=run.engine or collection.engine,
+            rate_limiter=get_rate_limiter(rate_limits_for(collection))
+        )
         
-        for request_data in requests:
-            if not request_data.get('url'):
-                continue
-            
-            collection_request = CollectionRequest(
-                collection=collection,
-                name=request_data.get('name', ''),
-                url=request_data.get('url', ''),
-                method=request_data.get('method', 'GET'),
-                headers=json.dumps(request_data.get('headers', {})),
-                body=json.dumps(request_data.get('body', {})) if request_data.get('body') else None
-            )
-            
-            try:
-                har_data = run_interceptor(
-                    method=collection_request.method,
-                    url=collection_request.url,
-                    headers=request_data.get('headers', {}),
-                    body=request_data.get('body', {}),
-                    wait_time=5,
-                    capture_background=True
-                )
-                
-                # Set status code and HAR data
-                if har_data and 'log' in har_data and har_data['log'].get('entries'):
-                    main_entry = None
-                    background_entries = []
-                    
-                    # Separate main request from background requests
-                    for entry in har_data['log']['entries']:
-                        if entry.get('_is_main_request', False):
-                            main_entry = entry
-                            collection_request.status_code = entry['response']['status']
-                        elif entry.get('_is_background_request', False):
-                            background_entries.append(entry)
-                
-                collection_request.har_data = har_data
-                collection_request.save()
-                
-                # Process background requests
-                for entry in background_entries:
-                    background_req = CollectionBackgroundRequest(
-                        parent_request=collection_request,
-                        url=entry['request']['url'],
-                        method=entry['request']['method'],
-                        headers=json.dumps([{h['name']: h['value']} for h in entry['request']['headers']]),
-                        body=entry['request']['body'],
-                        status_code=entry['response']['status'],
-                        resource_type=entry.get('_resource_type', 'xhr'),
-                        har_data=entry
+        state = dict(run.state or {})
+        checkpoint = dict(state)
+        finished = {}
+        next_index = start
+        
+        with run_heartbeat(run):
+            for index, *result in schedule_requests(requests, capture, state, concurrency, start):
+                finished[index] = result
+                # Hold back requests that finished early until everything before them is saved
+                while next_index in finished:
+                    request_data, har_data, error, produced = finished.pop(next_index)
+                    checkpoint.update(produced)
+                    save_collection_result(
+                        collection, request_data, har_data, error,
+                        run=run, state=checkpoint if produced else None
                     )
-                    background_req.save()
-                
-            except Exception as e:
-                collection_request.status_code = 0
-                collection_request.har_data = {
-                    'error': str(e)
-                }
-                collection_request.save()
+                    next_index += 1
         
+        run.finish('completed')
         collection.is_running = False
         collection.last_run = timezone.now()
         collection.save()
-        return True
+        return run
     
     except Exception as e:
         try:
+            run.finish('failed', error=str(e))
             collection.is_running = False
             collection.save()
         except:
             pass
         
-        raise Exception(f"Error running collection: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error running collection: {str(e)}")
+
+def schedule_requests(requests, capture, state, concurrency=1, start=0, lookahead=None):
+    """
+    Capture the requests of an iterable from index `start` as their dependencies allow
+
+    Up to `concurrency` independent requests run at once on worker threads;
+    a request is submitted once every request it depends on has finished,
+    with its runtime variables rendered from `state`, which is updated with
+    the variables each finished request sets. Among ready requests the
+    earliest goes first, so with a concurrency of 1 this is a sequential
+    run. Requests are read lazily and at most `lookahead` (default
+    INTERCEPTOR_COLLECTION_LOOKAHEAD) past the earliest unfinished one, which
+    bounds both memory and how far results run ahead of the saved prefix.
+    Yields (index, request_data, har_data, error, produced) in completion
+    order.
+    """
+    if lookahead is None:
+        lookahead = getattr(settings, 'INTERCEPTOR_COLLECTION_LOOKAHEAD', 100)
+    lookahead = max(concurrency, lookahead)
+    
+    pending_requests = enumerate(itertools.islice(requests, start, None), start)
+    tracker = DependencyTracker(start)
+    loaded = {}
+    waiting = {}
+    dependents = {}
+    ready = []
+    completed = set()
+    earliest = start  # Every request before this has finished
+    exhausted = False
+    
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='collection-run') as executor:
+        running = {}
+        while True:
+            while not exhausted and tracker.index < earliest + lookahead:
+                try:
+                    index, request_data = next(pending_requests)
+                except StopIteration:
+                    exhausted = True
+                    break
+                loaded[index] = request_data
+                pending = {d for d in tracker.add(request_data) if d >= earliest and d not in completed}
+                if pending:
+                    waiting[index] = pending
+                    for dependency in pending:
+                        dependents.setdefault(dependency, []).append(index)
+                else:
+                    heapq.heappush(ready, index)
+            
+            if not ready and not running:
+                break
+            
+            while ready and len(running) < concurrency:
+                index = heapq.heappop(ready)
+                request_data = render_runtime_variables(loaded.pop(index), state)
+                running[executor.submit(capture, request_data)] = (index, request_data)
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: running[f][0]):
+                index, request_data = running.pop(future)
+                har_data, error = future.result()
+                produced = produced_variables(request_data, har_data) if error is None else {}
+                state.update(produced)
+                yield index, request_data, har_data, error, produced
+                
+                completed.add(index)
+                while earliest in completed:
+                    completed.remove(earliest)
+                    earliest += 1
+                
+                for dependent in dependents.pop(index, ()):
+                    pending = waiting[dependent]
+                    pending.discard(index)
+                    if not pending:
+                        del waiting[dependent]
+                        heapq.heappush(ready, dependent)
+
+@contextmanager
+def run_heartbeat(run, interval=None):
+    """Refresh the run's heartbeat from a background thread while the block runs"""
+    interval = interval or getattr(settings, 'INTERCEPTOR_RUN_HEARTBEAT_INTERVAL', 15)
+    stop = threading.Event()
+    
+    def beat():
+        try:
+            while not stop.wait(interval):
+                run.heartbeat()
+        finally:
+            connection.close()
+    
+    thread = threading.Thread(target=beat, name=f'collection-run-{run.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+def reap_dead_runs(timeout=None, collection=None):
+    """
+    Mark running runs whose heartbeat stopped as interrupted
+
+    A run is dead once its heartbeat is older than `timeout` seconds
+    (INTERCEPTOR_RUN_HEARTBEAT_TIMEOUT), e.g. after the process running it
+    restarted. Its collection is released so it can run or resume again.
+    Returns the reaped runs.
+    """
+    timeout = timeout or getattr(settings, 'INTERCEPTOR_RUN_HEARTBEAT_TIMEOUT', 90)
+    now = timezone.now()
+    cutoff = now - datetime.timedelta(seconds=timeout)
+    
+    stale = CollectionRun.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    if collection is not None:
+        stale = stale.filter(collection=collection)
+    
+    reaped = []
+    for run in stale:
+        # Only reap if the heartbeat did not move since it was read
+        interrupted = CollectionRun.objects.filter(pk=run.pk, status='running', heartbeat_at=run.heartbeat_at).update(
+            status='interrupted', finished_at=now, error='The runner stopped sending heartbeats'
+        )
+        if interrupted:
+            PostmanCollection.objects.filter(pk=run.collection_id, current_run=run).update(is_running=False)
+            run.status = 'interrupted'
+            reaped.append(run)
+    
+    return reaped
@@ -4,11 +4,13 @@ from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from interceptor.models import Request
-from interceptor.models import Project, PostmanCollection, CollectionRequest, BackgroundRequest, CollectionBackgroundRequest
+from interceptor.models import Project, PostmanCollection, CollectionRun, CollectionRequest, BackgroundRequest, CollectionBackgroundRequest
 from interceptor.forms import ProjectForm, RequestForm, PostmanCollectionForm
-from interceptor.utils import run_interceptor
+from interceptor.utils import run_interceptor, capture_policy_for, capture_scope_for
+from interceptor.persistence import save_capture, assemble_har, delete_runs
 import json
-from .utils_postman import run_collection
+from .utils_postman import run_collection, resume_collection_run, reap_dead_runs, parse_postman_collection
+from .reports import latency_report
 import threading
 
 def home(request):
@@ -36,7 +38,8 @@ def project_create(request):
 
 def project_detail(request, project_id):
     project = get_object_or_404(Project, id=project_id)
-    requests = project.requests.order_by('-created_at')
+    # Lists only need scalar columns, never the HAR JSON
+    requests = project.requests.defer('har_data').order_by('-created_at')
     return render(request, 'projects/detail.html', {'project': project, 'requests': requests})
 
 
@@ -67,31 +70,11 @@ def request_create(request, project_id):
                     headers=req.get_headers_dict(),
                     body=req.get_body_dict(),
                     wait_time=req.wait_time,
-                    capture_background=True
+                    capture_background=True,
+                    capture_policy=capture_policy_for(req),
+                    capture_scope=capture_scope_for(req)
                 )
-                req.har_data = har_data
-                req.save()
-                
-                # Process background requests
-                if har_data and 'log' in har_data and 'entries' in har_data['log']:
-                    for entry in har_data['log']['entries']:
-                        # Skip the main request
-                        if entry.get('_is_main_request', False):
-                            continue
-                        
-                        # Process background request
-                        if entry.get('_is_background_request', False):
-                            background_req = BackgroundRequest(
-                                parent_request=req,
-                                url=entry['request']['url'],
-                                method=entry['request']['method'],
-                                headers=json.dumps([{h['name']: h['value']} for h in entry['request']['headers']]),
-                                body=entry['request']['body'],
-                                status_code=entry['response']['status'],
-                                resource_type=entry.get('_resource_type', 'xhr'),
-                                har_data=entry
-                            )
-                            background_req.save()
+                save_capture(req, har_data, BackgroundRequest)
                 
                 messages.success(request, 'Request intercepted successfully!')
                 return redirect('request_detail', project_id=project.id, request_id=req.id)
@@ -107,8 +90,13 @@ def request_create(request, project_id):
 def request_detail(request, project_id, request_id):
     project = get_object_or_404(Project, id=project_id)
     req = get_object_or_404(Request, id=request_id, project=project)
+    background_requests = req.background_requests.select_related('har_entry')
     
-    return render(request, 'requests/detail.html', {'project': project, 'request': req})
+    return render(request, 'requests/detail.html', {
+        'project': project,
+        'request': req,
+        'background_requests': background_requests
+    })
 
 
 def request_delete(request, project_id, request_id):
@@ -133,19 +121,28 @@ def request_rerun(request, project_id, request_id):
             url=req.url,
             headers=req.get_headers_dict(),
             body=req.get_body_dict(),
-            wait_time=req.wait_time
+            wait_time=req.wait_time,
+            capture_policy=capture_policy_for(req),
+            capture_scope=capture_scope_for(req)
         )
         
         # Create a new request with the same parameters but new HAR data
-        new_req = Request.objects.create(
+        new_req = Request(
             project=project,
             url=req.url,
             method=req.method,
             headers=req.headers,
             body=req.body,
             wait_time=req.wait_time,
-            har_data=har_data
+            capture_max_body_size=req.capture_max_body_size,
+            capture_mime_types=req.capture_mime_types,
+            scope_include_hosts=req.scope_include_hosts,
+            scope_exclude_hosts=req.scope_exclude_hosts,
+            scope_include_paths=req.scope_include_paths,
+            scope_exclude_paths=req.scope_exclude_paths,
+            scope_resource_types=req.scope_resource_types
         )
+        save_capture(new_req, har_data, BackgroundRequest)
         
         messages.success(request, 'Request re-run successfully!')
         return redirect('request_detail', project_id=project.id, request_id=new_req.id)
@@ -158,7 +155,7 @@ def export_har(request, project_id, request_id):
     project = get_object_or_404(Project, id=project_id)
     req = get_object_or_404(Request, id=request_id, project=project)
     
-    response = HttpResponse(json.dumps(req.har_data, indent=2), content_type='application/json')
+    response = HttpResponse(json.dumps(assemble_har(req), indent=2), content_type='application/json')
     response['Content-Disposition'] = f'attachment; filename="{req.method}_{req.url.replace("/", "_")}.har"'
     return response
 
@@ -180,6 +177,12 @@ def collection_upload(request, project_id):
             collection = form.save(commit=False)
             collection.project = project
             collection.save()
+            
+            # Parse once now so the request count is known and runs hit the cache
+            try:
+                parse_postman_collection(collection)
+            except Exception as e:
+                messages.warning(request, str(e))
             messages.success(request, 'Collection uploaded successfully!')
             return redirect('collection_detail', project_id=project.id, collection_id=collection.id)
     else:
@@ -190,14 +193,29 @@ def collection_upload(request, project_id):
 
 def collection_detail(request, project_id, collection_id):
     project = get_object_or_404(Project, id=project_id)
-    collection = get_object_or_404(PostmanCollection, id=collection_id, project=project)
-    requests = collection.collection_requests.order_by('-created_at')
-    return render(request, 'collections/detail.html', {'project': project, 'collection': collection, 'requests': requests})
+    collection = get_object_or_404(PostmanCollection.objects.select_related('current_run'), id=collection_id, project=project)
+    run = collection.current_run
+    
+    # Show the latest run; collections run before runs were recorded list everything
+    requests = run.requests if run else collection.collection_requests
+    requests = requests.defer('har_data').order_by('-created_at')
+    runs = collection.runs.all()[:20]
+    return render(request, 'collections/detail.html', {
+        'project': project,
+        'collection': collection,
+        'run': run,
+        'runs': runs,
+        'requests': requests
+    })
 
 def collection_run(request, project_id, collection_id):
     project = get_object_or_404(Project, id=project_id)
     collection = get_object_or_404(PostmanCollection, id=collection_id, project=project)
     
+    # A run left behind by a restarted process no longer blocks the collection
+    if collection.is_running and reap_dead_runs(collection=collection):
+        collection.refresh_from_db()
+    
     if collection.is_running:
         messages.error(request, 'Collection is already running!')
         return redirect('collection_detail', project_id=project.id, collection_id=collection.id)
@@ -215,156 +233,110 @@ def collection_request_detail(request, project_id, collection_id, request_id):
     project = get_object_or_404(Project, id=project_id)
     collection = get_object_or_404(PostmanCollection, id=collection_id, project=project)
     collection_request = get_object_or_404(CollectionRequest, id=request_id, collection=collection)
+    background_requests = collection_request.background_requests.select_related('har_entry')
     
     return render(request, 'collections/request_detail.html', {
         'project': project, 
         'collection': collection, 
-        'request': collection_request
+        'request': collection_request,
+        'background_requests': background_requests
     })
 
 def collection_status(request, project_id, collection_id):
     """AJAX endpoint to check collection run status"""
-    project = get_object_or_404(Project, id=project_id)
-    collection = get_object_or_404(PostmanCollection, id=collection_id, project=project)
+    # One query: the collection and its current run's counters
+    collection = get_object_or_404(
+        PostmanCollection.objects.select_related('current_run'),
+        id=collection_id,
+        project_id=project_id
+    )
+    run = collection.current_run
+    
+    if run is None:
+        # Collections run before runs were recorded
+        return JsonResponse({
+            'is_running': collection.is_running,
+            'total_requests': collection.request_count(),
+            'successful_requests': collection.successful_requests(),
+            'failed_requests': collection.failed_requests(),
+            'last_run': collection.last_run.isoformat() if collection.last_run else None
+        })
     
     return JsonResponse({
         'is_running': collection.is_running,
-        'total_requests': collection.request_count(),
-        'successful_requests': collection.successful_requests(),
-        'failed_requests': collection.failed_requests(),
-        'last_run': collection.last_run.isoformat() if collection.last_run else None
+        'total_requests': run.done,
+        'successful_requests': run.ok,
+        'failed_requests': run.failed,
+        'last_run': collection.last_run.isoformat() if collection.last_run else None,
+        'run': run.as_dict()
     })
 
-def collection_delete(request, project_id, collection_id):
+def run_status(request, project_id, collection_id, run_id):
+    """AJAX endpoint with the counters of one run"""
+    run = get_object_or_404(CollectionRun, id=run_id, collection_id=collection_id, collection__project_id=project_id)
+    return JsonResponse(run.as_dict())
+
+def run_resume(request, project_id, collection_id, run_id):
     project = get_object_or_404(Project, id=project_id)
     collection = get_object_or_404(PostmanCollection, id=collection_id, project=project)
+    run = get_object_or_404(CollectionRun, id=run_id, collection=collection)
     
     if request.method == 'POST':
-        collection.delete()
-        messages.success(request, 'Collection deleted successfully!')
-        return redirect('collection_list', project_id=project.id)
+        if collection.is_running:
+            messages.error(request, 'Collection is already running!')
+        elif not run.is_resumable:
+            messages.error(request, 'This run cannot be resumed!')
+        else:
+            thread = threading.Thread(target=resume_collection_run, args=(run.id,))
+            thread.daemon = True
+            thread.start()
+            messages.success(request, f'Resuming from request {run.position + 1} of {run.total}. Refresh the page to see results.')
     
-    return render(request, 'collections/delete.html', {'project': project, 'collection': collection})
-
+    return redirect('collection_detail', project_id=project.id, collection_id=collection.id)
 
-# Update in collection_runner.py for collection requests
-def process_request_v2(collection, item, name):
-    """Process a single request from Postman collection v2.x format and run it"""
-    request = item.get('request', {})
-    
-    if not request:
-        return
-    
-    # Get request method
-    method = request.get('method', 'GET')
+def run_delete(request, project_id, collection_id, run_id):
+    project = get_object_or_404(Project, id=project_id)
+    collection = get_object_or_404(PostmanCollection, id=collection_id, project=project)
+    run = get_object_or_404(CollectionRun, id=run_id, collection=collection)
     
-    # Get URL
-    url = ""
-    if isinstance(request.get('url'), str):
-        url = request.get('url', '')
-    elif isinstance(request.get('url'), dict):
-        url_data = request.get('url', {})
-        if 'raw' in url_data:
-            url = url_data.get('raw', '')
+    if request.method == 'POST':
+        if run.is_running:
+            messages.error(request, 'A running run cannot be deleted!')
         else:
-            # Construct URL from host and path
-            host = '.'.join(url_data.get('host', []))
-            path = '/'.join(url_data.get('path', []))
-            protocol = url_data.get('protocol', 'https')
-            url = f"{protocol}://{host}/{path}"
+            # Deletes the run's requests, their HAR entries and background requests
+            delete_runs(CollectionRun.objects.filter(pk=run.pk))
+            messages.success(request, 'Run deleted successfully!')
     
-    # Skip if URL is empty
-    if not url:
-        return
+    return redirect('collection_detail', project_id=project.id, collection_id=collection.id)
+
+def collection_latency(request, project_id, collection_id):
+    """Latency percentiles per request across runs; ?days=N limits the window (0 for all)"""
+    project = get_object_or_404(Project, id=project_id)
+    collection = get_object_or_404(PostmanCollection, id=collection_id, project=project)
     
-    # Get headers
-    headers = {}
-    for header in request.get('header', []):
-        if isinstance(header, dict) and 'key' in header and 'value' in header:
-            headers[header.get('key')] = header.get('value')
+    try:
+        days = int(request.GET.get('days', 30))
+    except ValueError:
+        return JsonResponse({'error': 'days must be an integer'}, status=400)
     
-    # Get body
-    body = None
-    if 'body' in request:
-        body_data = request.get('body', {})
-        if body_data.get('mode') == 'raw':
-            raw_body = body_data.get('raw', '')
-            try:
-                body = json.loads(raw_body)
-            except:
-                body = raw_body
-        elif body_data.get('mode') == 'formdata':
-            form_data = {}
-            for param in body_data.get('formdata', []):
-                if isinstance(param, dict) and 'key' in param and 'value' in param:
-                    form_data[param.get('key')] = param.get('value')
-            body = form_data
+    return JsonResponse({'collection': collection.id, 'days': days, **latency_report(collection, days=days)})
+
+def collection_delete(request, project_id, collection_id):
+    project = get_object_or_404(Project, id=project_id)
+    collection = get_object_or_404(PostmanCollection, id=collection_id, project=project)
     
-    # Create CollectionRequest object
-    collection_request = CollectionRequest(
-        collection=collection,
-        name=name,
-        url=url,
-        method=method,
-        headers=json.dumps(headers) if headers else None,
-        body=json.dumps(body) if body else None
-    )
+    if request.method == 'POST':
+        collection.delete()
+        messages.success(request, 'Collection deleted successfully!')
+        return redirect('collection_list', project_id=project.id)
     
-    # Run the request through wire.py
-    try:
-        har_data = run_interceptor(
-            method=method,
-            url=url,
-            headers=headers,
-            body=body,
-            wait_time=5,
-            capture_background=True
-        )
-        
-        # Extract status code
-        if har_data and 'log' in har_data and 'entries' in har_data['log'] and har_data['log']['entries']:
-            for entry in har_data['log']['entries']:
-                if entry.get('_is_main_request', False):
-                    collection_request.status_code = entry['response']['status']
-                    break
-        
-        # Save HAR data
-        collection_request.har_data = har_data
-        collection_request.save()
-        
-        # Process background requests
-        if har_data and 'log' in har_data and 'entries' in har_data['log']:
-            for entry in har_data['log']['entries']:
-                # Skip the main request
-                if entry.get('_is_main_request', False):
-                    continue
-                
-                # Process background request
-                if entry.get('_is_background_request', False):
-                    background_req = CollectionBackgroundRequest(
-                        parent_request=collection_request,
-                        url=entry['request']['url'],
-                        method=entry['request']['method'],
-                        headers=json.dumps([{h['name']: h['value']} for h in entry['request']['headers']]),
-                        body=entry['request']['body'],
-                        status_code=entry['response']['status'],
-                        resource_type=entry.get('_resource_type', 'xhr'),
-                        har_data=entry
-                    )
-                    background_req.save()
-        
-    except Exception as e:
-        # If request fails, save error
-        collection_request.status_code = 0
-        collection_request.har_data = {
-            'error': str(e)
-        }
-        collection_request.save()
+    return render(request, 'collections/delete.html', {'project': project, 'collection': collection})
+
 
 def background_request_detail(request, project_id, request_id, background_id):
     project = get_object_or_404(Project, id=project_id)
     req = get_object_or_404(Request, id=request_id, project=project)
-    background_req = get_object_or_404(BackgroundRequest, id=background_id, parent_request=req)
+    background_req = get_object_or_404(BackgroundRequest.objects.select_related('har_entry'), id=background_id, parent_request=req)
     
     return render(request, 'requests/background_detail.html', {
         'project': project,
@@ -377,7 +349,7 @@ def collection_background_request_detail(request, project_id, collection_id, req
     project = get_object_or_404(Project, id=project_id)
     collection = get_object_or_404(PostmanCollection, id=collection_id, project=project)
     req = get_object_or_404(CollectionRequest, id=request_id, collection=collection)
-    background_req = get_object_or_404(CollectionBackgroundRequest, id=background_id, parent_request=req)
+    background_req = get_object_or_404(CollectionBackgroundRequest.objects.select_related('har_entry'), id=background_id, parent_request=req)
     
     return render(request, 'collections/background_detail.html', {
         'project': project,
@@ -0,0 +1,69 @@
+# testmanager/browsers.py
+import sys
+from interceptor.browser_pool import BrowserPool, clear_browser_state, page_origin
+
+# Clears what CDP cannot reach by origin: the open page's storage and its IndexedDB databases
+CLEAR_PAGE_STORAGE = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+var done = arguments[arguments.length - 1];
+var pending = [];
+if (navigator.serviceWorker) {
+  pending.push(navigator.serviceWorker.getRegistrations().then(function (registrations) {
+    return Promise.all(registrations.map(function (r) { return r.unregister(); }));
+  }));
+}
+if (window.indexedDB && indexedDB.databases) {
+  pending.push(indexedDB.databases().then(function (databases) {
+    databases.forEach(function (db) { indexedDB.deleteDatabase(db.name); });
+  }));
+}
+Promise.all(pending).then(function () { done(true); }, function () { done(false); });
+"""
+
+def remember_origin(driver):
+    """Note the current page's origin so the browser reset can clear its storage"""
+    try:
+        origin = page_origin(driver.current_url)
+    except Exception:
+        return
+    if origin:
+        origins = getattr(driver, 'visited_origins', None)
+        if origins is None:
+            origins = driver.visited_origins = set()
+        origins.add(origin)
+
+class TestBrowserPool(BrowserPool):
+    """
+    Pool of plain Selenium Chrome browsers reused across test runs
+
+    Leasing, health checks and recycling after `max_uses` runs or a crash
+    come from the interceptor's BrowserPool; the reset between runs clears
+    what a test plan can leave behind instead of Selenium Wire traffic.
+    """
+
+    @staticmethod
+    def reset(driver):
+        """
+        Wipe cookies, storage, IndexedDB, caches and service workers, keep one fresh tab on about:blank
+
+        Storage is cleared for every origin the run visited (see
+        remember_origin). Returns False if the browser could not be reset,
+        which makes the pool quit it.
+        """
+        try:
+            if page_origin(driver.current_url):
+                try:
+                    driver.set_script_timeout(5)
+                    driver.execute_async_script(CLEAR_PAGE_STORAGE)
+                except Exception:
+                    pass  # Best effort; CDP clears the same storage by origin
+
+            clear_browser_state(driver, getattr(driver, 'visited_origins', None) or ())
+            # New-document scripts are registered per tab; the next run's install() must add the settle script again
+            driver.settle_installed = False
+            driver.visited_origins = set()
+            return True
+        except Exception as e:
+            sys.stderr.write(f"Error resetting test browser: {str(e)}\n")
+            return False
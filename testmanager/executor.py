@@ -0,0 +1,277 @@
+# testmanager/executor.py
+import hashlib
+import queue
+import socket
+import sys
+import threading
+import traceback
+from datetime import timedelta
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Connection, Listener, answer_challenge, deliver_challenge
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Avg, DurationField, ExpressionWrapper, F, Max, Min, Q, TextField, Value
+from django.db.models.functions import Coalesce, Concat
+from django.utils.timezone import now
+from automation_testplan.chromedriver import resolution_stats
+from testmanager.browsers import TestBrowserPool
+from testmanager.models import TestRun
+from testmanager.runner import run_test_plan, setup_driver
+
+DEFAULT_ADDRESS = ('127.0.0.1', 6010)
+
+# Longest either end waits on the other for a handshake step or a message, in seconds
+MESSAGE_TIMEOUT = 2
+
+def executor_address():
+    return tuple(getattr(settings, 'TESTMANAGER_EXECUTOR_ADDRESS', DEFAULT_ADDRESS))
+
+def executor_authkey():
+    """Key both ends derive from SECRET_KEY, so only this project can submit runs"""
+    return hashlib.sha256(f"test-executor:{settings.SECRET_KEY}".encode('utf-8')).digest()
+
+def queue_test_run(test_plan):
+    """
+    Create a queued TestRun for a plan and wake the executor
+
+    Returns (test_run, notified); a run that could not be announced stays
+    queued and is picked up when an executor next scans the database.
+    """
+    test_runs, notified = queue_test_runs([test_plan])
+    return test_runs[0], notified
+
+def queue_test_runs(test_plans):
+    """Queue a run of every plan, in order, with a single notification; returns (test_runs, notified)"""
+    test_runs = [TestRun.objects.create(test_plan=test_plan, status='queued') for test_plan in test_plans]
+    return test_runs, notify_executor([test_run.id for test_run in test_runs])
+
+def _connect(address, authkey, timeout):
+    """
+    multiprocessing.connection.Client() with a timeout on the connect and the handshake
+
+    Raises OSError (or AuthenticationError for a wrong key) when nothing
+    answers in time, e.g. a hung executor or another service on the port.
+    """
+    sock = socket.create_connection(address, timeout=timeout)
+    sock.setblocking(True)
+    connection = Connection(sock.detach())
+    try:
+        # The executor opens the handshake; once it has, it answers each step at once
+        if not connection.poll(timeout):
+            raise TimeoutError(f"No handshake from the executor within {timeout}s")
+        answer_challenge(connection, authkey)
+        deliver_challenge(connection, authkey)
+    except BaseException:
+        connection.close()
+        raise
+    return connection
+
+def _ask_executor(message, timeout=MESSAGE_TIMEOUT):
+    """Send a message to the executor and return its reply, or None if none is listening"""
+    try:
+        connection = _connect(executor_address(), executor_authkey(), timeout)
+    except (OSError, EOFError, AuthenticationError):
+        return None
+    try:
+        connection.send(message)
+        return connection.recv() if connection.poll(timeout) else None
+    except (OSError, EOFError):
+        return None
+    finally:
+        connection.close()
+
+def notify_executor(run_ids):
+    """Tell the executor runs are queued; returns False if none is listening"""
+    if isinstance(run_ids, int):
+        run_ids = [run_ids]
+    return _ask_executor({'run_ids': list(run_ids)}) == 'ok'
+
+def executor_status(timeout=0.5):
+    """The executor's workers and in-memory queue, or None if it is not running"""
+    # Pages render this on every request; don't let a hung executor hold them up
+    return _ask_executor({'status': True}, timeout=timeout)
+
+def queue_stats(period=timedelta(days=1)):
+    """
+    Queue depth and wait times from the database
+
+    `depth` runs are waiting, the oldest for `oldest_wait` seconds; runs that
+    started within `period` waited `average_wait` / `max_wait` seconds.
+    """
+    current = now()
+    queued = TestRun.objects.filter(status='queued').aggregate(oldest=Min('created_at'))
+    waits = TestRun.objects.filter(started_at__gte=current - period).annotate(
+        wait=ExpressionWrapper(F('started_at') - F('created_at'), output_field=DurationField())
+    ).aggregate(average=Avg('wait'), longest=Max('wait'))
+
+    return {
+        'depth': TestRun.objects.filter(status='queued').count(),
+        'running': TestRun.objects.filter(status='running').count(),
+        'oldest_wait': (current - queued['oldest']).total_seconds() if queued['oldest'] else 0,
+        'average_wait': waits['average'].total_seconds() if waits['average'] else 0,
+        'max_wait': waits['longest'].total_seconds() if waits['longest'] else 0,
+    }
+
+class TestExecutor:
+    """
+    Long-lived process running queued TestRuns in-process on `workers` threads
+
+    Django and Selenium are imported once, so a run starts without a new
+    interpreter, and at most `workers` (default TESTMANAGER_EXECUTOR_WORKERS)
+    browsers run at once on this host. Run ids arrive over a local socket
+    (multiprocessing connection, authenticated with executor_authkey()); the
+    database is also scanned every `poll_interval` seconds, so runs queued
+    while the executor was down, or whose notification was lost, still run.
+    Runs are claimed atomically and tagged with the executor's `name`
+    (host:port), so executors on several hosts can share a database and a
+    restarted executor fails the runs it left behind.
+
+    Each worker leases its browser from a TestBrowserPool: Chrome stays up
+    between runs and is reset in between, and is replaced after
+    TESTMANAGER_BROWSER_MAX_USES runs or when it crashes.
+    """
+
+    def __init__(self, address=None, authkey=None, poll_interval=5, workers=None, name=None):
+        self.address = address or executor_address()
+        self.authkey = authkey or executor_authkey()
+        self.name = name or f"{socket.gethostname()}:{self.address[1]}"
+        self.poll_interval = poll_interval
+        self.workers = max(1, workers or getattr(settings, 'TESTMANAGER_EXECUTOR_WORKERS', 2))
+        self.jobs = queue.Queue()
+        self.pool = TestBrowserPool(
+            max_size=self.workers,
+            max_uses=getattr(settings, 'TESTMANAGER_BROWSER_MAX_USES', 25),
+            driver_factory=setup_driver,
+        )
+        self.busy = 0
+        self._busy_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._listener = None
+
+    def serve_forever(self):
+        """Serve until interrupted; running tests are allowed to finish"""
+        # Before any worker claims a run under this name
+        self.fail_abandoned_runs()
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept, name='test-executor-listener', daemon=True).start()
+        workers = [
+            threading.Thread(target=self._work, name=f'test-executor-worker-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            self.scan()
+            while not self._stop.wait(self.poll_interval):
+                # Anything still in memory will be claimed anyway; only look for runs we missed
+                if self.jobs.empty():
+                    self.scan()
+        finally:
+            self.stop()
+            for worker in workers:
+                worker.join()
+            self.pool.close()
+
+    def status(self):
+        with self._busy_lock:
+            busy = self.busy
+        return {'workers': self.workers, 'busy': busy, 'pending': self.jobs.qsize(), 'driver_resolution': resolution_stats()}
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                run_id = self.jobs.get(timeout=1)
+            except queue.Empty:
+                continue
+            with self._busy_lock:
+                self.busy += 1
+            try:
+                self.execute(run_id)
+            finally:
+                with self._busy_lock:
+                    self.busy -= 1
+
+    def stop(self):
+        self._stop.set()
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except OSError:
+                pass
+
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                connection = self._listener.accept()
+            except Exception:
+                # Closed on shutdown, or a client failed authentication
+                if self._stop.is_set():
+                    return
+                continue
+            try:
+                # An authenticated client that never sends must not hold up the others
+                if not connection.poll(MESSAGE_TIMEOUT):
+                    raise TimeoutError(f"No message within {MESSAGE_TIMEOUT}s")
+                message = connection.recv()
+                if message.get('status'):
+                    connection.send(self.status())
+                else:
+                    for run_id in message['run_ids']:
+                        self.jobs.put(int(run_id))
+                    connection.send('ok')
+            except Exception as e:
+                sys.stderr.write(f"Rejected executor message: {str(e)}\n")
+            finally:
+                connection.close()
+
+    def fail_abandoned_runs(self):
+        """
+        Fail the runs this executor was running when it stopped; nothing will finish them
+
+        Runs claimed before executors were recorded are treated the same way.
+        Returns the number of runs failed.
+        """
+        close_old_connections()
+        return TestRun.objects.filter(status='running').filter(Q(executor=self.name) | Q(executor__isnull=True)).update(
+            status='failed',
+            ended_at=now(),
+            log=Concat(
+                Coalesce('log', Value('')),
+                Value('[ERROR] The executor stopped while the run was in progress\n'),
+                output_field=TextField(),
+            ),
+        )
+
+    def scan(self):
+        """Queue every run waiting in the database, oldest first"""
+        close_old_connections()
+        for run_id in TestRun.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True):
+            self.jobs.put(run_id)
+
+    def claim(self, run_id):
+        """Mark a queued run as running; returns the run, or None if another executor took it"""
+        claimed = TestRun.objects.filter(pk=run_id, status='queued').update(
+            status='running', started_at=now(), executor=self.name
+        )
+        return TestRun.objects.select_related('test_plan').get(pk=run_id) if claimed else None
+
+    def execute(self, run_id):
+        close_old_connections()
+        test_run = self.claim(run_id)
+        if test_run is None:
+            return
+
+        try:
+            with self.pool.lease() as driver:
+                run_test_plan(test_run.test_plan_id, test_run.id, driver=driver)
+        except Exception as e:
+            # The runner records step failures itself; this is e.g. a browser that would not start
+            # (a browser that died mid-run fails its reset and is replaced on release)
+            TestRun.objects.filter(pk=test_run.pk, status='running').update(
+                status='failed',
+                ended_at=now(),
+                log=f"[ERROR] {str(e)}\n[TRACEBACK] {traceback.format_exc()}"
+            )
+        finally:
+            close_old_connections()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from testmanager.executor import TestExecutor, executor_address
+
+class Command(BaseCommand):
+    help = 'Run the test executor: a long-lived process that executes queued test runs in-process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', default=None,
+                            help='host:port to listen on for queued runs (default TESTMANAGER_EXECUTOR_ADDRESS)')
+        parser.add_argument('--poll-interval', type=float, default=5,
+                            help='Seconds between scans of the database for queued runs')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Test runs executed in parallel on this host (default TESTMANAGER_EXECUTOR_WORKERS)')
+
+    def handle(self, *args, **options):
+        address = executor_address()
+        if options['address']:
+            host, _, port = options['address'].rpartition(':')
+            address = (host or '127.0.0.1', int(port))
+
+        executor = TestExecutor(address=address, poll_interval=options['poll_interval'], workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Test executor listening on {address[0]}:{address[1]} with {executor.workers} workers'
+        ))
+        try:
+            executor.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Test executor stopped')
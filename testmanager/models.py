@@ -16,8 +16,20 @@ class Project(models.Model):
         return reverse('create_test_plan_for_project', args=[self.id])
 
 class TestPlan(models.Model):
+    # How the runner waits for the page after an action (see testmanager/settle.py)
+    SETTLE_STRATEGY_CHOICES = [
+        ('ready', 'Document Ready'),
+        ('network', 'No Pending Fetch/XHR'),
+        ('dom', 'DOM Quiet'),
+        ('fixed', 'Fixed Delay'),
+        ('none', 'None'),
+    ]
+    
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='test_plans')
     name = models.CharField(max_length=100)
+    settle_strategy = models.CharField(max_length=20, choices=SETTLE_STRATEGY_CHOICES, default='network')
+    # Longest a step may spend settling before the run moves on
+    settle_timeout = models.FloatField(default=10)
     created_at = models.DateTimeField(default=now)
     updated_at = models.DateTimeField(default=now)
 
@@ -65,6 +77,9 @@ class TestStep(models.Model):
     selector_value = models.CharField(max_length=255, null=True, blank=True)
     input_value = models.TextField(null=True, blank=True)
     wait_type = models.CharField(max_length=20, choices=WAIT_TYPE_CHOICES, null=True, blank=True)
+    # Overrides the plan's strategy when set; settle_delay is the 'fixed' sleep in seconds
+    settle_strategy = models.CharField(max_length=20, choices=TestPlan.SETTLE_STRATEGY_CHOICES, null=True, blank=True)
+    settle_delay = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(default=now)
     updated_at = models.DateTimeField(default=now)
 
@@ -76,6 +91,7 @@ class TestStep(models.Model):
 
 class TestRun(models.Model):
     STATUS_CHOICES = [
+        ('queued', 'Queued'),
         ('running', 'Running'),
         ('success', 'Success'),
         ('failed', 'Failed'),
@@ -83,7 +99,10 @@ class TestRun(models.Model):
     
     test_plan = models.ForeignKey(TestPlan, on_delete=models.CASCADE, related_name='runs')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
-    started_at = models.DateTimeField()
+    # Set when an executor picks the run up; created_at is when it was queued
+    started_at = models.DateTimeField(null=True, blank=True)
+    # host:port of the executor running it, so a restarted executor can fail the runs it abandoned
+    executor = models.CharField(max_length=255, null=True, blank=True)
     ended_at = models.DateTimeField(null=True, blank=True)
     log = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(default=now)
@@ -99,6 +118,24 @@ class TestRun(models.Model):
             return f"{duration.total_seconds():.2f} seconds"
         return "N/A"
     
+    @property
+    def queue_wait(self):
+        """Seconds the run waited for an executor (so far, while it is queued)"""
+        started = self.started_at or now()
+        return max(0, (started - self.created_at).total_seconds())
+    
+    @property
+    def queue_position(self):
+        """1-based place in the queue of a queued run, else None"""
+        if self.status != 'queued':
+            return None
+        return TestRun.objects.filter(status='queued', created_at__lt=self.created_at).count() + 1
+    
+    @property
+    def settle_time(self):
+        """Total seconds the run's steps spent settling"""
+        return self.step_results.aggregate(total=models.Sum('settle_time'))['total'] or 0
+    
     def get_absolute_url(self):
         return reverse('test_run_detail', args=[self.id])
 
@@ -116,6 +153,9 @@ class TestStepResult(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     message = models.TextField(null=True, blank=True)
     screenshot = models.ImageField(upload_to='step_screenshots/', null=True, blank=True)
+    # Strategy used after the action and the seconds spent settling
+    settle_strategy = models.CharField(max_length=20, null=True, blank=True)
+    settle_time = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(default=now)
     
     class Meta:
@@ -3,12 +3,8 @@ from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from django.urls import reverse
-from django.conf import settings
-from django.utils.timezone import now
 import json
-import os
-import subprocess
-import threading
+from testmanager.executor import executor_status, queue_stats, queue_test_run, queue_test_runs
 from testmanager.models import Project, TestPlan, TestStep, TestRun, TestStepResult
 from testmanager.forms import ProjectForm, TestPlanForm, TestStepFormSet, TestStepForm
 
@@ -35,7 +31,9 @@ def project_detail(request, project_id):
     return render(request, 'projects.html', {
         'projects': Project.objects.all().order_by('-created_at'),
         'selected_project': project,
-        'test_plans': test_plans
+        'test_plans': test_plans,
+        'queue': queue_stats(),
+        'executor': executor_status()
     })
 
 def create_project(request):
@@ -300,33 +298,43 @@ def delete_test_step(request, test_step_id):
     return render(request, 'test_steps/delete.html', {'test_step': test_step})
 
 def run_test_plan(request, test_plan_id):
-    """Run a test plan"""
+    """Queue a test plan run for the test executor"""
     test_plan = get_object_or_404(TestPlan, id=test_plan_id)
     
-    # Create a new test run
-    test_run = TestRun.objects.create(
-        test_plan=test_plan,
-        status='running',
-        started_at=now()
-    )
-    
-    # Run the test plan in a separate thread
-    thread = threading.Thread(
-        target=run_test_in_background,
-        args=(test_plan_id, test_run.id)
-    )
-    thread.daemon = True
-    thread.start()
-    
-    messages.success(request, f'Test plan "{test_plan.name}" is now running!')
+    test_run, notified = queue_test_run(test_plan)
+    
+    if notified:
+        messages.success(request, f'Test plan "{test_plan.name}" is queued to run!')
+    else:
+        messages.warning(request, f'Test plan "{test_plan.name}" is queued, but no test executor answered. Start one with "python manage.py run_executor".')
     return redirect('test_run_detail', test_run_id=test_run.id)
 
-def run_test_in_background(test_plan_id, test_run_id):
-    """Run the test plan in a background thread"""
-    script_path = os.path.join(settings.BASE_DIR, 'script.py')
-    subprocess.run([
-        'python', script_path, str(test_plan_id), str(test_run_id)
-    ])
+def run_project_plans(request, project_id):
+    """Queue a run of every test plan in a project; the executor spreads them over its workers"""
+    project = get_object_or_404(Project, id=project_id)
+    
+    if request.method != 'POST':
+        return redirect('project_detail1', project_id=project.id)
+    
+    test_plans = list(project.test_plans.all().order_by('created_at'))
+    if not test_plans:
+        messages.error(request, 'This project has no test plans to run')
+        return redirect('project_detail1', project_id=project.id)
+    
+    test_runs, notified = queue_test_runs(test_plans)
+    
+    if notified:
+        messages.success(request, f'Queued {len(test_runs)} test plans to run!')
+    else:
+        messages.warning(request, f'Queued {len(test_runs)} test plans, but no test executor answered. Start one with "python manage.py run_executor".')
+    return redirect('project_detail1', project_id=project.id)
+
+def test_queue_status(request):
+    """JSON queue depth and wait times, plus the local executor's workers"""
+    return JsonResponse({
+        **queue_stats(),
+        'executor': executor_status()
+    })
 
 def test_run_detail(request, test_run_id):
     """View test run details"""
@@ -355,6 +363,8 @@ def get_test_run_status(request, test_run_id):
     
     return JsonResponse({
         'status': test_run.status,
+        'queue_position': test_run.queue_position,
+        'queue_wait': test_run.queue_wait,
         'log': test_run.log,
         'ended_at': test_run.ended_at.isoformat() if test_run.ended_at else None,
         'duration': test_run.duration,
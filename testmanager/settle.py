@@ -0,0 +1,131 @@
+# testmanager/settle.py
+import time
+from selenium.common.exceptions import JavascriptException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+DEFAULT_QUIET_WINDOW = 0.3
+POLL_INTERVAL = 0.05
+
+# Delays of the 'fixed' strategy when a step sets none; what the runner used to sleep
+DEFAULT_FIXED_DELAYS = {'goto': 2.0}
+DEFAULT_FIXED_DELAY = 1.0
+
+# Counts fetch/XHR requests in flight and notes the last network activity and
+# DOM mutation. Installed on every new document (Chrome) and on demand on the
+# current one; installing twice is a no-op.
+INSTRUMENTATION = """
+(function () {
+  if (window.__settle) { return; }
+  var settle = window.__settle = {pending: 0, lastActivity: Date.now(), lastMutation: Date.now()};
+  function started() { settle.pending++; settle.lastActivity = Date.now(); }
+  function finished() { settle.pending = Math.max(0, settle.pending - 1); settle.lastActivity = Date.now(); }
+
+  if (window.fetch) {
+    var fetch = window.fetch;
+    window.fetch = function () {
+      started();
+      return fetch.apply(this, arguments).then(
+        function (response) { finished(); return response; },
+        function (error) { finished(); throw error; }
+      );
+    };
+  }
+
+  var send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    started();
+    this.addEventListener('loadend', finished);
+    try {
+      return send.apply(this, arguments);
+    } catch (error) {
+      finished();
+      throw error;
+    }
+  };
+
+  new MutationObserver(function () { settle.lastMutation = Date.now(); })
+    .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+})();
+"""
+
+# Restart the quiet window at the action, so late requests/mutations it triggers are waited for
+MARK = INSTRUMENTATION + "window.__settle.lastActivity = window.__settle.lastMutation = Date.now();"
+
+# Settled-yet checks; arguments[0] is the quiet window in milliseconds
+CHECKS = {
+    'ready': "return document.readyState === 'complete';",
+    'network': (
+        "var s = window.__settle;"
+        "return document.readyState === 'complete'"
+        " && (!s || (s.pending === 0 && Date.now() - s.lastActivity >= arguments[0]));"
+    ),
+    'dom': (
+        "var s = window.__settle;"
+        "return document.readyState !== 'loading'"
+        " && (!s || Date.now() - s.lastMutation >= arguments[0]);"
+    ),
+}
+
+def install(driver):
+    """
+    Instrument every document the driver loads from now on, and the current one
+
+    The new-document script is registered once per tab, so a browser
+    reused across runs does not stack copies of it; TestBrowserPool.reset
+    clears `settle_installed` when it moves the browser to a new tab.
+    """
+    if not getattr(driver, 'settle_installed', False):
+        try:
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': INSTRUMENTATION})
+            driver.settle_installed = True
+        except Exception:
+            pass  # Not Chrome; settle() instruments each page when it first waits on it
+    try:
+        driver.execute_script(INSTRUMENTATION)
+    except Exception:
+        pass
+
+def fixed_delay(action):
+    return DEFAULT_FIXED_DELAYS.get(action, DEFAULT_FIXED_DELAY)
+
+def settle(driver, strategy, timeout=10, delay=None, quiet_window=DEFAULT_QUIET_WINDOW):
+    """
+    Wait for the page to settle after an action
+
+    Strategies:
+        'ready': document.readyState is 'complete'
+        'network': ready, with no fetch/XHR in flight for `quiet_window` seconds
+        'dom': no DOM mutation for `quiet_window` seconds
+        'fixed': sleep `delay` seconds
+        'none': return at once
+
+    Waiting stops after `timeout` seconds without failing the step. Returns
+    (seconds spent, settled), settled being False on a timeout.
+    """
+    start = time.monotonic()
+
+    if strategy in (None, 'none'):
+        return 0.0, True
+    if strategy == 'fixed':
+        time.sleep(delay or 0)
+        return time.monotonic() - start, True
+    if strategy not in CHECKS:
+        raise ValueError(f"Unknown settle strategy: {strategy}")
+
+    if strategy != 'ready':
+        try:
+            driver.execute_script(MARK)
+        except JavascriptException:
+            pass  # The page is unloading; the next document is instrumented on load
+
+    # Scripts fail while a navigation swaps documents; keep polling through it
+    quiet_ms = quiet_window * 1000
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL, ignored_exceptions=(JavascriptException,)).until(
+            lambda d: d.execute_script(CHECKS[strategy], quiet_ms)
+        )
+        settled = True
+    except TimeoutException:
+        settled = False
+
+    return time.monotonic() - start, settled
@@ -1,3 +1,431 @@
-from django.test import TestCase
+import os
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener
+from unittest import mock
+from selenium.common.exceptions import JavascriptException
+from automation_testplan import chromedriver
+from django.test import SimpleTestCase, TestCase, override_settings
+from . import settle
+from .browsers import CLEAR_PAGE_STORAGE, TestBrowserPool, remember_origin
+from .executor import TestExecutor, _ask_executor, executor_status, notify_executor
+from .models import Project, TestPlan, TestRun
 
-# Create your tests here.
+class SettleDriver:
+    """Answers settle's checks from a list of results, one per poll"""
+
+    def __init__(self, results=(), chrome=True):
+        self.results = list(results)
+        self.chrome = chrome
+        self.scripts = []
+        self.cdp = []
+
+    def execute_script(self, script, *args):
+        self.scripts.append((script, args))
+        if script in settle.CHECKS.values():
+            result = self.results.pop(0) if self.results else False
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+    def execute_cdp_cmd(self, command, params):
+        if not self.chrome:
+            raise RuntimeError('not Chrome')
+        self.cdp.append((command, params))
+
+class SettleTests(SimpleTestCase):
+    def test_none_returns_at_once(self):
+        driver = SettleDriver()
+        self.assertEqual(settle.settle(driver, 'none'), (0.0, True))
+        self.assertEqual(settle.settle(driver, None), (0.0, True))
+        self.assertEqual(driver.scripts, [])
+
+    def test_fixed_sleeps_the_delay(self):
+        waited, settled = settle.settle(SettleDriver(), 'fixed', delay=0.05)
+        self.assertTrue(settled)
+        self.assertGreaterEqual(waited, 0.05)
+        self.assertEqual(settle.fixed_delay('goto'), 2.0)
+        self.assertEqual(settle.fixed_delay('click'), settle.DEFAULT_FIXED_DELAY)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            settle.settle(SettleDriver(), 'idle')
+
+    def test_polls_until_the_check_passes(self):
+        driver = SettleDriver([False, False, True])
+        waited, settled = settle.settle(driver, 'ready', timeout=2)
+        self.assertTrue(settled)
+        checks = [args for script, args in driver.scripts if script == settle.CHECKS['ready']]
+        self.assertEqual(len(checks), 3)
+        self.assertNotIn(settle.MARK, [script for script, _ in driver.scripts])
+
+    def test_network_and_dom_restart_the_quiet_window(self):
+        for strategy in ('network', 'dom'):
+            with self.subTest(strategy=strategy):
+                driver = SettleDriver([True])
+                self.assertTrue(settle.settle(driver, strategy, quiet_window=0.5)[1])
+                self.assertEqual(driver.scripts[0], (settle.MARK, ()))
+                self.assertEqual(driver.scripts[1], (settle.CHECKS[strategy], (500.0,)))
+
+    def test_keeps_polling_through_a_navigation(self):
+        driver = SettleDriver([JavascriptException('document unloaded'), True])
+        self.assertTrue(settle.settle(driver, 'network', timeout=2)[1])
+
+    def test_timeout_does_not_fail_the_step(self):
+        start = time.monotonic()
+        waited, settled = settle.settle(SettleDriver(), 'dom', timeout=0.2)
+        self.assertFalse(settled)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertGreaterEqual(waited, 0.2)
+
+    def test_install_registers_the_new_document_script_once_per_tab(self):
+        driver = SettleDriver()
+        settle.install(driver)
+        settle.install(driver)
+        self.assertEqual(driver.cdp, [('Page.addScriptToEvaluateOnNewDocument', {'source': settle.INSTRUMENTATION})])
+        self.assertEqual([script for script, _ in driver.scripts], [settle.INSTRUMENTATION] * 2)
+
+        driver.settle_installed = False
+        settle.install(driver)
+        self.assertEqual(len(driver.cdp), 2)
+
+    def test_install_without_cdp_instruments_the_current_page(self):
+        driver = SettleDriver(chrome=False)
+        settle.install(driver)
+        self.assertFalse(getattr(driver, 'settle_installed', False))
+        self.assertEqual([script for script, _ in driver.scripts], [settle.INSTRUMENTATION])
+
+def _free_address():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()
+
+class ExecutorConnectionTests(SimpleTestCase):
+    def _serve(self, **options):
+        """An executor answering messages on a free port, without workers"""
+        executor = TestExecutor(address=('127.0.0.1', 0), **options)
+        executor._listener = Listener(executor.address, authkey=executor.authkey)
+        threading.Thread(target=executor._accept, daemon=True).start()
+        self.addCleanup(executor.stop)
+        settings = override_settings(TESTMANAGER_EXECUTOR_ADDRESS=executor._listener.address)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        return executor
+
+    def test_round_trip(self):
+        executor = self._serve(workers=3)
+        self.assertTrue(notify_executor([3, 4]))
+        self.assertEqual([executor.jobs.get_nowait(), executor.jobs.get_nowait()], [3, 4])
+        status = executor_status()
+        self.assertEqual((status['workers'], status['busy'], status['pending']), (3, 0, 0))
+
+    def test_nothing_listening(self):
+        with override_settings(TESTMANAGER_EXECUTOR_ADDRESS=_free_address()):
+            self.assertIsNone(executor_status())
+            self.assertFalse(notify_executor(1))
+
+    def test_listener_that_never_answers_times_out(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            sock.listen()
+            with override_settings(TESTMANAGER_EXECUTOR_ADDRESS=sock.getsockname()):
+                start = time.monotonic()
+                self.assertIsNone(_ask_executor({'status': True}, timeout=0.2))
+                self.assertLess(time.monotonic() - start, 2)
+
+    def test_wrong_key_is_not_an_executor(self):
+        listener = Listener(('127.0.0.1', 0), authkey=b'another project')
+        self.addCleanup(listener.close)
+
+        def accept():
+            try:
+                listener.accept()
+            except Exception:
+                pass
+
+        threading.Thread(target=accept, daemon=True).start()
+        with override_settings(TESTMANAGER_EXECUTOR_ADDRESS=listener.address):
+            self.assertIsNone(_ask_executor({'status': True}, timeout=1))
+
+    def test_silent_client_does_not_block_the_listener(self):
+        executor = self._serve()
+        with mock.patch('testmanager.executor.MESSAGE_TIMEOUT', 0.2):
+            silent = Client(executor._listener.address, authkey=executor.authkey)
+            self.addCleanup(silent.close)
+            self.assertTrue(notify_executor(7))
+        self.assertEqual(executor.jobs.get_nowait(), 7)
+
+class ExecutorWorkerTests(SimpleTestCase):
+    def test_runs_at_most_workers_at_once(self):
+        executor = TestExecutor(address=('127.0.0.1', 0), workers=2, poll_interval=0.05)
+        lock = threading.Lock()
+        running = []
+        peak = []
+        done = threading.Event()
+
+        def execute(run_id):
+            with lock:
+                running.append(run_id)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(run_id)
+                if len(peak) == 6:
+                    done.set()
+
+        for run_id in range(6):
+            executor.jobs.put(run_id)
+        with mock.patch.object(executor, 'execute', execute), mock.patch.object(executor, 'scan'), \
+                mock.patch.object(executor, 'fail_abandoned_runs'):
+            server = threading.Thread(target=executor.serve_forever, daemon=True)
+            server.start()
+            self.assertTrue(done.wait(5))
+            executor.stop()
+            server.join(5)
+        self.assertFalse(server.is_alive())
+        self.assertEqual(max(peak), 2)
+
+class StubPool:
+    def __init__(self, error=None):
+        self.error = error
+        self.leased = 0
+
+    @contextmanager
+    def lease(self):
+        if self.error:
+            raise self.error
+        self.leased += 1
+        yield 'driver'
+
+class ExecutorRunTests(TestCase):
+    def setUp(self):
+        project = Project.objects.create(name='p', git_repo='https://example.com/repo.git')
+        self.plan = TestPlan.objects.create(project=project, name='plan')
+        self.executor = TestExecutor(address=('127.0.0.1', 6010), name='host-a:6010')
+
+    def _run(self, status='queued', **fields):
+        return TestRun.objects.create(test_plan=self.plan, status=status, **fields)
+
+    def test_a_run_is_claimed_once(self):
+        run = self._run()
+        claimed = self.executor.claim(run.pk)
+        self.assertEqual((claimed.status, claimed.executor), ('running', 'host-a:6010'))
+        self.assertIsNotNone(claimed.started_at)
+        self.assertIsNone(TestExecutor(address=('127.0.0.1', 6011)).claim(run.pk))
+
+    def test_execute_runs_the_plan_on_a_leased_browser(self):
+        run = self._run()
+        self.executor.pool = StubPool()
+        with mock.patch('testmanager.executor.run_test_plan') as run_test_plan:
+            self.executor.execute(run.pk)
+        run_test_plan.assert_called_once_with(self.plan.pk, run.pk, driver='driver')
+        self.assertEqual(self.executor.pool.leased, 1)
+
+    def test_browser_that_will_not_start_fails_the_run(self):
+        run = self._run()
+        self.executor.pool = StubPool(RuntimeError('chrome not found'))
+        self.executor.execute(run.pk)
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'failed')
+        self.assertIsNotNone(run.ended_at)
+        self.assertIn('chrome not found', run.log)
+
+    def test_fails_only_its_own_abandoned_runs(self):
+        own = self._run('running', executor='host-a:6010', log='step 1 ok\n')
+        legacy = self._run('running')
+        other = self._run('running', executor='host-b:6010')
+        queued = self._run('queued')
+
+        self.assertEqual(self.executor.fail_abandoned_runs(), 2)
+        statuses = {run.pk: run.status for run in TestRun.objects.all()}
+        self.assertEqual(statuses, {own.pk: 'failed', legacy.pk: 'failed', other.pk: 'running', queued.pk: 'queued'})
+        own.refresh_from_db()
+        self.assertTrue(own.log.startswith('step 1 ok\n[ERROR] The executor stopped'))
+
+class ChromeDriver:
+    """Just enough of a Selenium Chrome driver for TestBrowserPool.reset"""
+
+    def __init__(self, url='about:blank'):
+        self.current_url = url
+        self.handles = ['tab-1']
+        self.current_window_handle = 'tab-1'
+        self.switch_to = self
+        self.cdp = []
+        self.async_scripts = []
+        self.fail_cdp = False
+        self.quit_calls = 0
+
+    def new_window(self, kind):
+        handle = f'tab-{len(self.handles) + 1}'
+        self.handles.append(handle)
+        self.current_window_handle = handle
+
+    def window(self, handle):
+        self.current_window_handle = handle
+
+    @property
+    def window_handles(self):
+        return list(self.handles)
+
+    def close(self):
+        self.handles.remove(self.current_window_handle)
+
+    def get(self, url):
+        self.current_url = url
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script):
+        self.async_scripts.append(script)
+
+    def execute_script(self, script, *args):
+        return 1
+
+    def execute_cdp_cmd(self, command, params):
+        if self.fail_cdp:
+            raise RuntimeError('browser crashed')
+        self.cdp.append((command, params))
+
+    def quit(self):
+        self.quit_calls += 1
+
+class TestBrowserResetTests(SimpleTestCase):
+    def _cleared(self, driver):
+        return {params['origin'] for command, params in driver.cdp if command == 'Storage.clearDataForOrigin'}
+
+    def test_clears_every_visited_origin_and_keeps_one_fresh_tab(self):
+        driver = ChromeDriver('https://app.example.com/login')
+        remember_origin(driver)
+        driver.get('https://sso.example.com:8443/authorize?x=1')
+        remember_origin(driver)
+        driver.get('https://app.example.com/home')
+        driver.new_window('tab')
+        driver.settle_installed = True
+
+        self.assertTrue(TestBrowserPool.reset(driver))
+        self.assertEqual(self._cleared(driver), {'https://app.example.com', 'https://sso.example.com:8443'})
+        self.assertIn(('Network.clearBrowserCookies', {}), driver.cdp)
+        self.assertEqual(driver.async_scripts, [CLEAR_PAGE_STORAGE])
+        self.assertEqual(driver.window_handles, ['tab-3'])
+        self.assertEqual(driver.current_url, 'about:blank')
+        self.assertFalse(driver.settle_installed)
+        self.assertEqual(driver.visited_origins, set())
+
+    def test_blank_page_needs_no_page_script(self):
+        driver = ChromeDriver()
+        self.assertTrue(TestBrowserPool.reset(driver))
+        self.assertEqual(driver.async_scripts, [])
+        self.assertEqual(self._cleared(driver), set())
+
+    def test_only_http_pages_are_remembered(self):
+        driver = ChromeDriver('data:text/html,<p>')
+        remember_origin(driver)
+        self.assertIsNone(getattr(driver, 'visited_origins', None))
+
+    def test_browser_that_cannot_be_reset_is_replaced(self):
+        launched = []
+
+        def launch():
+            launched.append(ChromeDriver())
+            return launched[-1]
+
+        pool = TestBrowserPool(max_size=1, driver_factory=launch, lease_timeout=0.2)
+        with pool.lease() as driver:
+            driver.fail_cdp = True
+        with pool.lease() as replacement:
+            self.assertIsNot(replacement, driver)
+        self.assertEqual(driver.quit_calls, 1)
+
+class ChromedriverResolutionTests(SimpleTestCase):
+    def setUp(self):
+        chromedriver.forget_chrome_version()
+        self.addCleanup(chromedriver.forget_chrome_version)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.cache_path = os.path.join(self.dir, 'chromedriver.json')
+        self.version = mock.patch.object(chromedriver, 'chrome_version', return_value='126.0.6478.126')
+        self.chrome_version = self.version.start()
+        self.addCleanup(self.version.stop)
+
+    def _driver(self, name='chromedriver'):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write('#!/bin/sh\n')
+        os.chmod(path, 0o755)
+        return path
+
+    def _resolve(self, local=None, download=None, **overrides):
+        options = {'CHROMEDRIVER_PATH': None, 'CHROMEDRIVER_CACHE_PATH': self.cache_path, **overrides}
+        download = mock.Mock(return_value=download, side_effect=None if download else OSError('offline'))
+        with override_settings(**options), \
+                mock.patch.object(chromedriver, '_find_local', return_value=local), \
+                mock.patch.object(chromedriver, '_download', download):
+            return chromedriver.resolve_chromedriver(), download
+
+    def test_pinned_path_wins(self):
+        path, download = self._resolve(CHROMEDRIVER_PATH='/opt/chromedriver')
+        self.assertEqual(path, '/opt/chromedriver')
+        self.assertEqual(chromedriver.resolution_stats()['last_source'], 'setting')
+        download.assert_not_called()
+
+    def test_resolved_once_then_from_memory_and_disk(self):
+        local = self._driver()
+        self.assertEqual(self._resolve(local=local)[0], local)
+        self.assertEqual(chromedriver.resolution_stats()['last_source'], 'local')
+        self.assertEqual(self._resolve()[0], local)
+        self.assertEqual(chromedriver.resolution_stats()['last_source'], 'memory')
+        self.chrome_version.assert_called_once()
+
+        # Another process only has the disk cache
+        chromedriver._resolved.clear()
+        self.assertEqual(self._resolve()[0], local)
+        self.assertEqual(chromedriver.resolution_stats()['last_source'], 'disk')
+
+    def test_downloads_only_when_nothing_local(self):
+        downloaded = self._driver('downloaded')
+        path, download = self._resolve(download=downloaded)
+        self.assertEqual(path, downloaded)
+        download.assert_called_once()
+        self.assertEqual(chromedriver._load_cache(self.cache_path), {'126.0.6478.126': downloaded})
+
+    def test_chrome_upgrade_resolves_a_new_driver(self):
+        old, new = self._driver('old'), self._driver('new')
+        self._resolve(local=old)
+        self.chrome_version.return_value = '127.0.6533.72'
+        chromedriver.forget_chrome_version()
+        self.assertEqual(self._resolve(local=new)[0], new)
+
+    def test_start_chrome_retries_with_the_driver_for_an_upgraded_chrome(self):
+        old, new = self._driver('old'), self._driver('new')
+        self._resolve(local=old)
+        self.chrome_version.return_value = '127.0.6533.72'
+        started = []
+
+        def start(service):
+            started.append(service.path)
+            if service.path == old:
+                raise RuntimeError('session not created: This version of ChromeDriver only supports Chrome 126')
+            return 'driver'
+
+        with override_settings(CHROMEDRIVER_PATH=None, CHROMEDRIVER_CACHE_PATH=self.cache_path), \
+                mock.patch.object(chromedriver, '_find_local', return_value=new):
+            self.assertEqual(chromedriver.start_chrome(start), 'driver')
+        self.assertEqual(started, [old, new])
+
+    def test_offline_setting_and_environment(self):
+        with mock.patch.dict(os.environ, {'CHROMEDRIVER_OFFLINE': 'true'}):
+            with override_settings(CHROMEDRIVER_OFFLINE=None):
+                self.assertTrue(chromedriver._offline())
+            with override_settings(CHROMEDRIVER_OFFLINE=False):
+                self.assertFalse(chromedriver._offline())
+        with mock.patch.dict(os.environ, {'CHROMEDRIVER_OFFLINE': '0'}), override_settings(CHROMEDRIVER_OFFLINE=None):
+            self.assertFalse(chromedriver._offline())
+
+    def test_offline_never_downloads(self):
+        with self.assertRaisesMessage(RuntimeError, 'CHROMEDRIVER_OFFLINE is set'):
+            self._resolve(download=self._driver(), CHROMEDRIVER_OFFLINE=True)
@@ -1,9 +1,7 @@
 from selenium import webdriver
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
 import time
 from io import BytesIO
 from PIL import Image
@@ -12,6 +10,7 @@ import uuid
 import csv
 from django.conf import settings
 from django.core.files.base import ContentFile
+from automation_testplan.chromedriver import start_chrome
 from xpath.models import CapturedElement
 
 class ElementInspector(threading.Thread):
@@ -41,8 +40,7 @@ class ElementInspector(threading.Thread):
             chrome_options.add_argument("--no-sandbox")
             chrome_options.add_argument("--disable-dev-shm-usage")
         
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        self.driver = start_chrome(lambda service: webdriver.Chrome(service=service, options=chrome_options))
         self.actions = ActionChains(self.driver)
     
     def get_xpath_script(self):